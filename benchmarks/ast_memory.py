@@ -0,0 +1,46 @@
+"""
+Memory held by the syntax tree of a large program, and parse time.
+
+Tokens come from a `TokenBuffer`, so the tokens the tree references are
+materialized, and counted, while parsing.
+
+Run from the repository root: `python -m benchmarks.ast_memory [functions]`.
+"""
+
+import gc
+import sys
+import tracemalloc
+
+from benchmarks.common import best_of, generated_program, report
+from pylox.node import node_count
+from pylox.parser import Parser
+from pylox.scanner import CompactScanner
+
+
+def main(functions: int = 3_000) -> None:
+    tokens = CompactScanner(generated_program(functions)).scan_tokens()
+    elapsed, _ = best_of(3, lambda: Parser(tokens).parse())
+
+    gc.collect()
+    first = node_count()
+    tracemalloc.start()
+    ast = Parser(tokens).parse()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    nodes = node_count() - first
+
+    report(
+        f"Syntax tree of {len(ast):,} top-level statements",
+        [
+            ("nodes", f"{nodes:,}"),
+            (
+                "memory",
+                f"{size / 1024 / 1024:.1f} MB ({size / nodes:.0f} B/node)",
+            ),
+            ("parse", f"{elapsed:.3f}s"),
+        ],
+    )
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
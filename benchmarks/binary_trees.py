@@ -0,0 +1,81 @@
+"""
+Allocation and field access on many small objects: the binary-trees
+program, on every execution engine, with the memory held by one tree.
+
+Run from the repository root: `python -m benchmarks.binary_trees [depth]`.
+"""
+
+import io
+import sys
+import tracemalloc
+from contextlib import redirect_stdout
+
+from benchmarks.common import best_of, report
+from pylox.cli import ENGINES, Lox
+
+PROGRAM = """
+class Tree {
+  init(item, depth) {
+    this.item = item;
+    this.depth = depth;
+    if (depth > 0) {
+      var item2 = item + item;
+      depth = depth - 1;
+      this.left = Tree(item2 - 1, depth);
+      this.right = Tree(item2, depth);
+    } else {
+      this.left = nil;
+      this.right = nil;
+    }
+  }
+
+  check() {
+    if (this.left == nil) return this.item;
+    return this.item + this.left.check() - this.right.check();
+  }
+}
+
+var checks = 0;
+for (var i = 0; i < 4; i = i + 1) {
+  checks = checks + Tree(i, {depth}).check();
+}
+var tree = Tree(0, {depth});
+print checks + tree.check();
+"""
+
+
+def run(lox: Lox, src: str) -> str:
+    with io.StringIO() as buf, redirect_stdout(buf):
+        lox.run(src)
+        return buf.getvalue().strip()
+
+
+def retained(src: str, engine: str) -> int:
+    """Bytes still allocated once the program is done, i.e. by `tree`."""
+    lox = Lox(engine=engine)
+    tracemalloc.start()
+    try:
+        run(lox, src)
+        return tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+
+
+def main(depth: int = 12) -> None:
+    src = PROGRAM.replace("{depth}", str(depth))
+    rows = []
+    for engine in ENGINES:
+        elapsed, output = best_of(3, lambda: run(Lox(engine=engine), src))
+        memory = retained(src, engine)
+        rows.append(
+            (
+                engine,
+                f"{elapsed:.3f}s, {memory / 2**20:.1f} MiB retained "
+                f"(prints {output})",
+            )
+        )
+    report(f"Binary trees of depth {depth}", rows)
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
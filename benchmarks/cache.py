@@ -0,0 +1,37 @@
+"""
+Start-up cost of a large script: full front end vs the on-disk program cache.
+
+Run from the repository root: `python -m benchmarks.cache [functions]`.
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+from benchmarks.common import best_of, generated_program, report
+from pylox import cache
+from pylox.cli import Lox
+
+
+def main(functions: int = 3_000) -> None:
+    src = generated_program(functions)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "program.lox"
+        path.write_text(src)
+
+        compile_time, program = best_of(3, lambda: Lox().compile(src))
+        cache.store(path, src, program)
+        load_time, _ = best_of(3, lambda: cache.load(path, src))
+        size = cache.cache_path(path).stat().st_size
+
+    report(
+        f"Loading {src.count(chr(10)):,} lines before execution",
+        [
+            ("scan+parse+resolve", f"{compile_time * 1000:8.1f} ms"),
+            ("cache hit", f"{load_time * 1000:8.1f} ms ({size:,} bytes)"),
+        ],
+    )
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
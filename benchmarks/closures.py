@@ -0,0 +1,72 @@
+"""
+Memory that long-lived closures keep alive, and the time to make them, on
+the engines that keep locals in `Frame`s.
+
+Every closure is made by a call that also builds a chain of instances in a
+local the closure never reads.
+
+Run from the repository root: `python -m benchmarks.closures [closures]`.
+"""
+
+import gc
+import io
+import sys
+import tracemalloc
+from contextlib import redirect_stdout
+
+from benchmarks.common import best_of, report
+from pylox.cli import Lox
+
+ENGINES = ("tree", "closure")
+
+PROGRAM = """
+class Node { init(next) { this.next = next; } }
+class Keep { init(get, next) { this.get = get; this.next = next; } }
+fun make(n) {
+  var chain = nil;
+  for (var i = 0; i < 20; i = i + 1) chain = Node(chain);
+  fun get() { return n; }
+  return get;
+}
+var kept = nil;
+for (var k = 0; k < {closures}; k = k + 1) kept = Keep(make(k), kept);
+print kept.get();
+"""
+
+
+def run(src: str, engine: str) -> Lox:
+    lox = Lox(engine=engine)
+    with io.StringIO() as buf, redirect_stdout(buf):
+        lox.run(src)
+    return lox
+
+
+def retained(src: str, engine: str) -> int:
+    """Bytes still allocated once the program ran, with its globals alive."""
+    gc.collect()
+    tracemalloc.start()
+    lox = run(src, engine)
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del lox
+    return size
+
+
+def main(closures: int = 2_000) -> None:
+    src = PROGRAM.replace("{closures}", str(closures))
+    rows = []
+    for engine in ENGINES:
+        elapsed, _ = best_of(3, lambda: run(src, engine))
+        size = retained(src, engine)
+        rows.append(
+            (
+                engine,
+                f"{size / 1024 / 1024:.1f} MB retained, {elapsed:.3f}s",
+            )
+        )
+    report(f"Keeping {closures:,} closures alive", rows)
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,74 @@
+import sys
+import time
+import typing
+from pathlib import Path
+
+DATA_DIR = Path(__file__).parent.parent / "tests" / "data"
+
+
+def corpus(predicate: typing.Callable[[str], bool] = lambda _: True) -> str:
+    """Concatenate every `tests/data` script accepted by `predicate`."""
+    sources = [path.read_text() for path in sorted(DATA_DIR.rglob("*.lox"))]
+    return "\n".join(src for src in sources if predicate(src))
+
+
+def synthetic_source(size: int, chunk: str) -> str:
+    """Repeat `chunk` until the program is at least `size` characters long."""
+    return chunk * (size // len(chunk) + 1)
+
+
+def generated_program(functions: int) -> str:
+    """Build a program of `functions` small, independent top-level functions."""
+    return "".join(f"""
+fun f{i}(a, b) {{
+    // function number {i}
+    var x = a * {i} + b / 2;
+    if (x > {i}.5 and a != nil) {{
+        x = x - 1;
+    }} else {{
+        x = x + len("padding");
+    }}
+    for (var j = 0; j < 3; j = j + 1) {{
+        x = x + j;
+    }}
+    return x;
+}}
+print f{i}(1, 2);
+""" for i in range(functions))
+
+
+def best_of(
+    repeat: int, func: typing.Callable[[], typing.Any]
+) -> typing.Tuple[float, typing.Any]:
+    """Run `func` `repeat` times and return the fastest time with its result."""
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def python_calls(func: typing.Callable[[], typing.Any]) -> int:
+    """Count the Python function calls made by `func`."""
+    calls = 0
+
+    def profile(frame: typing.Any, event: str, arg: typing.Any) -> None:
+        nonlocal calls
+        if event == "call":
+            calls += 1
+
+    sys.setprofile(profile)
+    try:
+        func()
+    finally:
+        sys.setprofile(None)
+    return calls
+
+
+def report(title: str, rows: typing.List[typing.Tuple[str, str]]) -> None:
+    width = max(len(name) for name, _ in rows)
+    print(title)
+    for name, value in rows:
+        print(f"  {name.ljust(width)}  {value}")
@@ -0,0 +1,35 @@
+"""
+Run time of the whole `tests/data` corpus, script by script, on every
+execution engine.
+
+Run from the repository root: `python -m benchmarks.corpus [repeat]`.
+"""
+
+import io
+import sys
+from contextlib import redirect_stderr, redirect_stdout
+
+from benchmarks.common import DATA_DIR, best_of, report
+from pylox.cli import ENGINES, Lox
+
+SKIPPED = {"input.lox"}  # reads from stdin
+
+
+def run(sources: list, engine: str) -> None:
+    with io.StringIO() as buf, redirect_stdout(buf), redirect_stderr(buf):
+        for src in sources:
+            Lox(engine=engine).run(src)
+
+
+def main(repeat: int = 3) -> None:
+    paths = sorted(DATA_DIR.rglob("*.lox"))
+    sources = [path.read_text() for path in paths if path.name not in SKIPPED]
+    rows = []
+    for engine in ENGINES:
+        elapsed, _ = best_of(repeat, lambda: run(sources, engine))
+        rows.append((engine, f"{elapsed * 1000:8.1f} ms"))
+    report(f"Running {len(sources)} scripts from tests/data", rows)
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,60 @@
+"""
+Run time of a call-heavy program with and without devirtualization, on
+the engines that make direct calls, and the call sites it made direct.
+
+Run from the repository root: `python -m benchmarks.devirtualization [scale]`.
+"""
+
+import io
+import sys
+from contextlib import redirect_stdout
+
+from benchmarks.common import best_of, report
+from pylox.cli import Lox
+from pylox.optimizer import PASSES, Devirtualization, Optimizer
+
+PROGRAM = """
+fun fib(n) {
+  if (n < 2) return n;
+  return fib(n - 1) + fib(n - 2);
+}
+class Pair {
+  init(a, b) {
+    this.a = a;
+    this.b = b;
+  }
+}
+fun sum(pair) { return pair.a + pair.b; }
+var total = 0;
+for (var i = 0; i < {scale} * 1000; i = i + 1) {
+  total = total + sum(Pair(i, 1));
+}
+print fib(12 + {scale}) + total;
+"""
+
+
+def main(scale: int = 5) -> None:
+    src = PROGRAM.replace("{scale}", str(scale))
+    without = [p for p in PASSES if p is not Devirtualization]
+    rows = []
+    for engine in ("tree", "closure"):
+        for passes in (without, PASSES):
+            lox = Lox(engine=engine, optimize=True)
+            lox.optimizer = Optimizer(passes)
+            with io.StringIO() as buf, redirect_stdout(buf):
+                elapsed, _ = best_of(3, lambda: lox.run(src))
+            direct = Devirtualization in passes
+            rows.append((f"{engine}, direct={direct}", f"{elapsed:.3f}s"))
+
+    lox = Lox(optimize=True)
+    lox.compile(src)
+    assert lox.optimizer is not None
+    rows += [
+        (f"  {name.lexeme}", f"line {name.line}")
+        for name in lox.optimizer.devirtualized
+    ]
+    report("Running a call-heavy program", rows)
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,58 @@
+"""
+Run time of `for` loops, counting to a literal limit, which runs on a
+`range`, and to a variable one, on every execution engine.
+
+Run from the repository root: `python -m benchmarks.for_loops [scale]`.
+"""
+
+import io
+import sys
+from contextlib import redirect_stdout
+
+from benchmarks.common import best_of, report
+from pylox.cli import ENGINES, Lox
+
+PROGRAMS = {
+    "counted": """
+var total = 0;
+for (var i = 0; i < {scale} * 20000; i = i + 1) {
+  total = total + i;
+}
+print total;
+""",
+    "nested counted": """
+var total = 0;
+for (var i = 0; i < {scale} * 2000; i = i + 1) {
+  for (var j = 10; j > 0; j = j - 1) total = total + j;
+}
+print total;
+""",
+    "variable limit": """
+var total = 0;
+var limit = {scale} * 20000;
+for (var i = 0; i < limit; i = i + 1) {
+  total = total + i;
+}
+print total;
+""",
+}
+
+
+def run(src: str, engine: str) -> str:
+    with io.StringIO() as buf, redirect_stdout(buf):
+        Lox(engine=engine, optimize=True).run(src)
+        return buf.getvalue().strip()
+
+
+def main(scale: int = 5) -> None:
+    rows = []
+    for name, template in PROGRAMS.items():
+        src = template.replace("{scale}", str(scale))
+        for engine in ENGINES:
+            elapsed, output = best_of(3, lambda: run(src, engine))
+            rows.append((f"{name} ({engine})", f"{elapsed:.3f}s ({output})"))
+    report("Running for loops", rows)
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,65 @@
+"""
+Run time of programs that keep reading globals: top-level functions,
+builtins and variables, on every execution engine.
+
+Run from the repository root: `python -m benchmarks.globals [scale]`.
+"""
+
+import io
+import sys
+from contextlib import redirect_stdout
+
+from benchmarks.common import best_of, report
+from pylox.cli import ENGINES, Lox
+
+PROGRAMS = {
+    "top-level calls": """
+fun add(a, b) { return a + b; }
+var total = 0;
+var i = 0;
+while (i < {scale} * 4000) {
+  total = add(total, i);
+  i = i + 1;
+}
+print total;
+""",
+    "builtin calls": """
+var total = 0;
+var i = 0;
+while (i < {scale} * 4000) {
+  total = total + len("global");
+  i = i + 1;
+}
+print total;
+""",
+    "global variables": """
+var total = 0;
+var step = 2;
+var i = 0;
+while (i < {scale} * 4000) {
+  total = total + step;
+  i = i + 1;
+}
+print total;
+""",
+}
+
+
+def run(src: str, engine: str) -> str:
+    with io.StringIO() as buf, redirect_stdout(buf):
+        Lox(engine=engine, optimize=True).run(src)
+        return buf.getvalue().strip()
+
+
+def main(scale: int = 5) -> None:
+    rows = []
+    for name, template in PROGRAMS.items():
+        src = template.replace("{scale}", str(scale))
+        for engine in ENGINES:
+            elapsed, output = best_of(3, lambda: run(src, engine))
+            rows.append((f"{name} ({engine})", f"{elapsed:.3f}s ({output})"))
+    report("Running global lookups", rows)
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
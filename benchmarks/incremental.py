@@ -0,0 +1,47 @@
+"""
+Reloading a large script after a one character edit: full front end vs `IncrementalFrontEnd`.
+
+Run from the repository root: `python -m benchmarks.incremental [functions]`.
+"""
+
+import sys
+
+from benchmarks.common import best_of, generated_program, report
+from pylox.incremental import IncrementalFrontEnd
+from pylox.interpreter import Interpreter
+from pylox.parser import Parser
+from pylox.resolver import Resolver
+from pylox.scanner import Scanner
+
+
+def full_front_end(src: str) -> None:
+    statements = Parser(Scanner(src).scan_tokens()).parse()
+    Resolver(Interpreter()).resolve(statements)
+
+
+def main(functions: int = 3_500) -> None:
+    src = generated_program(functions)
+    front_end = IncrementalFrontEnd(src, Interpreter())
+    offset = src.index("var x = a * ", len(src) // 2) + len("var x = a * ")
+
+    full, _ = best_of(3, lambda: full_front_end(src))
+    # Alternate between two edits so that every run really changes the source.
+    edits = iter([(offset, offset + 1, "7"), (offset, offset + 1, "1")] * 5)
+    incremental, reparsed = best_of(5, lambda: front_end.edit(*next(edits)))
+
+    report(
+        f"Reloading {src.count(chr(10)):,} lines after a one character edit",
+        [
+            ("from scratch", f"{full * 1000:10.1f} ms"),
+            (
+                "incremental",
+                f"{incremental * 1000:10.1f} ms "
+                f"({len(reparsed)} of {len(front_end.statements)} "
+                "statements parsed again)",
+            ),
+        ],
+    )
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
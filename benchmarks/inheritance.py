@@ -0,0 +1,48 @@
+"""
+Method calls and instantiations through a deep inheritance chain, on every
+execution engine.
+
+Run from the repository root: `python -m benchmarks.inheritance [depth]`.
+"""
+
+import io
+import sys
+from contextlib import redirect_stdout
+
+from benchmarks.common import best_of, report
+from pylox.cli import ENGINES, Lox
+
+
+def chain(depth: int) -> str:
+    """Classes `C0` to `C{depth}`, only the root declares methods."""
+    classes = "class C0 { init(n) { this.n = n; } get() { return this.n; } }\n"
+    classes += "".join(
+        f"class C{i} < C{i - 1} {{}}\n" for i in range(1, depth + 1)
+    )
+    return classes + f"""
+var total = 0;
+for (var i = 0; i < 20000; i = i + 1) {{
+  var leaf = C{depth}(i);
+  total = total + leaf.get() + leaf.get();
+}}
+print total;
+"""
+
+
+def run(src: str, engine: str) -> str:
+    with io.StringIO() as buf, redirect_stdout(buf):
+        Lox(engine=engine).run(src)
+        return buf.getvalue().strip()
+
+
+def main(depth: int = 10) -> None:
+    src = chain(depth)
+    rows = []
+    for engine in ENGINES:
+        elapsed, output = best_of(3, lambda: run(src, engine))
+        rows.append((engine, f"{elapsed:.3f}s (prints {output})"))
+    report(f"Calling methods through {depth} levels of inheritance", rows)
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,123 @@
+"""
+Run time of Lox programs heavy on variables, calls and objects, on every
+execution engine.
+
+Run from the repository root: `python -m benchmarks.interpreter [scale]`.
+"""
+
+import io
+import sys
+from contextlib import redirect_stdout
+
+from benchmarks.common import best_of, python_calls, report
+from pylox.cli import ENGINES, Lox
+
+PROGRAMS = {
+    "fib": """
+fun fib(n) {
+  if (n < 2) return n;
+  return fib(n - 1) + fib(n - 2);
+}
+print fib({scale} + 15);
+""",
+    "loop": """
+fun sum(n) {
+  var total = 0;
+  for (var i = 0; i < n; i = i + 1) {
+    var square = i * i;
+    total = total + square - i;
+  }
+  return total;
+}
+print sum({scale} * 20000);
+""",
+    "nested": """
+fun outer(a, b) {
+  var c = a + b;
+  {
+    var d = c;
+    {
+      var sum = 0;
+      var i = 0;
+      while (i < {scale} * 10000) {
+        sum = sum + a + b + c + d;
+        i = i + 1;
+      }
+      return sum;
+    }
+  }
+}
+print outer(1, 2);
+""",
+    "closure": """
+fun counter() {
+  var count = 0;
+  fun increment() { count = count + 1; return count; }
+  return increment;
+}
+var next = counter();
+var last = 0;
+for (var i = 0; i < {scale} * 10000; i = i + 1) last = next();
+print last;
+""",
+    "method": """
+class Counter {
+  init() { this.count = 0; }
+  add(n) { this.count = this.count + n; return this; }
+}
+var counter = Counter();
+for (var i = 0; i < {scale} * 10000; i = i + 1) counter.add(i);
+print counter.count;
+""",
+    "inherited": """
+class Shape {
+  area() { return this.w * this.h; }
+}
+class Rectangle < Shape {}
+class Square < Rectangle {
+  init(side) { this.w = side; this.h = side; }
+}
+var square = Square(3);
+var total = 0;
+for (var i = 0; i < {scale} * 10000; i = i + 1) total = total + square.area();
+print total;
+""",
+    "instantiate": """
+class Point {
+  init(x, y) { this.x = x; this.y = y; }
+}
+class Point3 < Point {
+  init(x, y, z) { super.init(x, y); this.z = z; }
+}
+var last = nil;
+for (var i = 0; i < {scale} * 4000; i = i + 1) last = Point3(i, i, i);
+print last.z;
+""",
+}
+
+
+def run(src: str, engine: str) -> str:
+    with io.StringIO() as buf, redirect_stdout(buf):
+        Lox(engine=engine).run(src)
+        return buf.getvalue().strip()
+
+
+def main(scale: int = 5) -> None:
+    rows = []
+    for name, template in PROGRAMS.items():
+        src = template.replace("{scale}", str(scale))
+        for engine in ENGINES:
+            elapsed, output = best_of(3, lambda: run(src, engine))
+            calls = python_calls(lambda: run(src, engine))
+            rows.append(
+                (
+                    f"{name} ({engine})",
+                    f"{elapsed:.3f}s, {calls:,} Python calls "
+                    f"(prints {output})",
+                )
+            )
+    report("Interpreting Lox programs", rows)
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
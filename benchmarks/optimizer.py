@@ -0,0 +1,51 @@
+"""
+Run time of a constant-heavy program with and without the optimizer, and
+what each pass changed in it.
+
+Run from the repository root: `python -m benchmarks.optimizer [scale]`.
+"""
+
+import io
+import sys
+from contextlib import redirect_stdout
+
+from benchmarks.common import best_of, report
+from pylox.cli import Lox
+
+PROGRAM = """
+fun area(r) {
+  var pi = 3 + 0.14159;
+  if (false) print "debugging";
+  var total = 0;
+  for (var i = 0; i < {scale} * 2000; i = i + 1) {
+    total = total + pi * r * r * (60 * 60 * 24) / (1000 * 1000);
+    if (1 > 2 or nil) { print "never"; }
+  }
+  return total;
+  print "unreachable";
+}
+print area(2);
+"""
+
+
+def main(scale: int = 5) -> None:
+    src = PROGRAM.replace("{scale}", str(scale))
+    rows = []
+    for optimize in (False, True):
+        lox = Lox(optimize=optimize)
+        with io.StringIO() as buf, redirect_stdout(buf):
+            elapsed, _ = best_of(3, lambda: lox.run(src))
+        rows.append((f"optimize={optimize}", f"{elapsed:.3f}s"))
+
+    lox = Lox(optimize=True)
+    lox.compile(src)
+    assert lox.optimizer is not None
+    rows += [
+        (f"  {name}", f"{count} changes")
+        for name, count in lox.optimizer.stats.items()
+    ]
+    report("Running a constant-heavy program", rows)
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,45 @@
+"""
+Parser throughput: recursive descent `Parser` vs precedence climbing `PrattParser`.
+
+Run from the repository root: `python -m benchmarks.parser [size in MB]`.
+"""
+
+import sys
+
+from benchmarks.common import (
+    best_of,
+    python_calls,
+    report,
+    synthetic_source,
+)
+from pylox.parser import PARSERS
+from pylox.scanner import CompactScanner
+
+EXPRESSIONS = """
+var total = a * (b + c) - d / 2 >= limit and !done or retries == 0;
+print x.y.z(1, 2 + 3, "four") + -count * 10.5;
+result = left < right != (mid <= 4) and f(g(h(i)));
+"""
+
+
+def main(size_mb: float = 1.0) -> None:
+    src = synthetic_source(int(size_mb * 1024 * 1024), EXPRESSIONS)
+    tokens = CompactScanner(src).scan_tokens()
+    sample = CompactScanner(EXPRESSIONS * 10).scan_tokens()
+
+    rows = []
+    for name, parser in PARSERS.items():
+        elapsed, _ = best_of(3, lambda: parser(tokens).parse())
+        calls = python_calls(lambda: parser(sample).parse())
+        rows.append(
+            (
+                name,
+                f"{len(tokens) / elapsed:12,.0f} tokens/s "
+                f"({elapsed:.3f}s, {calls / len(sample):.1f} calls/token)",
+            )
+        )
+    report(f"Parsing {len(tokens):,} tokens of expression-heavy Lox", rows)
+
+
+if __name__ == "__main__":
+    main(*map(float, sys.argv[1:]))
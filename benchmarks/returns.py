@@ -0,0 +1,62 @@
+"""
+Function returns and loop exits: recursive fib, where nearly every statement
+run ends in a `return`, and a search leaving nested loops early, on every
+execution engine.
+
+Run from the repository root: `python -m benchmarks.returns [n]`.
+"""
+
+import io
+import sys
+from contextlib import redirect_stdout
+
+from benchmarks.common import best_of, report
+from pylox.cli import ENGINES, Lox
+
+PROGRAMS = {
+    "recursive fib": """
+fun fib(n) {
+  if (n < 2) return n;
+  return fib(n - 1) + fib(n - 2);
+}
+print fib({n} + 5);
+""",
+    "early exits": """
+fun find(limit, target) {
+  for (var i = 0; i < limit; i = i + 1) {
+    var j = 0;
+    while (true) {
+      if (j == i) break;
+      if (i * j == target) return j;
+      j = j + 1;
+    }
+  }
+  return nil;
+}
+var found = 0;
+for (var k = 0; k < {n} * 20; k = k + 1) {
+  if (find(30, k) != nil) found = found + 1;
+}
+print found;
+""",
+}
+
+
+def run(src: str, engine: str) -> str:
+    with io.StringIO() as buf, redirect_stdout(buf):
+        Lox(engine=engine).run(src)
+        return buf.getvalue().strip()
+
+
+def main(n: int = 20) -> None:
+    rows = []
+    for name, template in PROGRAMS.items():
+        src = template.replace("{n}", str(n))
+        for engine in ENGINES:
+            elapsed, output = best_of(5, lambda: run(src, engine))
+            rows.append((f"{name} ({engine})", f"{elapsed:.3f}s ({output})"))
+    report("Returning from calls and breaking out of loops", rows)
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,38 @@
+"""
+Lexer throughput: classic per-character `Scanner` vs master-pattern `RegexScanner`.
+
+Run from the repository root: `python -m benchmarks.scanner [size in MB]`.
+"""
+
+import sys
+
+from benchmarks.common import best_of, corpus, report, synthetic_source
+from pylox.error import LoxSyntaxError
+from pylox.scanner import SCANNERS
+
+
+def scans_cleanly(src: str) -> bool:
+    try:
+        SCANNERS["classic"](src).scan_tokens()
+        return True
+    except LoxSyntaxError:
+        return False
+
+
+def main(size_mb: float = 2.0) -> None:
+    src = synthetic_source(int(size_mb * 1024 * 1024), corpus(scans_cleanly))
+    rows = []
+    for name, scanner in SCANNERS.items():
+        elapsed, tokens = best_of(3, lambda: scanner(src).scan_tokens())
+        rows.append(
+            (
+                name,
+                f"{len(tokens) / elapsed:12,.0f} tokens/s "
+                f"({elapsed:.3f}s for {len(tokens):,} tokens)",
+            )
+        )
+    report(f"Scanning {len(src) / 1024 / 1024:.1f} MB of Lox", rows)
+
+
+if __name__ == "__main__":
+    main(*map(float, sys.argv[1:]))
@@ -0,0 +1,57 @@
+"""
+Frames allocated while running the whole `tests/data` corpus, and its run
+time, on the engines that keep locals in `Frame`s.
+
+Run from the repository root: `python -m benchmarks.scopes`.
+"""
+
+import io
+import sys
+import typing
+from contextlib import redirect_stderr, redirect_stdout
+
+from benchmarks.common import DATA_DIR, best_of, report
+from pylox.cli import Lox
+from pylox.environment import Frame
+
+SKIPPED = {"input.lox"}  # reads from stdin
+ENGINES = ("tree", "closure")
+
+
+def run(sources: list, engine: str) -> None:
+    with io.StringIO() as buf, redirect_stdout(buf), redirect_stderr(buf):
+        for src in sources:
+            Lox(engine=engine).run(src)
+
+
+def frames_made(func: typing.Callable[[], typing.Any]) -> int:
+    """Count the `Frame`s created by `func`."""
+    init = Frame.__init__.__code__
+    frames = 0
+
+    def profile(frame: typing.Any, event: str, arg: typing.Any) -> None:
+        nonlocal frames
+        if event == "call" and frame.f_code is init:
+            frames += 1
+
+    sys.setprofile(profile)
+    try:
+        func()
+    finally:
+        sys.setprofile(None)
+    return frames
+
+
+def main(repeat: int = 3) -> None:
+    paths = sorted(DATA_DIR.rglob("*.lox"))
+    sources = [path.read_text() for path in paths if path.name not in SKIPPED]
+    rows = []
+    for engine in ENGINES:
+        elapsed, _ = best_of(repeat, lambda: run(sources, engine))
+        frames = frames_made(lambda: run(sources, engine))
+        rows.append((engine, f"{frames:,} frames, {elapsed * 1000:.1f} ms"))
+    report(f"Running {len(sources)} scripts from tests/data", rows)
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,47 @@
+"""
+Memory and throughput of a `list[Token]` vs the struct-of-arrays `TokenBuffer`.
+
+Run from the repository root: `python -m benchmarks.token_buffer [functions]`.
+"""
+
+import sys
+import tracemalloc
+
+from benchmarks.common import best_of, generated_program, report
+from pylox.parser import Parser
+from pylox.scanner import CompactScanner, RegexScanner
+
+
+def retained_memory(func) -> int:
+    tracemalloc.start()
+    try:
+        result = func()
+        size, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    return size
+
+
+def main(functions: int = 3_000) -> None:
+    src = generated_program(functions)
+    rows = [("source", f"{len(src) / 1024 / 1024:8.1f} MB")]
+    for name, scanner in (("list", RegexScanner), ("buffer", CompactScanner)):
+        size = retained_memory(lambda: scanner(src).scan_tokens())
+        scan_time, tokens = best_of(3, lambda: scanner(src).scan_tokens())
+        parse_time, _ = best_of(
+            3, lambda: Parser(scanner(src).scan_tokens()).parse()
+        )
+        rows.append(
+            (
+                name,
+                f"{size / 1024 / 1024:8.1f} MB for {len(tokens):,} tokens, "
+                f"scan {len(tokens) / scan_time:10,.0f} tokens/s, "
+                f"scan+parse {parse_time:.3f}s",
+            )
+        )
+    report("Token storage", rows)
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
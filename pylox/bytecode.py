@@ -0,0 +1,654 @@
+import typing
+
+import pylox.expr as expr_ast
+import pylox.stmt as stmt_ast
+from pylox.error import LoxParseError
+from pylox.expr import Expr, ExprVisitor
+from pylox.interpreter import DECLARATION_T
+from pylox.scanner import Token, TokenType
+from pylox.stmt import Stmt, StmtVisitor
+
+# Every instruction is two ints in `Function.code`: an opcode and an operand,
+# which is 0 when the opcode does not need one.
+OPCODES = (
+    "CONSTANT",
+    "POP",
+    "DUP",
+    "GET_LOCAL",
+    "SET_LOCAL",
+    "DEFINE_LOCAL",
+    "GET_CELL",
+    "SET_CELL",
+    "DEFINE_CELL",
+    "NEW_CELL",
+    "GET_UPVALUE",
+    "SET_UPVALUE",
+    "GET_GLOBAL",
+    "SET_GLOBAL",
+    "DEFINE_GLOBAL",
+    "GET_PROPERTY",
+    "SET_PROPERTY",
+    "CHECK_INSTANCE",
+    "GET_METHOD",
+    "GET_SUPER",
+    "EQUAL",
+    "NOT_EQUAL",
+    "GREATER",
+    "GREATER_EQUAL",
+    "LESS",
+    "LESS_EQUAL",
+    "ADD",
+    "SUBTRACT",
+    "MULTIPLY",
+    "DIVIDE",
+    "NOT",
+    "NEGATE",
+    "PRINT",
+    "JUMP",
+    "POP_JUMP_IF_FALSE",
+    "JUMP_IF_FALSE_OR_POP",
+    "JUMP_IF_TRUE_OR_POP",
+    "CALL",
+    "CALL_METHOD",
+    "CLOSURE",
+    "RETURN",
+    "CLASS",
+    "SUBCLASS",
+    "METHOD",
+)
+(
+    CONSTANT,
+    POP,
+    DUP,
+    GET_LOCAL,
+    SET_LOCAL,
+    DEFINE_LOCAL,
+    GET_CELL,
+    SET_CELL,
+    DEFINE_CELL,
+    NEW_CELL,
+    GET_UPVALUE,
+    SET_UPVALUE,
+    GET_GLOBAL,
+    SET_GLOBAL,
+    DEFINE_GLOBAL,
+    GET_PROPERTY,
+    SET_PROPERTY,
+    CHECK_INSTANCE,
+    GET_METHOD,
+    GET_SUPER,
+    EQUAL,
+    NOT_EQUAL,
+    GREATER,
+    GREATER_EQUAL,
+    LESS,
+    LESS_EQUAL,
+    ADD,
+    SUBTRACT,
+    MULTIPLY,
+    DIVIDE,
+    NOT,
+    NEGATE,
+    PRINT,
+    JUMP,
+    POP_JUMP_IF_FALSE,
+    JUMP_IF_FALSE_OR_POP,
+    JUMP_IF_TRUE_OR_POP,
+    CALL,
+    CALL_METHOD,
+    CLOSURE,
+    RETURN,
+    CLASS,
+    SUBCLASS,
+    METHOD,
+) = range(len(OPCODES))
+
+# A local that a closure captures lives in a cell, shared with the closure.
+CELL_OPCODES = {
+    GET_LOCAL: GET_CELL,
+    SET_LOCAL: SET_CELL,
+    DEFINE_LOCAL: DEFINE_CELL,
+}
+
+# opcodes whose operand is an index in `Function.constants`
+CONSTANT_OPCODES = {
+    CONSTANT,
+    DEFINE_GLOBAL,
+    GET_PROPERTY,
+    SET_PROPERTY,
+    CHECK_INSTANCE,
+    GET_METHOD,
+    GET_SUPER,
+    CLOSURE,
+    CLASS,
+    SUBCLASS,
+    METHOD,
+}
+
+BINARY_OPCODES = {
+    TokenType.EQUAL_EQUAL: EQUAL,
+    TokenType.BANG_EQUAL: NOT_EQUAL,
+    TokenType.GREATER: GREATER,
+    TokenType.GREATER_EQUAL: GREATER_EQUAL,
+    TokenType.LESS: LESS,
+    TokenType.LESS_EQUAL: LESS_EQUAL,
+    TokenType.PLUS: ADD,
+    TokenType.MINUS: SUBTRACT,
+    TokenType.STAR: MULTIPLY,
+    TokenType.SLASH: DIVIDE,
+}
+
+
+class Function:
+    """Compiled code of a function or of a whole script."""
+
+    __slots__ = (
+        "name",
+        "arity",
+        "code",
+        "lines",
+        "constants",
+        "size",
+        "cells",
+        "upvalues",
+    )
+
+    def __init__(self, name: str, arity: int) -> None:
+        self.name = name
+        self.arity = arity
+        self.code: typing.List[int] = []
+        self.lines: typing.List[int] = []  # one per instruction
+        self.constants: typing.List[typing.Any] = []
+        self.size = 0  # number of local slots, the receiver included
+        # parameter slots to wrap in a cell when called
+        self.cells: typing.Tuple[int, ...] = ()
+        # for each captured variable: a local slot of the enclosing function
+        # (True) or one of its upvalues (False)
+        self.upvalues: typing.Tuple[typing.Tuple[bool, int], ...] = ()
+
+    def line(self, ip: int) -> int:
+        """Source line of the instruction that ends at `ip`."""
+        return self.lines[ip // 2 - 1]
+
+
+class Scope:
+    """
+    Compile time view of one resolver scope.
+
+    Its slots are the local slots `base` to `base + size` of the function that
+    owns it.
+    """
+
+    __slots__ = (
+        "owner",
+        "base",
+        "size",
+        "params",
+        "declared",
+        "captured",
+        "uses",
+    )
+
+    def __init__(
+        self, owner: "FunctionState", base: int, size: int, params: int = 0
+    ) -> None:
+        self.owner = owner
+        self.base = base
+        self.size = size
+        self.params = params  # leading slots filled by the call
+        self.declared: typing.Set[int] = set(range(params))
+        self.captured: typing.Set[int] = set()
+        # where each uncaptured slot is accessed, to patch if it gets captured
+        self.uses: typing.Dict[int, typing.List[int]] = {}
+
+    def capture(self, slot: int) -> None:
+        if slot in self.captured:
+            return
+        self.captured.add(slot)
+        code = self.owner.function.code
+        for pos in self.uses.pop(slot, ()):
+            code[pos] = CELL_OPCODES[code[pos]]
+        if slot < self.params:
+            self.owner.cells.add(self.base + slot)
+
+
+class FunctionState:
+    """What the compiler tracks while it compiles one function."""
+
+    def __init__(
+        self,
+        function: Function,
+        enclosing: typing.Optional["FunctionState"] = None,
+        initializer: bool = False,
+    ) -> None:
+        self.function = function
+        self.enclosing = enclosing
+        self.initializer = initializer
+        self.cells: typing.Set[int] = set()
+        self.constants: typing.Dict[typing.Any, int] = {}
+        self.upvalues: typing.Dict[typing.Tuple[bool, int], int] = {}
+        self.loops: typing.List[typing.List[int]] = []  # pending breaks
+        self.this: typing.Optional[Scope] = None
+
+    def upvalue(self, key: typing.Tuple[bool, int]) -> int:
+        if key not in self.upvalues:
+            self.upvalues[key] = len(self.upvalues)
+        return self.upvalues[key]
+
+    def finish(self) -> Function:
+        self.function.cells = tuple(sorted(self.cells))
+        self.function.upvalues = tuple(self.upvalues)
+        return self.function
+
+
+class Compiler(ExprVisitor, StmtVisitor):
+    """
+    Compiles resolved statements to bytecode for the `pylox.vm.VM`.
+
+    The scopes of a function, with the blocks in it, are laid out in a single
+    array of local slots, using the slots the `Resolver` assigned in each
+    scope. Locals of enclosing functions are reached through upvalues, much
+    like in clox, but a captured local is kept in a cell from the start.
+    """
+
+    def __init__(self) -> None:
+        self.state = FunctionState(Function("script", 0))
+        self.scopes: typing.List[Scope] = []
+
+    def compile(self, statements: typing.List[Stmt]) -> Function:
+        for stmt in statements:
+            stmt.accept(self)
+        self.emit(CONSTANT, self.constant(None))
+        self.emit(RETURN)
+        return self.state.finish()
+
+    def compile_expr(self, expr: Expr) -> Function:
+        expr.accept(self)
+        self.emit(RETURN)
+        return self.state.finish()
+
+    # emitting
+
+    def emit(self, op: int, operand: int = 0, line: int = 0) -> int:
+        code = self.state.function.code
+        code.append(op)
+        code.append(operand)
+        self.state.function.lines.append(line)
+        return len(code) - 2
+
+    def emit_jump(self, op: int, line: int = 0) -> int:
+        return self.emit(op, -1, line)
+
+    def patch_jump(self, pos: int) -> None:
+        code = self.state.function.code
+        code[pos + 1] = len(code)
+
+    def constant(self, value: typing.Any) -> int:
+        constants = self.state.function.constants
+        if isinstance(value, (Token, Function)):
+            constants.append(value)
+            return len(constants) - 1
+
+        # 1.0 == True, so the type is a part of the key
+        key = (type(value), value)
+        indexes = self.state.constants
+        if key not in indexes:
+            indexes[key] = len(constants)
+            constants.append(value)
+        return indexes[key]
+
+    # scopes and variables
+
+    def begin_scope(self, size: int, params: int = 0) -> Scope:
+        base = 0
+        if self.scopes and self.scopes[-1].owner is self.state:
+            base = self.scopes[-1].base + self.scopes[-1].size
+        scope = Scope(self.state, base, size, params)
+        self.scopes.append(scope)
+        function = self.state.function
+        function.size = max(function.size, base + size)
+        return scope
+
+    def emit_local(self, op: int, scope: Scope, slot: int, line: int) -> None:
+        if slot in scope.captured:
+            self.emit(CELL_OPCODES[op], scope.base + slot, line)
+        else:
+            pos = self.emit(op, scope.base + slot, line)
+            scope.uses.setdefault(slot, []).append(pos)
+
+    def resolve_upvalue(
+        self, state: FunctionState, scope: Scope, slot: int
+    ) -> int:
+        enclosing = typing.cast(FunctionState, state.enclosing)
+        if enclosing is scope.owner:
+            return state.upvalue((True, scope.base + slot))
+        return state.upvalue(
+            (False, self.resolve_upvalue(enclosing, scope, slot))
+        )
+
+    def variable(
+        self, local_op: int, upvalue_op: int, depth: int, slot: int, line: int
+    ) -> None:
+        scope = self.scopes[-1 - depth]
+        if scope.owner is self.state:
+            self.emit_local(local_op, scope, slot, line)
+        else:
+            scope.capture(slot)
+            upvalue = self.resolve_upvalue(self.state, scope, slot)
+            self.emit(upvalue_op, upvalue, line)
+
+    def load(self, depth: int, slot: int, line: int) -> None:
+        self.variable(GET_LOCAL, GET_UPVALUE, depth, slot, line)
+
+    def predeclare(self, declaration: DECLARATION_T) -> None:
+        """Give a captured local its cell before closures over it are made."""
+        slot = declaration.slot
+        if slot is None:
+            return
+        scope = self.scopes[-1]
+        if slot in scope.captured and slot not in scope.declared:
+            scope.declared.add(slot)
+            self.emit(NEW_CELL, scope.base + slot, declaration.name.line)
+
+    def declare(self, declaration: DECLARATION_T) -> None:
+        """Store the value on top of the stack in the declared variable."""
+        line = declaration.name.line
+        slot = declaration.slot
+        if slot is None:
+            self.emit(DEFINE_GLOBAL, self.constant(declaration.name), line)
+            return
+
+        scope = self.scopes[-1]
+        if slot in scope.declared:  # redeclared, it is the same variable
+            self.emit_local(SET_LOCAL, scope, slot, line)
+            self.emit(POP)
+        else:
+            scope.declared.add(slot)
+            self.emit_local(DEFINE_LOCAL, scope, slot, line)
+
+    def function(
+        self,
+        stmt: stmt_ast.Function,
+        method: bool = False,
+        initializer: bool = False,
+    ) -> Function:
+        """Compile the body of `stmt` to a separate `Function`."""
+        state = FunctionState(
+            Function(stmt.name.lexeme, len(stmt.params)),
+            self.state,
+            initializer,
+        )
+        enclosing_state, self.state = self.state, state
+        if method:
+            state.this = self.begin_scope(1, params=1)
+        # scopes that declare nothing have no frame, depths skip them
+        framed = stmt.frame_size > 0
+        if framed:
+            self.begin_scope(stmt.frame_size, params=len(stmt.params))
+
+        for body_stmt in stmt.body:
+            body_stmt.accept(self)
+        self.emit_return(stmt.name.line)
+
+        if framed:
+            self.scopes.pop()
+        if method:
+            self.scopes.pop()
+        self.state = enclosing_state
+        return state.finish()
+
+    def emit_return(self, line: int) -> None:
+        this = self.state.this
+        if self.state.initializer and this is not None:
+            self.emit_local(GET_LOCAL, this, 0, line)
+        else:
+            self.emit(CONSTANT, self.constant(None), line)
+        self.emit(RETURN, 0, line)
+
+    # expressions
+
+    def visit_literal_expr(self, expr: expr_ast.Literal) -> None:
+        self.emit(CONSTANT, self.constant(expr.value))
+
+    def visit_grouping_expr(self, expr: expr_ast.Grouping) -> None:
+        expr.expr.accept(self)
+
+    def visit_unary_expr(self, expr: expr_ast.Unary) -> None:
+        expr.right.accept(self)
+        op = expr.operator
+        if op.token_type is TokenType.MINUS:
+            self.emit(NEGATE, 0, op.line)
+        elif op.token_type is TokenType.BANG:
+            self.emit(NOT, 0, op.line)
+        else:
+            raise LoxParseError(
+                op, f'Unknown operator for unary operation -- "{op.lexeme}"!'
+            )
+
+    def visit_binary_expr(self, expr: expr_ast.Binary) -> None:
+        expr.left.accept(self)
+        expr.right.accept(self)
+        op = expr.operator
+        if op.token_type not in BINARY_OPCODES:
+            raise LoxParseError(
+                op, f'Unknown operator for binary operation -- "{op.lexeme}"!'
+            )
+        self.emit(BINARY_OPCODES[op.token_type], 0, op.line)
+
+    def visit_logical_expr(self, expr: expr_ast.Logical) -> None:
+        expr.left.accept(self)
+        op = expr.operator
+        if op.token_type is TokenType.OR:
+            jump = self.emit_jump(JUMP_IF_TRUE_OR_POP, op.line)
+        elif op.token_type is TokenType.AND:
+            jump = self.emit_jump(JUMP_IF_FALSE_OR_POP, op.line)
+        else:
+            raise LoxParseError(op, f"Unknown logical operator {op.lexeme}")
+        expr.right.accept(self)
+        self.patch_jump(jump)
+
+    def visit_variable_expr(self, expr: expr_ast.Variable) -> None:
+        line = expr.name.line
+        if expr.depth is None:
+            self.emit(GET_GLOBAL, expr.slot, line)  # a slot of `Globals`
+        else:
+            self.load(expr.depth, expr.slot, line)
+
+    def visit_assign_expr(self, expr: expr_ast.Assign) -> None:
+        expr.value.accept(self)
+        line = expr.name.line
+        if expr.depth is None:
+            self.emit(SET_GLOBAL, expr.slot, line)
+        else:
+            self.variable(SET_LOCAL, SET_UPVALUE, expr.depth, expr.slot, line)
+
+    def visit_this_expr(self, expr: expr_ast.This) -> None:
+        self.load(typing.cast(int, expr.depth), expr.slot, expr.keyword.line)
+
+    def visit_super_expr(self, expr: expr_ast.Super) -> None:
+        depth = typing.cast(int, expr.depth)
+        line = expr.keyword.line
+        # `this` is the only variable of the scope right inside `super`'s
+        self.load(depth - 1, 0, line)
+        self.load(depth, expr.slot, line)
+        self.emit(GET_SUPER, self.constant(expr.method), expr.method.line)
+
+    def visit_call_expr(self, expr: expr_ast.Call) -> None:
+        callee = expr.callee
+        if isinstance(callee, expr_ast.Get):
+            # the method is called without creating a bound method
+            callee.obj.accept(self)
+            self.emit(GET_METHOD, self.constant(callee.name), callee.name.line)
+            op = CALL_METHOD
+        else:
+            callee.accept(self)
+            op = CALL
+
+        for argument in expr.arguments:
+            argument.accept(self)
+        self.emit(op, len(expr.arguments), expr.paren.line)
+
+    def visit_get_expr(self, expr: expr_ast.Get) -> None:
+        expr.obj.accept(self)
+        self.emit(GET_PROPERTY, self.constant(expr.name), expr.name.line)
+
+    def visit_set_expr(self, expr: expr_ast.Set) -> None:
+        expr.obj.accept(self)
+        name = self.constant(expr.name)
+        line = expr.name.line
+        # The object is checked before the value is evaluated, unless the
+        # value can have no effect anyway.
+        if not isinstance(expr.value, expr_ast.Literal) and not (
+            isinstance(expr.value, expr_ast.Variable)
+            and expr.value.depth is not None
+        ):
+            self.emit(CHECK_INSTANCE, name, line)
+        expr.value.accept(self)
+        self.emit(SET_PROPERTY, name, line)
+
+    # statements
+
+    def visit_expression_stmt(self, stmt: stmt_ast.Expression) -> None:
+        stmt.expr.accept(self)
+        self.emit(POP)
+
+    def visit_print_stmt(self, stmt: stmt_ast.Print) -> None:
+        stmt.expr.accept(self)
+        self.emit(PRINT)
+
+    def visit_var_stmt(self, stmt: stmt_ast.Var) -> None:
+        if stmt.initializer is None:
+            self.emit(CONSTANT, self.constant(None))
+        else:
+            stmt.initializer.accept(self)
+        self.declare(stmt)
+
+    def visit_block_stmt(self, stmt: stmt_ast.Block) -> None:
+        if stmt.frame_size:
+            self.begin_scope(stmt.frame_size)
+        for block_stmt in stmt.statements:
+            block_stmt.accept(self)
+        if stmt.frame_size:
+            self.scopes.pop()
+
+    def visit_if_stmt(self, stmt: stmt_ast.If) -> None:
+        stmt.condition.accept(self)
+        then_jump = self.emit_jump(POP_JUMP_IF_FALSE)
+        stmt.then_branch.accept(self)
+        if stmt.else_branch is None:
+            self.patch_jump(then_jump)
+            return
+
+        else_jump = self.emit_jump(JUMP)
+        self.patch_jump(then_jump)
+        stmt.else_branch.accept(self)
+        self.patch_jump(else_jump)
+
+    def visit_while_stmt(self, stmt: stmt_ast.While) -> None:
+        start = len(self.state.function.code)
+        stmt.condition.accept(self)
+        exit_jump = self.emit_jump(POP_JUMP_IF_FALSE)
+
+        self.state.loops.append([exit_jump])
+        stmt.body.accept(self)
+        self.emit(JUMP, start)
+
+        for jump in self.state.loops.pop():
+            self.patch_jump(jump)
+
+    def visit_for_stmt(self, stmt: stmt_ast.For) -> None:
+        if stmt.frame_size:
+            self.begin_scope(stmt.frame_size)
+        if stmt.initializer is not None:
+            stmt.initializer.accept(self)
+
+        start = len(self.state.function.code)
+        exits = []
+        if stmt.condition is not None:
+            stmt.condition.accept(self)
+            exits.append(self.emit_jump(POP_JUMP_IF_FALSE))
+
+        self.state.loops.append(exits)
+        stmt.body.accept(self)
+        if stmt.increment is not None:
+            stmt.increment.accept(self)
+            self.emit(POP)
+        self.emit(JUMP, start)
+
+        for jump in self.state.loops.pop():
+            self.patch_jump(jump)
+        if stmt.frame_size:
+            self.scopes.pop()
+
+    def visit_break_stmt(self, stmt: stmt_ast.Break) -> None:
+        if not self.state.loops:
+            raise LoxParseError(
+                stmt.keyword, "Must be inside a loop to use 'break'."
+            )
+        self.state.loops[-1].append(self.emit_jump(JUMP))
+
+    def visit_return_stmt(self, stmt: stmt_ast.Return) -> None:
+        line = stmt.keyword.line
+        if stmt.value is None:
+            self.emit_return(line)
+        else:
+            stmt.value.accept(self)
+            self.emit(RETURN, 0, line)
+
+    def visit_function_stmt(self, stmt: stmt_ast.Function) -> None:
+        function = self.function(stmt)
+        self.predeclare(stmt)
+        self.emit(CLOSURE, self.constant(function), stmt.name.line)
+        self.declare(stmt)
+
+    def visit_class_stmt(self, stmt: stmt_ast.Class) -> None:
+        line = stmt.name.line
+        superclass = stmt.superclass
+
+        # Methods come first: they tell which variables are captured.
+        super_scope = None
+        if superclass is not None:
+            super_scope = self.begin_scope(1)
+        methods = [
+            self.function(
+                method, method=True, initializer=method.name.lexeme == "init"
+            )
+            for method in stmt.methods
+        ]
+        if super_scope is not None:
+            self.scopes.pop()
+
+        self.predeclare(stmt)
+        name = self.constant(stmt.name.lexeme)
+        if superclass is None or super_scope is None:
+            self.emit(CLASS, name, line)
+        else:
+            superclass.accept(self)
+            self.emit(DUP)
+            super_scope.declared.add(0)
+            self.emit_local(DEFINE_LOCAL, super_scope, 0, line)
+            self.emit(SUBCLASS, name, superclass.name.line)
+
+        for method, function in zip(stmt.methods, methods):
+            self.emit(CLOSURE, self.constant(function), method.name.line)
+            self.emit(METHOD, self.constant(method.name.lexeme))
+
+        self.declare(stmt)
+
+
+def disassemble(function: Function) -> typing.List[str]:
+    """Human readable listing of the instructions of `function`."""
+    code = function.code
+    listing = []
+    for ip in range(0, len(code), 2):
+        op, operand = code[ip], code[ip + 1]
+        text = f"{ip:04} {OPCODES[op]} {operand}"
+        if op in CONSTANT_OPCODES:
+            constant = function.constants[operand]
+            if isinstance(constant, Token):
+                constant = constant.lexeme
+            elif isinstance(constant, Function):
+                constant = f"<fn {constant.name}>"
+            text += f" ({constant!r})"
+        listing.append(text)
+    return listing
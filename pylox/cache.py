@@ -0,0 +1,95 @@
+import gc
+import hashlib
+import os
+import pickle
+import tempfile
+import typing
+from pathlib import Path
+
+from pylox.environment import Globals
+from pylox.stmt import Stmt
+
+CACHE_DIR = "__loxcache__"
+VERSION = (Path(__file__).parent / "VERSION").read_text().strip()
+# Bump whenever the AST or the resolution info changes shape.
+FORMAT = 12
+TAG = f"pylox-{VERSION}-{FORMAT}"
+
+
+def cache_path(src_path: Path, optimized: bool = False) -> Path:
+    # optimized programs are kept apart, as they have a different tree
+    tag = f"{TAG}-O" if optimized else TAG
+    return src_path.parent / CACHE_DIR / f"{src_path.name}.{tag}.pickle"
+
+
+def source_hash(src: str) -> bytes:
+    return hashlib.sha256(src.encode()).digest()
+
+
+def load(
+    src_path: Path,
+    src: str,
+    optimized: bool = False,
+    globals: typing.Optional[Globals] = None,
+) -> typing.Optional[typing.List[Stmt]]:
+    """
+    Return the cached statements of `src`, or None if missing or stale.
+
+    The resolver stores its results on the nodes, so they are resolved already.
+    Their global slots are those of the interpreter that resolved them: the
+    program is only returned if `globals` can give the same slots.
+    """
+    # Unpickling allocates the whole tree at once, which would otherwise
+    # trigger many useless cyclic garbage collections.
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        with open(cache_path(src_path, optimized), "rb") as cache_file:
+            # the header is a separate pickle, so a stale program is not loaded
+            if pickle.load(cache_file) != (TAG, source_hash(src)):
+                return None
+            names, statements = pickle.load(cache_file)
+            if globals is not None and not globals.adopt(names):
+                return None
+            return typing.cast(typing.List[Stmt], statements)
+    except Exception:  # missing, unreadable or corrupt cache file
+        return None
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+
+def store(
+    src_path: Path,
+    src: str,
+    statements: typing.List[Stmt],
+    optimized: bool = False,
+    names: typing.Sequence[str] = (),
+) -> None:
+    """
+    Write resolved `statements` to the cache of `src_path`.
+
+    The file is written next to its final location and moved into place, so
+    concurrent runs never read a partial file. Failures are ignored: the
+    cache is only an optimization.
+    """
+    path = cache_path(src_path, optimized)
+    try:
+        path.parent.mkdir(exist_ok=True)
+        header = pickle.dumps((TAG, source_hash(src)))
+        data = header + pickle.dumps(
+            (list(names), statements), pickle.HIGHEST_PROTOCOL
+        )
+        fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=path.name)
+    except (OSError, pickle.PicklingError, RecursionError):
+        return
+
+    try:
+        with os.fdopen(fd, "wb") as tmp_file:
+            tmp_file.write(data)
+        os.replace(tmp_name, path)
+    except OSError:
+        try:
+            os.unlink(tmp_name)
+        except OSError:
+            pass
@@ -1,11 +1,14 @@
 import sys
 import typing as t
+from enum import Enum
 from pathlib import Path
 
 import typer
 from rich import print
 from rich.prompt import Prompt
 
+from pylox import cache
+from pylox.compiler import ClosureInterpreter
 from pylox.error import (
     LoxException,
     LoxParseError,
@@ -14,23 +17,68 @@ from pylox.error import (
 )
 from pylox.expr import Expr
 from pylox.interpreter import Interpreter
-from pylox.parser import Parser
+from pylox.optimizer import Optimizer
+from pylox.parser import PARSERS
 from pylox.resolver import Resolver
-from pylox.scanner import Scanner
+from pylox.scanner import SCANNERS, iter_tokens
+from pylox.stmt import Stmt
+from pylox.transpiler import PythonInterpreter, Transpiler
+from pylox.vm import VM
 
 pylox_cli = typer.Typer()
 Prompt.prompt_suffix = ""  # Get rid of the default colon suffix
 
 
+class ScannerKind(str, Enum):
+    CLASSIC = "classic"
+    REGEX = "regex"
+    COMPACT = "compact"
+
+
+class ParserKind(str, Enum):
+    CLASSIC = "classic"
+    PRATT = "pratt"
+
+
+class EngineKind(str, Enum):
+    TREE = "tree"
+    CLOSURE = "closure"
+    VM = "vm"
+    PYTHON = "python"
+
+
+ENGINES: t.Dict[str, t.Type[Interpreter]] = {
+    EngineKind.TREE.value: Interpreter,
+    EngineKind.CLOSURE.value: ClosureInterpreter,
+    EngineKind.VM.value: VM,
+    EngineKind.PYTHON.value: PythonInterpreter,
+}
+
+
 class Lox:
-    def __init__(self) -> None:
-        self.interpreter = Interpreter()
+    def __init__(
+        self,
+        scanner: str = ScannerKind.CLASSIC.value,
+        parser: str = ParserKind.CLASSIC.value,
+        use_cache: bool = False,
+        engine: str = EngineKind.TREE.value,
+        optimize: bool = False,
+    ) -> None:
+        self.scanner = SCANNERS[scanner]
+        self.parser = PARSERS[parser]
+        self.use_cache = use_cache
+        self.interpreter = ENGINES[engine]()
+        self.optimizer = Optimizer() if optimize else None
         self.had_error = False
         self.had_runtime_error = False
 
-    def run_file(self, src_filepath: Path) -> None:
-        src = src_filepath.read_text()
-        self.run(src)
+    def run_file(self, src_filepath: Path, stream: bool = False) -> None:
+        if stream:
+            with open(src_filepath, "rb") as src_file:
+                self.run_stream(src_file)
+        else:
+            src = src_filepath.read_text()
+            self.run(src, src_filepath if self.use_cache else None)
 
         if self.had_error:
             sys.exit(65)
@@ -44,17 +92,20 @@ class Lox:
             if line == "exit":
                 break
             try:
-                tokens = Scanner(line).scan_tokens()
-                ast = Parser(tokens, self.report_error).parse_repl()
+                tokens = self.scanner(line).scan_tokens()
+                ast = self.parser(tokens, self.report_error).parse_repl()
                 if self.had_error:
                     continue
 
                 if isinstance(ast, Expr):
+                    Resolver(self.interpreter).resolve_ast_node(ast)
+                    if self.optimizer is not None:
+                        ast = self.optimizer.optimize_expr(ast)
                     print(self.interpreter.interpret_expr(ast))
                 elif isinstance(ast, list):
                     resolver = Resolver(self.interpreter)
                     resolver.resolve(ast)
-                    self.interpreter.interpret(ast)
+                    self.interpreter.interpret(self.optimize(ast))
             except (LoxSyntaxError, LoxParseError) as e:
                 self.report_error(e)
             except LoxRuntimeError as e:
@@ -64,14 +115,89 @@ class Lox:
             self.had_error = False
             self.had_runtime_error = False
 
-    def run(self, src: str) -> None:
+    def run(self, src: str, src_filepath: t.Optional[Path] = None) -> None:
+        """
+        Run `src`.
+
+        If `src_filepath` is given, the resolved program is loaded from its cache
+        when the source is unchanged and stored there otherwise.
+        """
         try:
-            tokens = Scanner(src).scan_tokens()
-            ast = Parser(tokens, self.report_error).parse()
-            if not self.had_error:
-                resolver = Resolver(self.interpreter)
-                resolver.resolve(ast)
-                self.interpreter.interpret(ast)
+            program = None
+            if src_filepath is not None:
+                program = cache.load(
+                    src_filepath,
+                    src,
+                    self.optimized,
+                    self.interpreter.globals,
+                )
+
+            if program is None:
+                program = self.compile(src)
+                if program is None:
+                    return
+                if src_filepath is not None:
+                    cache.store(
+                        src_filepath,
+                        src,
+                        program,
+                        self.optimized,
+                        self.interpreter.globals.names,
+                    )
+
+            self.interpreter.interpret(program)
+        except (LoxSyntaxError, LoxParseError) as e:
+            self.report_error(e)
+        except LoxRuntimeError as e:
+            self.report_runtime_error(e)
+
+    def compile(self, src: str) -> t.Optional[t.List[Stmt]]:
+        """Scan, parse and resolve `src`; None if it has syntax errors."""
+        tokens = self.scanner(src).scan_tokens()
+        ast = self.parser(tokens, self.report_error).parse()
+        if self.had_error:
+            return None
+
+        resolver = Resolver(self.interpreter)
+        resolver.resolve(ast)
+        return self.optimize(ast)
+
+    @property
+    def optimized(self) -> bool:
+        return self.optimizer is not None
+
+    def optimize(self, statements: t.List[Stmt]) -> t.List[Stmt]:
+        """Run the optimizer over resolved `statements`, if it is enabled."""
+        if self.optimizer is None:
+            return statements
+        return self.optimizer.optimize(statements)
+
+    def emit_python(self, src_filepath: Path) -> None:
+        """Print the Python translation of a script instead of running it."""
+        try:
+            program = self.compile(src_filepath.read_text())
+            if program is not None:
+                sys.stdout.write(Transpiler(program).source)
+        except (LoxSyntaxError, LoxParseError) as e:
+            self.report_error(e)
+
+        if self.had_error:
+            sys.exit(65)
+
+    def run_stream(self, src: t.IO) -> None:
+        """
+        Scan, parse and execute `src` one top-level declaration at a time.
+
+        Unlike `run`, declarations before a syntax error have already been executed
+        when the error is reported.
+        """
+        try:
+            resolver = Resolver(self.interpreter)
+            parser = self.parser(iter_tokens(src), self.report_error)
+            for stmt in parser.iter_parse():
+                if not self.had_error:
+                    resolver.resolve([stmt])
+                    self.interpreter.interpret(self.optimize([stmt]))
         except (LoxSyntaxError, LoxParseError) as e:
             self.report_error(e)
         except LoxRuntimeError as e:
@@ -90,13 +216,63 @@ class Lox:
         self.had_error = True
         self.had_runtime_error = True
 
+    def report_stats(self) -> None:
+        """
+        Write what each optimizer pass changed to stderr, then the calls
+        that became direct.
+        """
+        if self.optimizer is None:
+            return
+        for name, count in self.optimizer.stats.items():
+            sys.stderr.write(f"{name}: {count} changes\n")
+        for site in self.optimizer.devirtualized:
+            sys.stderr.write(
+                f"line {site.line}: direct call of '{site.lexeme}'\n"
+            )
+
 
 @pylox_cli.command()
 def main(
     lox_script: t.Optional[Path] = typer.Argument(default=None),
-) -> None:  # pragma: no cover
-    lox = Lox()
-    if not lox_script:
-        lox.run_prompt()
-    else:
-        lox.run_file(lox_script)
+    scanner: ScannerKind = typer.Option(
+        ScannerKind.CLASSIC, help="Lexer implementation to use."
+    ),
+    parser: ParserKind = typer.Option(
+        ParserKind.CLASSIC, help="Expression parser implementation to use."
+    ),
+    stream: bool = typer.Option(
+        False, help="Lex, parse and run the script in bounded memory."
+    ),
+    use_cache: bool = typer.Option(
+        True,
+        "--cache/--no-cache",
+        help=f"Reuse resolved programs stored in {cache.CACHE_DIR}.",
+    ),
+    engine: EngineKind = typer.Option(
+        EngineKind.TREE,
+        help="Walk the AST or compile it to closures, bytecode or Python.",
+    ),
+    emit_python: bool = typer.Option(
+        False, help="Print the script translated to Python and exit."
+    ),
+    optimize: bool = typer.Option(
+        False,
+        "--optimize",
+        "-O",
+        help="Fold constants, drop dead code and make direct calls.",
+    ),
+    stats: bool = typer.Option(
+        False, help="Print what the optimizer changed to stderr, with -O."
+    ),
+) -> None:
+    lox = Lox(scanner.value, parser.value, use_cache, engine.value, optimize)
+    try:
+        if emit_python and lox_script:
+            lox.emit_python(lox_script)
+        elif not lox_script:  # pragma: no cover
+            lox.run_prompt()
+        else:
+            lox.run_file(lox_script, stream)
+    finally:
+        if stats:
+            lox.report_stats()
@@ -0,0 +1,751 @@
+import typing
+
+import pylox.expr as expr_ast
+import pylox.runtime_entity as runtime
+import pylox.stmt as stmt_ast
+from pylox.environment import UNDEFINED, Frame
+from pylox.error import LoxRuntimeError
+from pylox.expr import Expr, ExprVisitor
+from pylox.interpreter import DECLARATION_T, Interpreter
+from pylox.runtime_entity import BREAK, LoxFunction, Return
+from pylox.scanner import Token, TokenType
+from pylox.stmt import Stmt, StmtVisitor
+
+# Compiled code: a closure over the decisions made for one node, called with
+# the frame of the block or call it runs in.
+CODE_T = typing.Callable[[Frame], typing.Any]
+
+NUMBERS = (int, float)
+is_truthy = Interpreter.is_truthy
+release = Interpreter.release
+stringify = Interpreter.stringify
+equals = Interpreter.equals
+
+
+class CompiledFunction(LoxFunction):
+    """`LoxFunction` whose body has been compiled to a closure."""
+
+    def __init__(
+        self,
+        declaration: stmt_ast.Function,
+        closure: Frame,
+        is_init: bool,
+        body: CODE_T,
+    ) -> None:
+        super().__init__(declaration, closure, is_init, declaration.frame_size)
+        self.body = body
+        self.param_count = len(declaration.params)
+        self.uncaptured = declaration.uncaptured
+
+    def call_in(
+        self, interpreter: Interpreter, args: list, closure: Frame
+    ) -> typing.Any:
+        size = self.frame_size
+        if size:
+            frame = Frame(args + [None] * (size - len(args)), closure)
+        else:
+            frame = closure  # no parameters or locals
+        completion = self.body(frame)
+        if self.uncaptured:
+            release(frame, self.uncaptured)
+        if completion is BREAK:
+            # the resolver only accepts `break` in loops of the same body
+            raise RuntimeError(f"'break' escaped {self}.")
+        if self.is_init:
+            return closure.values[0]  # this
+        # a body that cannot return may hand back the value of an expression
+        if type(completion) is Return:
+            return completion.value
+        return None
+
+    def bind(self, instance: runtime.LoxInstance) -> "CompiledFunction":
+        return CompiledFunction(
+            self.declaration,
+            Frame([instance], self.closure),
+            self.is_init,
+            self.body,
+        )
+
+    def arity(self) -> int:
+        return self.param_count
+
+
+class Compiler(ExprVisitor, StmtVisitor):
+    """
+    Compiles resolved statements into a tree of Python closures.
+
+    Every node becomes one closure. Operators, frame depths, slots and
+    constants are looked at once, here, instead of on every execution, and
+    running a node is a plain call instead of `accept` double dispatch.
+    """
+
+    def __init__(self, interpreter: Interpreter) -> None:
+        self.interpreter = interpreter
+        self.globals = interpreter.globals.values
+
+    def compile(self, statements: typing.List[Stmt]) -> CODE_T:
+        codes = tuple(stmt.accept(self) for stmt in statements)
+        if len(codes) == 1:
+            return codes[0]
+
+        if not any(map(self.jumps, statements)):
+
+            def sequence(frame: Frame) -> None:
+                for code in codes:
+                    code(frame)
+
+            return sequence
+
+        steps = tuple(zip(codes, map(self.jumps, statements)))
+
+        def sequence_with_jumps(frame: Frame) -> runtime.COMPLETION_T:
+            for code, jumps in steps:
+                if jumps:
+                    completion = code(frame)
+                    if completion is not None:
+                        return completion
+                else:
+                    code(frame)
+            return None
+
+        return sequence_with_jumps
+
+    @classmethod
+    def jumps(cls, stmt: Stmt) -> bool:
+        """
+        Whether `stmt` may complete with a `break` or `return`.
+
+        The code of such a statement returns its completion, or None. The
+        code of any other statement may return anything, e.g. the value of
+        its expression, and what it returns is ignored.
+        """
+        if isinstance(stmt, (stmt_ast.Return, stmt_ast.Break)):
+            return True
+        if isinstance(stmt, stmt_ast.Block):
+            return any(map(cls.jumps, stmt.statements))
+        if isinstance(stmt, stmt_ast.If):
+            return cls.jumps(stmt.then_branch) or (
+                stmt.else_branch is not None and cls.jumps(stmt.else_branch)
+            )
+        if isinstance(stmt, (stmt_ast.While, stmt_ast.For)):
+            return cls.jumps(stmt.body)
+        return False
+
+    def statement(self, stmt: Stmt) -> CODE_T:
+        """Compile `stmt` to code returning its completion, or None."""
+        code = stmt.accept(self)
+        if self.jumps(stmt):
+            return code
+
+        def discard(frame: Frame) -> None:
+            code(frame)
+
+        return discard
+
+    def expression(self, expr: Expr) -> CODE_T:
+        return expr.accept(self)
+
+    # variables
+
+    def get(
+        self, name: Token, depth: typing.Optional[int], slot: int
+    ) -> CODE_T:
+        if depth is None:
+            values = self.globals
+
+            def get_global(frame: Frame) -> typing.Any:
+                value = values[slot]
+                if value is UNDEFINED:
+                    raise LoxRuntimeError(
+                        name, f"Undefined variable '{name.lexeme}'."
+                    )
+                return value
+
+            return get_global
+
+        if depth == 0:
+            return lambda frame: frame.values[slot]
+        if depth == 1:
+            return lambda frame: frame.enclosing.values[slot]  # type: ignore
+        return lambda frame: frame.get_at(depth, slot)
+
+    def define(self, declaration: DECLARATION_T) -> typing.Callable:
+        """Return a function that stores the value of `declaration`."""
+        slot = declaration.slot
+        if slot is None:
+            values = self.globals
+            global_slot = self.interpreter.globals.slot(
+                declaration.name.lexeme
+            )
+
+            def define_global(frame: Frame, value: typing.Any) -> None:
+                values[global_slot] = value
+
+            return define_global
+
+        def define_local(frame: Frame, value: typing.Any) -> None:
+            frame.values[slot] = value
+
+        return define_local
+
+    def visit_variable_expr(self, expr: expr_ast.Variable) -> CODE_T:
+        return self.get(expr.name, expr.depth, expr.slot)
+
+    def visit_this_expr(self, expr: expr_ast.This) -> CODE_T:
+        return self.get(expr.keyword, expr.depth, expr.slot)
+
+    def visit_assign_expr(self, expr: expr_ast.Assign) -> CODE_T:
+        value = self.expression(expr.value)
+        depth, slot = expr.depth, expr.slot
+
+        if depth is None:
+            values = self.globals
+            name = expr.name
+
+            def assign_global(frame: Frame) -> typing.Any:
+                result = value(frame)
+                if values[slot] is UNDEFINED:
+                    raise LoxRuntimeError(
+                        name, f"Undefined variable '{name.lexeme}'."
+                    )
+                values[slot] = result
+                return result
+
+            return assign_global
+
+        if depth == 0:
+
+            def assign_local(frame: Frame) -> typing.Any:
+                result = frame.values[slot] = value(frame)
+                return result
+
+            return assign_local
+
+        def assign_enclosing(frame: Frame) -> typing.Any:
+            result = value(frame)
+            frame.assign_at(depth, slot, result)
+            return result
+
+        return assign_enclosing
+
+    # expressions
+
+    def visit_literal_expr(self, expr: expr_ast.Literal) -> CODE_T:
+        value = expr.value
+        return lambda frame: value
+
+    def visit_grouping_expr(self, expr: expr_ast.Grouping) -> CODE_T:
+        return self.expression(expr.expr)
+
+    def visit_unary_expr(self, expr: expr_ast.Unary) -> CODE_T:
+        right = self.expression(expr.right)
+        op = expr.operator
+
+        if op.token_type is TokenType.MINUS:
+
+            def negate(frame: Frame) -> typing.Any:
+                value = right(frame)
+                if type(value) not in NUMBERS:
+                    raise LoxRuntimeError(op, "Operand must be a number.")
+                return -float(value)
+
+            return negate
+
+        if op.token_type is TokenType.BANG:
+            return lambda frame: not is_truthy(right(frame))
+
+        raise LoxRuntimeError(
+            op, f'Unknown operator for unary operation -- "{op.lexeme}"!'
+        )
+
+    def visit_logical_expr(self, expr: expr_ast.Logical) -> CODE_T:
+        left = self.expression(expr.left)
+        right = self.expression(expr.right)
+        op = expr.operator
+
+        if op.token_type is TokenType.OR:
+
+            def logical_or(frame: Frame) -> typing.Any:
+                value = left(frame)
+                if value is not None and value is not False:
+                    return value
+                return right(frame)
+
+            return logical_or
+
+        if op.token_type is TokenType.AND:
+
+            def logical_and(frame: Frame) -> typing.Any:
+                value = left(frame)
+                if value is None or value is False:
+                    return value
+                return right(frame)
+
+            return logical_and
+
+        raise LoxRuntimeError(op, f"Unknown logical operator {op.lexeme}")
+
+    def visit_binary_expr(self, expr: expr_ast.Binary) -> CODE_T:
+        left = self.expression(expr.left)
+        right = self.expression(expr.right)
+        op = expr.operator
+
+        match op.token_type:
+            case TokenType.PLUS:
+
+                def add(frame: Frame) -> typing.Any:
+                    a = left(frame)
+                    b = right(frame)
+                    if type(a) in NUMBERS and type(b) in NUMBERS:
+                        return float(a) + float(b)
+                    if type(a) is str or type(b) is str:
+                        return stringify(a) + stringify(b)
+                    raise LoxRuntimeError(
+                        op, "Operands must be two numbers or two strings."
+                    )
+
+                return add
+            case TokenType.SLASH:
+
+                def divide(frame: Frame) -> typing.Any:
+                    a = left(frame)
+                    b = right(frame)
+                    if type(a) not in NUMBERS or type(b) not in NUMBERS:
+                        raise LoxRuntimeError(
+                            op, "Operands must be a numbers."
+                        )
+                    if float(b) == 0:
+                        raise LoxRuntimeError(op, "Division by zero!")
+                    return float(a) / float(b)
+
+                return divide
+            case TokenType.EQUAL_EQUAL:
+                return lambda frame: equals(left(frame), right(frame))
+            case TokenType.BANG_EQUAL:
+                return lambda frame: not equals(left(frame), right(frame))
+
+        operation = ARITHMETIC.get(op.token_type)
+        if operation is None:
+            raise LoxRuntimeError(
+                op, f'Unknown operator for binary operation -- "{op.lexeme}"!'
+            )
+
+        def arithmetic(frame: Frame) -> typing.Any:
+            a = left(frame)
+            b = right(frame)
+            if type(a) not in NUMBERS or type(b) not in NUMBERS:
+                raise LoxRuntimeError(op, "Operands must be a numbers.")
+            return operation(float(a), float(b))
+
+        return arithmetic
+
+    def visit_call_expr(self, expr: expr_ast.Call) -> CODE_T:
+        arguments = tuple(self.expression(arg) for arg in expr.arguments)
+        paren = expr.paren
+        count = len(arguments)
+        interpreter = self.interpreter
+
+        def call_value(function: typing.Any, args: list) -> typing.Any:
+            if not isinstance(function, runtime.LoxCallable):
+                raise LoxRuntimeError(
+                    paren, "Can only call functions and classes."
+                )
+
+            if count != function.arity():
+                raise LoxRuntimeError(
+                    paren,
+                    f"Expected {function.arity()} arguments but got {count}.",
+                )
+
+            return function.call(interpreter, args)
+
+        def invoke(
+            instance: runtime.LoxInstance, method: CompiledFunction, args: list
+        ) -> typing.Any:
+            if count != method.param_count:
+                raise LoxRuntimeError(
+                    paren,
+                    f"Expected {method.param_count} arguments "
+                    f"but got {count}.",
+                )
+            return method.call_in(
+                interpreter, args, Frame([instance], method.closure)
+            )
+
+        # `obj.m(...)` and `super.m(...)` call the method directly on its
+        # receiver, without binding it to a new function first.
+        if type(expr.callee) is expr_ast.Get:
+            get = expr.callee
+            obj = self.expression(get.obj)
+            name = get.name
+            lexeme = name.lexeme
+
+            def call_method(frame: Frame) -> typing.Any:
+                instance = obj(frame)
+                if not isinstance(instance, runtime.LoxInstance):
+                    raise LoxRuntimeError(
+                        name, "Only instances have properties."
+                    )
+                offset = instance.shape.offsets.get(lexeme)
+                if offset is not None:
+                    function = instance.values[offset]
+                    return call_value(
+                        function, [argument(frame) for argument in arguments]
+                    )
+                method = instance.lox_class.find_method(lexeme)
+                if method is None:
+                    raise LoxRuntimeError(
+                        name, f"Undefined property '{lexeme}'."
+                    )
+                args = [argument(frame) for argument in arguments]
+                return invoke(
+                    instance, typing.cast(CompiledFunction, method), args
+                )
+
+            return call_method
+
+        if type(expr.callee) is expr_ast.Super:
+            find_super_method = self.super_method(expr.callee)
+
+            def call_super(frame: Frame) -> typing.Any:
+                instance, method = find_super_method(frame)
+                args = [argument(frame) for argument in arguments]
+                return invoke(instance, method, args)
+
+            return call_super
+
+        callee = self.expression(expr.callee)
+
+        if expr.target is not None:
+            # the optimizer checked the arity of the declaration it found
+            declaration = expr.target.declaration
+
+            def call_direct(frame: Frame) -> typing.Any:
+                function = callee(frame)
+                args = [argument(frame) for argument in arguments]
+                if getattr(function, "declaration", None) is declaration:
+                    return function.call(interpreter, args)
+                return call_value(function, args)
+
+            return call_direct
+
+        def call(frame: Frame) -> typing.Any:
+            function = callee(frame)
+            return call_value(
+                function, [argument(frame) for argument in arguments]
+            )
+
+        return call
+
+    def visit_get_expr(self, expr: expr_ast.Get) -> CODE_T:
+        obj = self.expression(expr.obj)
+        name = expr.name
+        lexeme = name.lexeme
+
+        def get(frame: Frame) -> typing.Any:
+            instance = obj(frame)
+            if not isinstance(instance, runtime.LoxInstance):
+                raise LoxRuntimeError(name, "Only instances have properties.")
+            offset = instance.shape.offsets.get(lexeme)
+            if offset is not None:
+                return instance.values[offset]
+            method = instance.lox_class.find_method(lexeme)
+            if method is not None:
+                return method.bind(instance)
+            raise LoxRuntimeError(name, f"Undefined property '{lexeme}'.")
+
+        return get
+
+    def visit_set_expr(self, expr: expr_ast.Set) -> CODE_T:
+        obj = self.expression(expr.obj)
+        value = self.expression(expr.value)
+        name = expr.name
+
+        def set_(frame: Frame) -> typing.Any:
+            instance = obj(frame)
+            if not isinstance(instance, runtime.LoxInstance):
+                raise LoxRuntimeError(name, "Only instances have fields.")
+            result = value(frame)
+            instance.set(name, result)
+            return result
+
+        return set_
+
+    def visit_super_expr(self, expr: expr_ast.Super) -> CODE_T:
+        find_super_method = self.super_method(expr)
+
+        def super_(frame: Frame) -> typing.Any:
+            instance, method = find_super_method(frame)
+            return method.bind(instance)
+
+        return super_
+
+    def super_method(
+        self, expr: expr_ast.Super
+    ) -> typing.Callable[
+        [Frame], typing.Tuple[runtime.LoxInstance, CompiledFunction]
+    ]:
+        """Code finding the receiver and the unbound method of `super.m`."""
+        depth = typing.cast(int, expr.depth)
+        slot = expr.slot
+        method_name = expr.method
+
+        def super_method(
+            frame: Frame,
+        ) -> typing.Tuple[runtime.LoxInstance, CompiledFunction]:
+            superclass = frame.get_at(depth, slot)
+            # `this` is the only variable of the scope right inside `super`'s
+            instance = frame.get_at(depth - 1, 0)
+            method = superclass.find_method(method_name.lexeme)
+            if method is None:
+                raise LoxRuntimeError(
+                    method_name,
+                    f"Undefined property '{method_name.lexeme}'.",
+                )
+            return instance, method
+
+        return super_method
+
+    # statements
+
+    def visit_expression_stmt(self, stmt: stmt_ast.Expression) -> CODE_T:
+        return self.expression(stmt.expr)
+
+    def visit_print_stmt(self, stmt: stmt_ast.Print) -> CODE_T:
+        value = self.expression(stmt.expr)
+        return lambda frame: print(stringify(value(frame)))
+
+    def visit_var_stmt(self, stmt: stmt_ast.Var) -> CODE_T:
+        define = self.define(stmt)
+        if stmt.initializer is None:
+            return lambda frame: define(frame, None)
+
+        initializer = self.expression(stmt.initializer)
+        return lambda frame: define(frame, initializer(frame))
+
+    def visit_block_stmt(self, stmt: stmt_ast.Block) -> CODE_T:
+        body = self.compile(stmt.statements)
+        return self.in_frame(body, stmt.frame_size, stmt.uncaptured)
+
+    @staticmethod
+    def in_frame(
+        code: CODE_T, size: int, uncaptured: typing.Tuple[int, ...]
+    ) -> CODE_T:
+        """
+        Run `code` in a new frame of `size` slots, and clear the `uncaptured`
+        ones when it is done.
+        """
+        if size == 0:
+            return code  # declares nothing, runs in the enclosing frame
+        if not uncaptured:
+            return lambda frame: code(Frame([None] * size, frame))
+
+        def releasing(frame: Frame) -> typing.Any:
+            frame = Frame([None] * size, frame)
+            result = code(frame)
+            release(frame, uncaptured)
+            return result
+
+        return releasing
+
+    def visit_if_stmt(self, stmt: stmt_ast.If) -> CODE_T:
+        condition = self.expression(stmt.condition)
+        if not self.jumps(stmt):
+            then_branch = stmt.then_branch.accept(self)
+            else_branch = (
+                None
+                if stmt.else_branch is None
+                else stmt.else_branch.accept(self)
+            )
+        else:
+            # both branches must hand back a completion, or None
+            then_branch = self.statement(stmt.then_branch)
+            else_branch = (
+                None
+                if stmt.else_branch is None
+                else self.statement(stmt.else_branch)
+            )
+
+        if else_branch is None:
+
+            def if_then(frame: Frame) -> runtime.COMPLETION_T:
+                value = condition(frame)
+                if value is not None and value is not False:
+                    return then_branch(frame)
+                return None
+
+            return if_then
+
+        def if_then_else(frame: Frame) -> runtime.COMPLETION_T:
+            value = condition(frame)
+            if value is not None and value is not False:
+                return then_branch(frame)
+            return else_branch(frame)  # type: ignore[misc]
+
+        return if_then_else
+
+    def visit_while_stmt(self, stmt: stmt_ast.While) -> CODE_T:
+        condition = self.expression(stmt.condition)
+        body = stmt.body.accept(self)
+
+        if not self.jumps(stmt.body):
+
+            def loop(frame: Frame) -> None:
+                while True:
+                    value = condition(frame)
+                    if value is None or value is False:
+                        return
+                    body(frame)
+
+            return loop
+
+        def loop_with_jumps(frame: Frame) -> runtime.COMPLETION_T:
+            while True:
+                value = condition(frame)
+                if value is None or value is False:
+                    return None
+                completion = body(frame)
+                if completion is not None:
+                    if completion is BREAK:
+                        return None
+                    return completion
+
+        return loop_with_jumps
+
+    def visit_for_stmt(self, stmt: stmt_ast.For) -> CODE_T:
+        size = stmt.frame_size
+        initializer = (
+            None if stmt.initializer is None else stmt.initializer.accept(self)
+        )
+        condition = (
+            (lambda frame: True)
+            if stmt.condition is None
+            else self.expression(stmt.condition)
+        )
+        increment = (
+            (lambda frame: None)
+            if stmt.increment is None
+            else self.expression(stmt.increment)
+        )
+        body = stmt.body.accept(self)
+        jumps = self.jumps(stmt.body)
+        counted = stmt.counted
+        slot = Interpreter.counter_slot(stmt) if counted else 0
+        counted_range = Interpreter.counted_range
+
+        def counted_loop(frame: Frame, counter: range) -> runtime.COMPLETION_T:
+            values = frame.values
+            step = counter.step
+            for i in counter:
+                completion = body(frame)
+                if jumps and completion is not None:
+                    if completion is BREAK:
+                        return None
+                    return completion
+                values[slot] = float(i + step)
+            return None
+
+        def for_loop(frame: Frame) -> runtime.COMPLETION_T:
+            if initializer is not None:
+                initializer(frame)
+            if counted:
+                counter = counted_range(stmt, frame.values[slot])
+                if counter is not None:
+                    return counted_loop(frame, counter)
+            while True:
+                value = condition(frame)
+                if value is None or value is False:
+                    return None
+                completion = body(frame)
+                if jumps and completion is not None:
+                    if completion is BREAK:
+                        return None
+                    return completion
+                increment(frame)
+
+        return self.in_frame(for_loop, size, stmt.uncaptured)
+
+    def visit_break_stmt(self, stmt: stmt_ast.Break) -> CODE_T:
+        return lambda frame: BREAK
+
+    def visit_return_stmt(self, stmt: stmt_ast.Return) -> CODE_T:
+        if stmt.value is None:
+            return lambda frame: Return(None)
+
+        value = self.expression(stmt.value)
+        return lambda frame: Return(value(frame))
+
+    def visit_function_stmt(self, stmt: stmt_ast.Function) -> CODE_T:
+        define = self.define(stmt)
+        body = self.compile(stmt.body)
+        return lambda frame: define(
+            frame, CompiledFunction(stmt, frame, False, body)
+        )
+
+    def visit_class_stmt(self, stmt: stmt_ast.Class) -> CODE_T:
+        define = self.define(stmt)
+        superclass_code = (
+            None
+            if stmt.superclass is None
+            else self.expression(stmt.superclass)
+        )
+        superclass_name = (
+            None if stmt.superclass is None else stmt.superclass.name
+        )
+        methods = [
+            (method, method.name.lexeme == "init", self.compile(method.body))
+            for method in stmt.methods
+        ]
+        name = stmt.name.lexeme
+
+        def class_(frame: Frame) -> None:
+            superclass = None
+            if superclass_code is not None:
+                superclass = superclass_code(frame)
+                if not isinstance(superclass, runtime.LoxClass):
+                    raise LoxRuntimeError(
+                        typing.cast(Token, superclass_name),
+                        "Superclass must be a class.",
+                    )
+
+            define(frame, None)
+
+            env = frame
+            if superclass_code is not None:
+                env = Frame([superclass], frame)
+
+            lox_class = runtime.LoxClass(
+                name,
+                typing.cast(runtime.LoxClass, superclass),
+                {
+                    method.name.lexeme: CompiledFunction(
+                        method, env, is_init, body
+                    )
+                    for method, is_init, body in methods
+                },
+                stmt,
+            )
+            define(frame, lox_class)
+
+        return class_
+
+
+ARITHMETIC: typing.Dict[TokenType, typing.Callable] = {
+    TokenType.GREATER: float.__gt__,
+    TokenType.GREATER_EQUAL: float.__ge__,
+    TokenType.LESS: float.__lt__,
+    TokenType.LESS_EQUAL: float.__le__,
+    TokenType.MINUS: float.__sub__,
+    TokenType.STAR: float.__mul__,
+}
+
+
+class ClosureInterpreter(Interpreter):
+    """Interpreter that compiles what it is given to closures, then runs them."""
+
+    def interpret(self, statements: list[Stmt]):
+        Compiler(self).compile(statements)(self.environment)
+
+    def interpret_expr(self, expr: Expr) -> str:
+        value = Compiler(self).expression(expr)(self.environment)
+        return self.stringify(value)
@@ -3,46 +3,90 @@ import typing
 from pylox.error import LoxRuntimeError
 from pylox.tokens import Token
 
+# Value of a global that has a slot but is not defined (yet).
+UNDEFINED = object()
 
-class Environment:
-    def __init__(self, enclosing=None) -> None:
-        self._values: dict[str, typing.Any] = {}
-        self.enclosing = enclosing
+
+class Globals:
+    """
+    Global variables, in a list at slots given out by name.
+
+    The resolver gives every global that a program reads or assigns its slot
+    up front, so the engines index `values` instead of hashing names. Names
+    defined later, e.g. on a later REPL line, bind late: their slot holds
+    `UNDEFINED` until they are defined.
+    """
+
+    def __init__(self) -> None:
+        self.slots: typing.Dict[str, int] = {}
+        self.names: typing.List[str] = []
+        self.values: typing.List[typing.Any] = []
+
+    def slot(self, name: str) -> int:
+        slot = self.slots.get(name)
+        if slot is None:
+            slot = self.slots[name] = len(self.names)
+            self.names.append(name)
+            self.values.append(UNDEFINED)
+        return slot
+
+    def adopt(self, names: typing.Sequence[str]) -> bool:
+        """
+        Give `names` the slots they had in the table of another interpreter,
+        if this one has no other names yet.
+        """
+        if list(names[: len(self.names)]) != self.names:
+            return False
+        for name in names[len(self.names) :]:
+            self.slot(name)
+        return True
 
     def define(self, name: str, value: typing.Any) -> None:
-        self._values[name] = value
+        self.values[self.slot(name)] = value
+
+    def value(self, name: str) -> typing.Any:
+        """The value of the global `name`, UNDEFINED if there is none."""
+        slot = self.slots.get(name)
+        return UNDEFINED if slot is None else self.values[slot]
 
-    def get(self, name: Token) -> typing.Any:
-        if name.lexeme in self._values.keys():
-            return self._values[name.lexeme]
+    def get_at(self, slot: int, name: Token) -> typing.Any:
+        value = self.values[slot]
+        if value is UNDEFINED:
+            raise LoxRuntimeError(name, f"Undefined variable '{name.lexeme}'.")
+        return value
 
-        if self.enclosing is not None:
-            return self.enclosing.get(name)
+    def assign_at(self, slot: int, name: Token, value: typing.Any) -> None:
+        if self.values[slot] is UNDEFINED:
+            raise LoxRuntimeError(name, f"Undefined variable '{name.lexeme}'.")
+        self.values[slot] = value
 
-        raise LoxRuntimeError(name, f"Undefined variable '{name.lexeme}'.")
 
-    def assign(self, name: Token, value: typing.Any) -> None:
-        if name.lexeme in self._values.keys():
-            self._values[name.lexeme] = value
-            return
+class Frame:
+    """
+    Local variables of one block, call or class body.
 
-        if self.enclosing is not None:
-            self.enclosing.assign(name, value)
-            return
+    Variables live in a list, at the slots the `Resolver` assigned to them, and
+    are found by walking a resolved number of frames up the chain.
+    """
 
-        raise LoxRuntimeError(name, f"Undefined variable '{name.lexeme}'.")
+    __slots__ = ("values", "enclosing")
 
-    def get_at(self, distance: int, name: str) -> typing.Any:
-        return self.ancestor(distance)._values.get(name)
+    def __init__(
+        self, values: typing.List[typing.Any], enclosing=None
+    ) -> None:
+        self.values = values
+        self.enclosing: typing.Optional[Frame] = enclosing
 
-    def assign_at(
-        self, distance: int, name: Token, value: typing.Any
-    ) -> typing.Any:
-        self.ancestor(distance)._values[name.lexeme] = value
+    def get_at(self, distance: int, slot: int) -> typing.Any:
+        frame = self
+        while distance > 0:
+            frame = frame.enclosing  # type: ignore[assignment]
+            distance -= 1
+        return frame.values[slot]
 
-    def ancestor(self, distance: int):
-        env = self
+    def assign_at(self, distance: int, slot: int, value: typing.Any) -> None:
+        frame = self
         while distance > 0:
-            env = env.enclosing
+            frame = frame.enclosing  # type: ignore[assignment]
             distance -= 1
-        return env
+        frame.values[slot] = value
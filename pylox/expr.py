@@ -3,6 +3,7 @@
 import typing
 from abc import ABC, abstractmethod
 
+from pylox.node import Node, next_node_id
 from pylox.tokens import Token
 
 
@@ -56,9 +57,8 @@ class ExprVisitor(ABC):
         pass
 
 
-class Expr:
-    def __init__(self):
-        pass
+class Expr(Node):
+    __slots__ = ()
 
     @abstractmethod
     def accept(self, visitor: ExprVisitor) -> typing.Any:
@@ -66,42 +66,54 @@ class Expr:
 
 
 class Assign(Expr):
+    __slots__ = ("name", "value", "depth", "slot")
+
     def __init__(self, name: Token, value: Expr):
-        super().__init__()
+        self.node_id = next_node_id()
         self.name = name
         self.value = value
+        self.depth: typing.Optional[int] = None
+        self.slot: int = 0
 
     def accept(self, visitor: ExprVisitor) -> typing.Any:
         return visitor.visit_assign_expr(self)
 
 
 class Binary(Expr):
+    __slots__ = ("left", "operator", "right", "feedback")
+
     def __init__(self, left: Expr, operator: Token, right: Expr):
-        super().__init__()
+        self.node_id = next_node_id()
         self.left = left
         self.operator = operator
         self.right = right
+        self.feedback: typing.Any = None
 
     def accept(self, visitor: ExprVisitor) -> typing.Any:
         return visitor.visit_binary_expr(self)
 
 
 class Call(Expr):
+    __slots__ = ("callee", "paren", "arguments", "target")
+
     def __init__(
         self, callee: Expr, paren: Token, arguments: typing.List[Expr]
     ):
-        super().__init__()
+        self.node_id = next_node_id()
         self.callee = callee
         self.paren = paren
         self.arguments = arguments
+        self.target: typing.Any = None
 
     def accept(self, visitor: ExprVisitor) -> typing.Any:
         return visitor.visit_call_expr(self)
 
 
 class Get(Expr):
+    __slots__ = ("obj", "name")
+
     def __init__(self, obj: Expr, name: Token):
-        super().__init__()
+        self.node_id = next_node_id()
         self.obj = obj
         self.name = name
 
@@ -110,8 +122,10 @@ class Get(Expr):
 
 
 class Grouping(Expr):
+    __slots__ = ("expr",)
+
     def __init__(self, expr: Expr):
-        super().__init__()
+        self.node_id = next_node_id()
         self.expr = expr
 
     def accept(self, visitor: ExprVisitor) -> typing.Any:
@@ -119,8 +133,10 @@ class Grouping(Expr):
 
 
 class Literal(Expr):
+    __slots__ = ("value",)
+
     def __init__(self, value: typing.Any):
-        super().__init__()
+        self.node_id = next_node_id()
         self.value = value
 
     def accept(self, visitor: ExprVisitor) -> typing.Any:
@@ -128,8 +144,10 @@ class Literal(Expr):
 
 
 class Logical(Expr):
+    __slots__ = ("left", "operator", "right")
+
     def __init__(self, left: Expr, operator: Token, right: Expr):
-        super().__init__()
+        self.node_id = next_node_id()
         self.left = left
         self.operator = operator
         self.right = right
@@ -139,8 +157,10 @@ class Logical(Expr):
 
 
 class Set(Expr):
+    __slots__ = ("obj", "name", "value")
+
     def __init__(self, obj: Expr, name: Token, value: Expr):
-        super().__init__()
+        self.node_id = next_node_id()
         self.obj = obj
         self.name = name
         self.value = value
@@ -150,38 +170,53 @@ class Set(Expr):
 
 
 class Super(Expr):
+    __slots__ = ("keyword", "method", "depth", "slot")
+
     def __init__(self, keyword: Token, method: Token):
-        super().__init__()
+        self.node_id = next_node_id()
         self.keyword = keyword
         self.method = method
+        self.depth: typing.Optional[int] = None
+        self.slot: int = 0
 
     def accept(self, visitor: ExprVisitor) -> typing.Any:
         return visitor.visit_super_expr(self)
 
 
 class This(Expr):
+    __slots__ = ("keyword", "depth", "slot")
+
     def __init__(self, keyword: Token):
-        super().__init__()
+        self.node_id = next_node_id()
         self.keyword = keyword
+        self.depth: typing.Optional[int] = None
+        self.slot: int = 0
 
     def accept(self, visitor: ExprVisitor) -> typing.Any:
         return visitor.visit_this_expr(self)
 
 
 class Unary(Expr):
+    __slots__ = ("operator", "right", "feedback")
+
     def __init__(self, operator: Token, right: Expr):
-        super().__init__()
+        self.node_id = next_node_id()
         self.operator = operator
         self.right = right
+        self.feedback: typing.Any = None
 
     def accept(self, visitor: ExprVisitor) -> typing.Any:
         return visitor.visit_unary_expr(self)
 
 
 class Variable(Expr):
+    __slots__ = ("name", "depth", "slot")
+
     def __init__(self, name: Token):
-        super().__init__()
+        self.node_id = next_node_id()
         self.name = name
+        self.depth: typing.Optional[int] = None
+        self.slot: int = 0
 
     def accept(self, visitor: ExprVisitor) -> typing.Any:
         return visitor.visit_variable_expr(self)
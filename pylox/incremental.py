@@ -0,0 +1,231 @@
+import re
+import typing
+from array import array
+from bisect import bisect_left
+
+from pylox.error import LoxException, LoxParseError
+from pylox.expr import Expr
+from pylox.interpreter import Interpreter
+from pylox.parser import Parser
+from pylox.resolver import Resolver
+from pylox.scanner import CompactScanner
+from pylox.stmt import Stmt
+from pylox.tokens import Token, TokenBuffer
+
+
+class Declaration:
+    """Top-level declaration with the range of tokens it was parsed from."""
+
+    def __init__(
+        self,
+        stmt: typing.Optional[Stmt],
+        first: int,
+        end: int,
+        error: typing.Optional[LoxException] = None,
+    ) -> None:
+        self.stmt = stmt  # None if the declaration has a syntax error
+        self.first = first  # index of its first token
+        self.end = end  # index of the token after its last one
+        self.error = error
+
+
+def tokens_of(node: Stmt | Expr) -> typing.Iterator[Token]:
+    """Yield every token referenced by the syntax tree rooted at `node`."""
+    stack: typing.List[typing.Any] = [node]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, Token):
+            yield item
+        elif isinstance(item, (Stmt, Expr)):
+            stack.extend(getattr(item, name) for name in item.fields())
+        elif isinstance(item, list):
+            stack.extend(item)
+
+
+class IncrementalFrontEnd:
+    """
+    Scanner, parser and resolver front end that keeps its results across edits of the source.
+
+    An edit re-lexes the source from the declaration in front of the damaged one
+    until the token stream meets the start of an unchanged declaration again,
+    re-parses and re-resolves only the declarations in between, and reuses the
+    `Stmt` subtrees of all the other ones.
+    """
+
+    def __init__(
+        self,
+        src: str,
+        interpreter: Interpreter,
+        report_error: typing.Optional[typing.Callable] = None,
+    ) -> None:
+        self.interpreter = interpreter
+        self.report_error = report_error
+        self.src = src
+        # None while the source has a lexical error, see `rebuild`.
+        self.tokens: typing.Optional[TokenBuffer] = None
+        self.declarations: typing.List[Declaration] = []
+        self._last_error: typing.Optional[LoxException] = None
+        self.rebuild(src)
+
+    @property
+    def statements(self) -> typing.List[Stmt]:
+        return [d.stmt for d in self.declarations if d.stmt is not None]
+
+    @property
+    def errors(self) -> typing.List[LoxException]:
+        return [d.error for d in self.declarations if d.error is not None]
+
+    def rebuild(self, src: str) -> typing.List[Stmt]:
+        """Scan, parse and resolve `src` from scratch."""
+        self.src = src
+        self.tokens = None
+        self.declarations = []
+
+        self.tokens = CompactScanner(src).scan_tokens()
+        self.declarations, _ = self.parse(0, ())
+        self.resolve(self.declarations)
+        return self.statements
+
+    def edit(self, start: int, end: int, text: str) -> typing.List[Stmt]:
+        """
+        Replace `src[start:end]` with `text` and update the program.
+
+        Returns the statements that had to be parsed again.
+        """
+        old_src = self.src
+        src = old_src[:start] + text + old_src[end:]
+        old = self.tokens
+        if old is None or not self.declarations:
+            return self.rebuild(src)
+
+        delta = len(text) - (end - start)
+        line_delta = text.count("\n") - old_src.count("\n", start, end)
+
+        # An edit can only change a declaration it touches and, through the
+        # parser's one token lookahead (e.g. a new `else`), the one before it.
+        touched = bisect_left(
+            self.declarations, start, key=lambda d: self.end_offset(d)
+        )
+        damaged = max(touched - 1, 0)
+        first = self.declarations[damaged].first
+
+        # Lexing is context-free between tokens, so once a token starts where
+        # an unchanged declaration used to start, the rest is the same.
+        unchanged = [
+            i
+            for i in range(touched, len(self.declarations))
+            if old.starts[self.declarations[i].first] >= end
+        ]
+        resync = {
+            old.starts[self.declarations[i].first] + delta: i
+            for i in unchanged
+        }
+
+        tokens = TokenBuffer(src)
+        tokens.types = old.types[:first]
+        tokens.starts = old.starts[:first]
+        tokens.lengths = old.lengths[:first]
+
+        scanner = CompactScanner(src)
+        scanner.current = old.starts[first] if damaged else 0
+        scanner.line = src.count("\n", 0, scanner.current) + 1
+        self.src = src
+        self.tokens = None
+        if scanner.scan_into(tokens, resync):
+            suffix = self.declarations[resync[scanner.current]].first
+        else:
+            suffix = len(old)
+
+        # Tokens of the unchanged declarations only move by `delta`.
+        token_delta = len(tokens) - suffix
+        tokens.types.extend(old.types[suffix:])
+        tokens.starts.extend(map(delta.__add__, old.starts[suffix:]))
+        tokens.lengths.extend(old.lengths[suffix:])
+        tokens._newlines = self.shift_newlines(old, start, end, text)
+        self.tokens = tokens
+
+        reusable = {
+            self.declarations[i].first + token_delta: i
+            for i in unchanged
+            if self.declarations[i].first >= suffix
+        }
+        parsed, stop = self.parse(first, reusable)
+        self.resolve(parsed)
+
+        reused = (
+            self.declarations[reusable[stop] :] if stop in reusable else []
+        )
+        for declaration in reused:
+            declaration.first += token_delta
+            declaration.end += token_delta
+            if line_delta:
+                self.shift_lines(declaration, line_delta)
+
+        self.declarations = self.declarations[:damaged] + parsed + reused
+        return [d.stmt for d in parsed if d.stmt is not None]
+
+    @staticmethod
+    def shift_newlines(
+        old: TokenBuffer, start: int, end: int, text: str
+    ) -> array:
+        """Newline offsets of the edited source, derived from the old ones."""
+        newlines = old.newlines
+        low = bisect_left(newlines, start)
+        high = bisect_left(newlines, end)
+        delta = len(text) - (end - start)
+        shifted = newlines[:low]
+        shifted.extend(start + m.start() for m in re.finditer("\n", text))
+        shifted.extend(map(delta.__add__, newlines[high:]))
+        return shifted
+
+    def end_offset(self, declaration: Declaration) -> int:
+        tokens = typing.cast(TokenBuffer, self.tokens)
+        last = declaration.end - 1
+        return tokens.starts[last] + tokens.lengths[last]
+
+    def parse(
+        self, first: int, stop_at: typing.Container[int]
+    ) -> typing.Tuple[typing.List[Declaration], int]:
+        """Parse declarations from token `first` until EOF or a token index in `stop_at`."""
+        parser = Parser(typing.cast(TokenBuffer, self.tokens), self.record)
+        parser.current = first
+        declarations: typing.List[Declaration] = []
+
+        while not parser.is_at_end() and parser.current not in stop_at:
+            self._last_error = None
+            start = parser.current
+            stmt = parser.declaration()
+            declarations.append(
+                Declaration(stmt, start, parser.current, self._last_error)
+            )
+
+        return declarations, parser.current
+
+    def resolve(self, declarations: typing.List[Declaration]) -> None:
+        for declaration in declarations:
+            if declaration.stmt is None:
+                continue
+            try:
+                Resolver(self.interpreter).resolve([declaration.stmt])
+            except LoxParseError as err:
+                declaration.error = err
+                self.record(err)
+
+    def record(self, err: LoxException) -> None:
+        if self._last_error is None:
+            self._last_error = err
+        if self.report_error is not None:
+            self.report_error(err)
+
+    @staticmethod
+    def shift_lines(declaration: Declaration, line_delta: int) -> None:
+        if declaration.error is not None:
+            declaration.error.line += line_delta
+        if declaration.stmt is None:
+            return
+
+        seen: typing.Set[int] = set()
+        for token in tokens_of(declaration.stmt):
+            if id(token) not in seen:
+                seen.add(id(token))
+                token.line += line_delta
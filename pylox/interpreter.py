@@ -4,27 +4,73 @@ import pylox.expr as expr_ast
 import pylox.runtime_entity as runtime
 import pylox.stmt as stmt_ast
 from pylox.builtin_function import FUNCTIONS_MAPPING
-from pylox.environment import Environment
+from pylox.environment import Frame, Globals
 from pylox.error import LoxRuntimeError
 from pylox.expr import Expr, ExprVisitor
+from pylox.quickening import (
+    NUMBERS,
+    NumberBinary,
+    NumberNegate,
+    Quickening,
+    StringConcat,
+)
 from pylox.runtime_entity import LoxFunction
 from pylox.scanner import Token, TokenType
+from pylox.stackless import Stackless
 from pylox.stmt import Stmt, StmtVisitor
 
+# nodes that carry what the resolver found out about them
+RESOLVED_EXPR_T = (
+    expr_ast.Assign | expr_ast.Super | expr_ast.This | expr_ast.Variable
+)
+DECLARATION_T = stmt_ast.Class | stmt_ast.Function | stmt_ast.Var
+FRAME_T = stmt_ast.Block | stmt_ast.For | stmt_ast.Function
+
 
 class Interpreter(ExprVisitor, StmtVisitor):
+    # Lox calls nested on the Python stack, the deeper ones use a heap stack
+    MAX_HOST_DEPTH = 32
+
     def __init__(self) -> None:
-        self.globals = Environment()
-        self.locals: typing.Dict[Expr, int] = {}
-        self.environment = self.globals
+        self.globals = Globals()
+        # Globals live in `self.globals`, the outermost frame stays empty.
+        self.environment = Frame([])
+        self.host_depth = 0
+        self.stackless = Stackless(self)
+        self.quickening = Quickening()
         self.init_standard_library()
 
     def init_standard_library(self) -> None:
         for name, func in FUNCTIONS_MAPPING.items():
             self.globals.define(name, func)
 
-    def resolve(self, expr: Expr, depth: int) -> None:
-        self.locals[expr] = depth
+    def resolve(self, expr: RESOLVED_EXPR_T, depth: int, slot: int) -> None:
+        expr.depth = depth
+        expr.slot = slot
+
+    def resolve_global(self, expr: RESOLVED_EXPR_T, name: Token) -> None:
+        expr.slot = self.globals.slot(name.lexeme)
+
+    def resolve_declaration(self, stmt: DECLARATION_T, slot: int) -> None:
+        stmt.slot = slot
+
+    def resolve_frame(
+        self, stmt: FRAME_T, size: int, uncaptured: typing.Tuple[int, ...]
+    ) -> None:
+        stmt.frame_size = size
+        stmt.uncaptured = uncaptured
+
+    def resolve_loop(self, stmt: stmt_ast.For, counted: bool) -> None:
+        stmt.counted = counted
+
+    def define(
+        self, declaration: DECLARATION_T, name: Token, value: typing.Any
+    ) -> None:
+        slot = declaration.slot
+        if slot is None:
+            self.globals.define(name.lexeme, value)
+        else:
+            self.environment.values[slot] = value
 
     def interpret(self, statements: list[Stmt]):
         for statement in statements:
@@ -33,17 +79,32 @@ class Interpreter(ExprVisitor, StmtVisitor):
     def interpret_expr(self, expr: Expr) -> str:
         return self.stringify(self.evaluate(expr))
 
-    def execute(self, stmt: Stmt):
-        stmt.accept(self)
+    def execute(self, stmt: Stmt) -> runtime.COMPLETION_T:
+        return stmt.accept(self)
 
     def evaluate(self, expr: Expr) -> typing.Any:
         return expr.accept(self)
 
     def visit_return_stmt(self, stmt: stmt_ast.Return) -> typing.Any:
+        if type(stmt.value) is expr_ast.Call:
+            return self.tail_call(stmt.value)
+
         value = None
         if stmt.value is not None:
             value = self.evaluate(stmt.value)
-        raise runtime.Return(value)
+        return runtime.Return(value)
+
+    def tail_call(self, expr: expr_ast.Call) -> runtime.COMPLETION_T:
+        """
+        Return the value of a call without nesting it: a Lox function is
+        left for the caller's `call_in` to run.
+        """
+        receiver, callee, arguments = self.call_operands(expr)
+        if not self.is_direct(expr, callee):
+            self.check_call(expr.paren, receiver, callee, arguments)
+        if isinstance(callee, LoxFunction):
+            return runtime.TailCall(callee, receiver, arguments)
+        return runtime.Return(callee.call(self, arguments))
 
     def visit_class_stmt(self, stmt: stmt_ast.Class) -> typing.Any:
         superclass = None
@@ -54,16 +115,18 @@ class Interpreter(ExprVisitor, StmtVisitor):
                     stmt.superclass.name, "Superclass must be a class."
                 )
 
-        self.environment.define(stmt.name.lexeme, None)
+        self.define(stmt, stmt.name, None)
 
         if stmt.superclass is not None:
-            self.environment = Environment(enclosing=self.environment)
-            self.environment.define("super", superclass)
+            self.environment = Frame([superclass], self.environment)
 
         methods: typing.Dict[str, runtime.LoxFunction] = {}
         for method in stmt.methods:
             function = LoxFunction(
-                method, self.environment, method.name.lexeme == "init"
+                method,
+                self.environment,
+                method.name.lexeme == "init",
+                method.frame_size,
             )
             methods[method.name.lexeme] = function
 
@@ -71,72 +134,226 @@ class Interpreter(ExprVisitor, StmtVisitor):
             stmt.name.lexeme,
             typing.cast(runtime.LoxClass, superclass),
             methods,
+            stmt,
         )
 
         if superclass is not None:
-            self.environment = self.environment.enclosing
+            self.environment = typing.cast(Frame, self.environment.enclosing)
 
-        self.environment.assign(stmt.name, lox_class)
+        self.define(stmt, stmt.name, lox_class)
         return None
 
     def visit_function_stmt(self, stmt: stmt_ast.Function) -> typing.Any:
-        function = LoxFunction(stmt, self.environment, False)
-        self.environment.define(stmt.name.lexeme, function)
+        function = LoxFunction(stmt, self.environment, False, stmt.frame_size)
+        self.define(stmt, stmt.name, function)
         return None
 
     def visit_call_expr(self, expr: expr_ast.Call) -> typing.Any:
-        callee = self.evaluate(expr.callee)
-        arguments: list = []
-        for arg in expr.arguments:
-            arguments.append(self.evaluate(arg))
+        # `obj.m(...)` and `super.m(...)` call the method directly on its
+        # receiver, without binding it to a new function first.
+        receiver, callee, arguments = self.call_operands(expr)
+        # the optimizer checked the arity of the declaration it found
+        if not self.is_direct(expr, callee):
+            self.check_call(expr.paren, receiver, callee, arguments)
+        if receiver is not None:
+            return callee.invoke(self, receiver, arguments)
+        return callee.call(self, arguments)
+
+    def call_operands(
+        self, expr: expr_ast.Call
+    ) -> typing.Tuple[typing.Optional[runtime.LoxInstance], typing.Any, list]:
+        """Evaluate the receiver, the callee and the arguments of a call."""
+        receiver = None
+        if type(expr.callee) is expr_ast.Get:
+            receiver, callee = self.find_property(expr.callee)
+        elif type(expr.callee) is expr_ast.Super:
+            receiver, callee = self.find_super_method(expr.callee)
+        else:
+            callee = self.evaluate(expr.callee)
+        arguments = [self.evaluate(arg) for arg in expr.arguments]
+        return receiver, callee, arguments
+
+    @staticmethod
+    def is_direct(expr: expr_ast.Call, callee: typing.Any) -> bool:
+        """Whether `callee` is the checked target of a devirtualized call."""
+        target = expr.target
+        return target is not None and (
+            getattr(callee, "declaration", None) is target.declaration
+        )
 
-        if not isinstance(callee, runtime.LoxCallable):
+    @staticmethod
+    def check_call(
+        paren: Token,
+        receiver: typing.Optional[runtime.LoxInstance],
+        callee: typing.Any,
+        arguments: list,
+    ) -> None:
+        if receiver is None and not isinstance(callee, runtime.LoxCallable):
             raise LoxRuntimeError(
-                expr.paren, "Can only call functions and classes."
+                paren, "Can only call functions and classes."
             )
 
         if len(arguments) != callee.arity():
             raise LoxRuntimeError(
-                expr.paren,
+                paren,
                 f"Expected {callee.arity()} arguments but got {len(arguments)}.",
             )
 
-        return callee.call(self, arguments)
-
     def visit_if_stmt(self, stmt: stmt_ast.If) -> typing.Any:
         if self.is_truthy(self.evaluate(stmt.condition)):
-            self.execute(stmt.then_branch)
+            return self.execute(stmt.then_branch)
         elif stmt.else_branch is not None:
-            self.execute(stmt.else_branch)
+            return self.execute(stmt.else_branch)
 
         return None
 
     def visit_while_stmt(self, stmt: stmt_ast.While) -> typing.Any:
+        while self.is_truthy(self.evaluate(stmt.condition)):
+            completion = self.execute(stmt.body)
+            if completion is not None:
+                if completion is runtime.BREAK:
+                    break
+                return completion
+
+        return None
+
+    def visit_for_stmt(self, stmt: stmt_ast.For) -> typing.Any:
+        if stmt.frame_size == 0:  # no `var`, nothing to hold
+            if stmt.initializer is not None:
+                self.execute(stmt.initializer)
+            return self.for_loop(stmt)
+
+        # one frame for the whole loop, the body opens its own if it needs one
+        previous = self.environment
+        self.environment = Frame([None] * stmt.frame_size, previous)
         try:
-            while self.is_truthy(self.evaluate(stmt.condition)):
-                self.execute(stmt.body)
-        except runtime.BreakException:
-            pass  # Do nothing.
+            if stmt.initializer is not None:
+                self.execute(stmt.initializer)
+            if stmt.counted:
+                values = self.environment.values
+                slot = self.counter_slot(stmt)
+                counter = self.counted_range(stmt, values[slot])
+                if counter is not None:
+                    return self.counted_loop(stmt.body, counter, values, slot)
+            return self.for_loop(stmt)
+        finally:
+            if stmt.uncaptured:
+                self.release(self.environment, stmt.uncaptured)
+            self.environment = previous
+
+    def for_loop(self, stmt: stmt_ast.For) -> runtime.COMPLETION_T:
+        condition, increment = stmt.condition, stmt.increment
+        while condition is None or self.is_truthy(self.evaluate(condition)):
+            completion = self.execute(stmt.body)
+            if completion is not None:
+                if completion is runtime.BREAK:
+                    break
+                return completion
+            if increment is not None:
+                self.evaluate(increment)
+        return None
 
+    def counted_loop(
+        self, body: Stmt, counter: range, values: list, slot: int
+    ) -> runtime.COMPLETION_T:
+        step = counter.step
+        for i in counter:
+            completion = body.accept(self)
+            if completion is not None:
+                if completion is runtime.BREAK:
+                    break
+                return completion
+            values[slot] = float(i + step)
+        return None
+
+    @staticmethod
+    def counter_slot(stmt: stmt_ast.For) -> int:
+        """Slot of the variable that a counted loop counts with."""
+        return typing.cast(
+            int, typing.cast(stmt_ast.Var, stmt.initializer).slot
+        )
+
+    @staticmethod
+    def counted_range(
+        stmt: stmt_ast.For, start: typing.Any
+    ) -> typing.Optional[range]:
+        """
+        The values of the variable of a counted loop that starts at `start`,
+        for the iterations that run, or None unless they are all integers.
+
+        Lox numbers are floats, but floats count integers exactly up to 2**53,
+        so the loop can count with a `range` and give the body the same
+        values. A loop that never ends, or counts fractions, gets None.
+        """
+        if type(start) not in NUMBERS:
+            return None
+        condition = typing.cast(expr_ast.Binary, stmt.condition)
+        increment = typing.cast(expr_ast.Assign, stmt.increment)
+        step_expr = typing.cast(expr_ast.Binary, increment.value)
+        limit = float(typing.cast(expr_ast.Literal, condition.right).value)
+        step = float(typing.cast(expr_ast.Literal, step_expr.right).value)
+        if step_expr.operator.token_type is TokenType.MINUS:
+            step = -step
+        for number in (float(start), limit, step):
+            if not number.is_integer() or abs(number) >= 2**53:
+                return None
+
+        first, last, by = int(start), int(limit), int(step)
+        match condition.operator.token_type:
+            case TokenType.LESS if by > 0:
+                return range(first, last, by)
+            case TokenType.LESS_EQUAL if by > 0:
+                return range(first, last + 1, by)
+            case TokenType.GREATER if by < 0:
+                return range(first, last, by)
+            case TokenType.GREATER_EQUAL if by < 0:
+                return range(first, last - 1, by)
         return None
 
     def visit_break_stmt(self, stmt) -> typing.Any:
-        raise runtime.BreakException()
+        return runtime.BREAK
 
     def visit_block_stmt(self, stmt: stmt_ast.Block) -> typing.Any:
-        self.execute_block(stmt.statements, Environment(self.environment))
-        return None
+        if stmt.frame_size == 0:  # declares nothing, see `Resolver`
+            return self.execute_block(stmt.statements, self.environment)
+        frame = Frame([None] * stmt.frame_size, self.environment)
+        return self.execute_block(stmt.statements, frame, stmt.uncaptured)
 
     def execute_block(
-        self, statements: typing.List[Stmt], env: Environment
-    ) -> None:
+        self,
+        statements: typing.List[Stmt],
+        env: Frame,
+        uncaptured: typing.Tuple[int, ...] = (),
+    ) -> runtime.COMPLETION_T:
+        """
+        Run `statements` in `env` until one of them completes abruptly, then
+        clear the `uncaptured` slots of `env`.
+
+        `return` and `break` are not exceptions: they are completions that
+        every statement returns to the one that contains it.
+        """
         previous = self.environment
         try:
             self.environment = env
             for stmt in statements:
-                self.execute(stmt)
+                completion = stmt.accept(self)
+                if completion is not None:
+                    return completion
+            return None
         finally:
             self.environment = previous
+            if uncaptured:
+                self.release(env, uncaptured)
+
+    @staticmethod
+    def release(frame: Frame, uncaptured: typing.Tuple[int, ...]) -> None:
+        """
+        Drop the values that no closure made in `frame` can read, so that
+        the closures that outlive the frame do not keep them alive.
+        """
+        values = frame.values
+        for slot in uncaptured:
+            values[slot] = None
 
     def visit_var_stmt(self, stmt: stmt_ast.Var) -> typing.Any:
         value: typing.Any = None
@@ -144,7 +361,7 @@ class Interpreter(ExprVisitor, StmtVisitor):
         if stmt.initializer is not None:
             value = self.evaluate(stmt.initializer)
 
-        self.environment.define(stmt.name.lexeme, value)
+        self.define(stmt, stmt.name, value)
         return None
 
     def visit_expression_stmt(self, stmt: stmt_ast.Expression) -> typing.Any:
@@ -157,13 +374,20 @@ class Interpreter(ExprVisitor, StmtVisitor):
         return None
 
     def visit_super_expr(self, expr: expr_ast.Super) -> typing.Any:
-        distance = self.locals[expr]
+        obj, method = self.find_super_method(expr)
+        return method.bind(obj)
+
+    def find_super_method(
+        self, expr: expr_ast.Super
+    ) -> typing.Tuple[runtime.LoxInstance, runtime.LoxFunction]:
+        distance = typing.cast(int, expr.depth)
 
         superclass = typing.cast(
-            runtime.LoxClass, self.environment.get_at(distance, "super")
+            runtime.LoxClass, self.environment.get_at(distance, expr.slot)
         )
+        # `this` is the only variable of the scope right inside `super`'s
         obj = typing.cast(
-            runtime.LoxInstance, self.environment.get_at(distance - 1, "this")
+            runtime.LoxInstance, self.environment.get_at(distance - 1, 0)
         )
 
         method = superclass.find_method(expr.method.lexeme)
@@ -172,18 +396,19 @@ class Interpreter(ExprVisitor, StmtVisitor):
                 expr.method, f"Undefined property '{expr.method.lexeme}'."
             )
 
-        return method.bind(obj)
+        return obj, method
 
     def visit_this_expr(self, expr: expr_ast.This) -> typing.Any:
         return self.lookup_variable(expr.keyword, expr)
 
     def visit_assign_expr(self, expr: expr_ast.Assign) -> typing.Any:
-        value = self.evaluate(expr.value)
-        distance = self.locals.get(expr)
-        if distance is not None:
-            self.environment.assign_at(distance, expr.name, value)
+        return self.assign(expr, self.evaluate(expr.value))
+
+    def assign(self, expr: expr_ast.Assign, value: typing.Any) -> typing.Any:
+        if expr.depth is not None:
+            self.environment.assign_at(expr.depth, expr.slot, value)
         else:
-            self.globals.assign(expr.name, value)
+            self.globals.assign_at(expr.slot, expr.name, value)
         return value
 
     def visit_logical_expr(self, expr: expr_ast.Logical) -> typing.Any:
@@ -208,32 +433,94 @@ class Interpreter(ExprVisitor, StmtVisitor):
 
     def visit_get_expr(self, expr: expr_ast.Get) -> typing.Any:
         obj = self.evaluate(expr.obj)
-        if isinstance(obj, runtime.LoxInstance):
-            return typing.cast(runtime.LoxInstance, obj).get(expr.name)
+        if not isinstance(obj, runtime.LoxInstance):
+            raise LoxRuntimeError(expr.name, "Only instances have properties.")
+
+        name = expr.name.lexeme
+        offset = obj.shape.offsets.get(name)
+        if offset is not None:
+            return obj.values[offset]
+
+        method = obj.lox_class.find_method(name)
+        if method is not None:
+            return method.bind(obj)
+
+        raise LoxRuntimeError(expr.name, f"Undefined property '{name}'.")
+
+    def find_property(
+        self, expr: expr_ast.Get
+    ) -> typing.Tuple[typing.Optional[runtime.LoxInstance], typing.Any]:
+        """
+        Like `visit_get_expr`, but a method is returned unbound, with the
+        instance to call it on; the instance is None for a field.
+        """
+        return self.property_of(expr, self.evaluate(expr.obj))
+
+    def property_of(
+        self, expr: expr_ast.Get, obj: typing.Any
+    ) -> typing.Tuple[typing.Optional[runtime.LoxInstance], typing.Any]:
+        """`find_property` once the object is evaluated."""
+        if not isinstance(obj, runtime.LoxInstance):
+            raise LoxRuntimeError(expr.name, "Only instances have properties.")
 
-        raise LoxRuntimeError(expr.name, "Only instances have properties.")
+        name = expr.name.lexeme
+        offset = obj.shape.offsets.get(name)
+        if offset is not None:
+            return None, obj.values[offset]
 
-    def visit_set_expr(self, expr: expr_ast.Set) -> typing.Any:
-        obj = self.evaluate(expr.obj)
+        method = obj.lox_class.find_method(name)
+        if method is not None:
+            return obj, method
 
-        if not isinstance(obj, runtime.LoxInstance):
-            raise LoxRuntimeError(expr.name, "Only instances have fields.")
+        raise LoxRuntimeError(expr.name, f"Undefined property '{name}'.")
 
+    def visit_set_expr(self, expr: expr_ast.Set) -> typing.Any:
+        obj = self.evaluate(expr.obj)
+        self.check_instance(expr, obj)
         value = self.evaluate(expr.value)
         typing.cast(runtime.LoxInstance, obj).set(expr.name, value)
         return value
 
-    def lookup_variable(self, name: Token, expr: Expr) -> typing.Any:
-        distance = self.locals.get(expr)
-        if distance is not None:
-            return self.environment.get_at(distance, name.lexeme)
+    @staticmethod
+    def check_instance(expr: expr_ast.Set, obj: typing.Any) -> None:
+        if not isinstance(obj, runtime.LoxInstance):
+            raise LoxRuntimeError(expr.name, "Only instances have fields.")
+
+    def lookup_variable(
+        self, name: Token, expr: expr_ast.This | expr_ast.Variable
+    ) -> typing.Any:
+        if expr.depth is not None:
+            return self.environment.get_at(expr.depth, expr.slot)
         else:
-            return self.globals.get(name)
+            return self.globals.get_at(expr.slot, name)
 
     def visit_binary_expr(self, expr: expr_ast.Binary) -> typing.Any:
         left = self.evaluate(expr.left)
         right = self.evaluate(expr.right)
+        if expr.feedback is not False:
+            self.quickening.observe_binary(expr, left, right)
+        return self.binary(expr, left, right)
 
+    def visit_number_binary_expr(self, expr: NumberBinary) -> typing.Any:
+        left = self.evaluate(expr.left)
+        right = self.evaluate(expr.right)
+        if type(left) in NUMBERS and type(right) in NUMBERS:
+            return expr.operation(float(left), float(right))
+        self.quickening.deoptimize(expr)
+        return self.binary(expr, left, right)
+
+    def visit_string_concat_expr(self, expr: StringConcat) -> typing.Any:
+        left = self.evaluate(expr.left)
+        right = self.evaluate(expr.right)
+        if type(left) is str and type(right) is str:
+            return left + right
+        self.quickening.deoptimize(expr)
+        return self.binary(expr, left, right)
+
+    def binary(
+        self, expr: expr_ast.Binary, left: typing.Any, right: typing.Any
+    ) -> typing.Any:
+        """Apply the operator of `expr` to its evaluated operands."""
         match expr.operator.token_type:
             case TokenType.GREATER:
                 self.check_number_operands(expr.operator, left, right)
@@ -285,7 +572,19 @@ class Interpreter(ExprVisitor, StmtVisitor):
 
     def visit_unary_expr(self, expr: expr_ast.Unary) -> typing.Any:
         right = self.evaluate(expr.right)
+        if expr.feedback is not False:
+            self.quickening.observe_unary(expr, right)
+        return self.unary(expr, right)
+
+    def visit_number_negate_expr(self, expr: NumberNegate) -> typing.Any:
+        right = self.evaluate(expr.right)
+        if type(right) in NUMBERS:
+            return -float(right)
+        self.quickening.deoptimize(expr)
+        return self.unary(expr, right)
 
+    def unary(self, expr: expr_ast.Unary, right: typing.Any) -> typing.Any:
+        """Apply the operator of `expr` to its evaluated operand."""
         if expr.operator.token_type is TokenType.MINUS:
             self.check_number_operand(expr.operator, right)
             return -float(right)
@@ -0,0 +1,60 @@
+import typing
+
+_next_id = 0
+
+
+def next_node_id() -> int:
+    global _next_id
+    node_id = _next_id
+    _next_id += 1
+    return node_id
+
+
+def node_count() -> int:
+    """Number of node ids handed out so far, i.e. the size of a side table."""
+    return _next_id
+
+
+def walk(nodes: typing.Iterable["Node"]) -> typing.Iterator["Node"]:
+    """Every node of the trees rooted at `nodes`, parents first."""
+    stack = list(nodes)[::-1]
+    while stack:
+        node = stack.pop()
+        yield node
+        children: typing.List[Node] = []
+        for name in node.fields():
+            value = getattr(node, name)
+            if isinstance(value, Node):
+                children.append(value)
+            elif isinstance(value, list):
+                children.extend(v for v in value if isinstance(v, Node))
+        stack.extend(reversed(children))
+
+
+class Node:
+    """
+    Base of `Expr` and `Stmt` nodes.
+
+    Nodes have `__slots__` instead of a `__dict__` and a dense integer
+    `node_id`, unique across both hierarchies, that can index per-node side
+    tables stored in plain lists.
+    """
+
+    __slots__ = ("node_id",)
+
+    node_id: int
+
+    def __setstate__(
+        self, state: typing.Tuple[None, typing.Dict[str, typing.Any]]
+    ) -> None:
+        # An unpickled node gets a fresh id, it must not collide with the
+        # nodes of this process.
+        _, slots = state
+        for name, value in slots.items():
+            setattr(self, name, value)
+        self.node_id = next_node_id()
+
+    @classmethod
+    def fields(cls) -> typing.Tuple[str, ...]:
+        """Names of the node's children and attributes, without `node_id`."""
+        return typing.cast(typing.Tuple[str, ...], cls.__slots__)
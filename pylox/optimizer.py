@@ -0,0 +1,424 @@
+import typing
+
+import pylox.expr as expr_ast
+import pylox.stmt as stmt_ast
+from pylox.error import LoxRuntimeError
+from pylox.expr import Expr, ExprVisitor
+from pylox.interpreter import Interpreter
+from pylox.node import walk
+from pylox.resolver import Resolver
+from pylox.scanner import TokenType
+from pylox.stmt import Stmt, StmtVisitor
+from pylox.tokens import Token
+
+
+class Pass(ExprVisitor, StmtVisitor):
+    """
+    Rewrite of a resolved program, counting the changes it makes.
+
+    Passes run after the resolver, so they only ever fold or drop nodes:
+    the slots and frame sizes recorded on the remaining nodes stay valid.
+    Visiting a statement returns its replacement, or None to remove it.
+    """
+
+    name = ""
+
+    def __init__(self) -> None:
+        self.changes = 0
+
+    def run(self, statements: typing.List[Stmt]) -> typing.List[Stmt]:
+        return self.statements(statements)
+
+    def statements(self, statements: typing.List[Stmt]) -> typing.List[Stmt]:
+        result = []
+        for statement in statements:
+            replacement = statement.accept(self)
+            if replacement is not None:
+                result.append(replacement)
+        return result
+
+    def statement(self, stmt: Stmt) -> Stmt:
+        """Visit a statement that cannot be removed, only emptied."""
+        replacement = stmt.accept(self)
+        return stmt_ast.Block([]) if replacement is None else replacement
+
+    def expression(self, expr: Expr) -> Expr:
+        return expr.accept(self)
+
+    def visit_assign_expr(self, expr: expr_ast.Assign) -> Expr:
+        expr.value = self.expression(expr.value)
+        return expr
+
+    def visit_binary_expr(self, expr: expr_ast.Binary) -> Expr:
+        expr.left = self.expression(expr.left)
+        expr.right = self.expression(expr.right)
+        return expr
+
+    def visit_call_expr(self, expr: expr_ast.Call) -> Expr:
+        expr.callee = self.expression(expr.callee)
+        expr.arguments = [self.expression(arg) for arg in expr.arguments]
+        return expr
+
+    def visit_get_expr(self, expr: expr_ast.Get) -> Expr:
+        expr.obj = self.expression(expr.obj)
+        return expr
+
+    def visit_grouping_expr(self, expr: expr_ast.Grouping) -> Expr:
+        expr.expr = self.expression(expr.expr)
+        return expr
+
+    def visit_literal_expr(self, expr: expr_ast.Literal) -> Expr:
+        return expr
+
+    def visit_logical_expr(self, expr: expr_ast.Logical) -> Expr:
+        expr.left = self.expression(expr.left)
+        expr.right = self.expression(expr.right)
+        return expr
+
+    def visit_set_expr(self, expr: expr_ast.Set) -> Expr:
+        expr.obj = self.expression(expr.obj)
+        expr.value = self.expression(expr.value)
+        return expr
+
+    def visit_super_expr(self, expr: expr_ast.Super) -> Expr:
+        return expr
+
+    def visit_this_expr(self, expr: expr_ast.This) -> Expr:
+        return expr
+
+    def visit_unary_expr(self, expr: expr_ast.Unary) -> Expr:
+        expr.right = self.expression(expr.right)
+        return expr
+
+    def visit_variable_expr(self, expr: expr_ast.Variable) -> Expr:
+        return expr
+
+    def visit_block_stmt(self, stmt: stmt_ast.Block) -> typing.Optional[Stmt]:
+        stmt.statements = self.statements(stmt.statements)
+        return stmt
+
+    def visit_class_stmt(self, stmt: stmt_ast.Class) -> typing.Optional[Stmt]:
+        if stmt.superclass is not None:
+            self.expression(stmt.superclass)
+        for method in stmt.methods:
+            method.accept(self)
+        return stmt
+
+    def visit_expression_stmt(
+        self, stmt: stmt_ast.Expression
+    ) -> typing.Optional[Stmt]:
+        stmt.expr = self.expression(stmt.expr)
+        return stmt
+
+    def visit_function_stmt(
+        self, stmt: stmt_ast.Function
+    ) -> typing.Optional[Stmt]:
+        stmt.body = self.statements(stmt.body)
+        return stmt
+
+    def visit_if_stmt(self, stmt: stmt_ast.If) -> typing.Optional[Stmt]:
+        stmt.condition = self.expression(stmt.condition)
+        stmt.then_branch = self.statement(stmt.then_branch)
+        if stmt.else_branch is not None:
+            stmt.else_branch = self.statement(stmt.else_branch)
+        return stmt
+
+    def visit_print_stmt(self, stmt: stmt_ast.Print) -> typing.Optional[Stmt]:
+        stmt.expr = self.expression(stmt.expr)
+        return stmt
+
+    def visit_return_stmt(
+        self, stmt: stmt_ast.Return
+    ) -> typing.Optional[Stmt]:
+        if stmt.value is not None:
+            stmt.value = self.expression(stmt.value)
+        return stmt
+
+    def visit_var_stmt(self, stmt: stmt_ast.Var) -> typing.Optional[Stmt]:
+        if stmt.initializer is not None:
+            stmt.initializer = self.expression(stmt.initializer)
+        return stmt
+
+    def visit_while_stmt(self, stmt: stmt_ast.While) -> typing.Optional[Stmt]:
+        stmt.condition = self.expression(stmt.condition)
+        stmt.body = self.statement(stmt.body)
+        return stmt
+
+    def visit_for_stmt(self, stmt: stmt_ast.For) -> typing.Optional[Stmt]:
+        if stmt.initializer is not None:
+            stmt.initializer = self.statement(stmt.initializer)
+        if stmt.condition is not None:
+            stmt.condition = self.expression(stmt.condition)
+        if stmt.increment is not None:
+            stmt.increment = self.expression(stmt.increment)
+        stmt.body = self.statement(stmt.body)
+        return stmt
+
+    def visit_break_stmt(self, stmt: stmt_ast.Break) -> typing.Optional[Stmt]:
+        return stmt
+
+
+class ConstantFolding(Pass):
+    """
+    Evaluate operators whose operands are literals.
+
+    Folding uses the tree-walking `Interpreter` itself, so the results are
+    exactly the run-time ones. An operation that would fail, like a division
+    by zero or `"a" - 1`, is left alone to fail at run time, on its line.
+    """
+
+    name = "constant folding"
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.interpreter = Interpreter()
+
+    def fold(self, expr: Expr) -> Expr:
+        try:
+            value = self.interpreter.evaluate(expr)
+        except LoxRuntimeError:
+            return expr
+        self.changes += 1
+        return expr_ast.Literal(value)
+
+    def visit_binary_expr(self, expr: expr_ast.Binary) -> Expr:
+        super().visit_binary_expr(expr)
+        if isinstance(expr.left, expr_ast.Literal) and isinstance(
+            expr.right, expr_ast.Literal
+        ):
+            return self.fold(expr)
+        return expr
+
+    def visit_unary_expr(self, expr: expr_ast.Unary) -> Expr:
+        super().visit_unary_expr(expr)
+        if isinstance(expr.right, expr_ast.Literal):
+            return self.fold(expr)
+        return expr
+
+    def visit_grouping_expr(self, expr: expr_ast.Grouping) -> Expr:
+        super().visit_grouping_expr(expr)
+        if isinstance(expr.expr, expr_ast.Literal):
+            self.changes += 1
+            return expr.expr
+        return expr
+
+    def visit_logical_expr(self, expr: expr_ast.Logical) -> Expr:
+        super().visit_logical_expr(expr)
+        if not isinstance(expr.left, expr_ast.Literal):
+            return expr
+        self.changes += 1
+        truthy = Interpreter.is_truthy(expr.left.value)
+        if truthy == (expr.operator.token_type is TokenType.OR):
+            return expr.left
+        return expr.right
+
+    def visit_for_stmt(self, stmt: stmt_ast.For) -> typing.Optional[Stmt]:
+        super().visit_for_stmt(stmt)
+        # `i < 10 * 10` counts once folded
+        stmt.counted = Resolver.is_counted(stmt)
+        return stmt
+
+
+class DeadBranchElimination(Pass):
+    """Drop the branches of `if` and loops that a literal rules out."""
+
+    name = "dead branch elimination"
+
+    def visit_if_stmt(self, stmt: stmt_ast.If) -> typing.Optional[Stmt]:
+        super().visit_if_stmt(stmt)
+        if not isinstance(stmt.condition, expr_ast.Literal):
+            return stmt
+        self.changes += 1
+        if Interpreter.is_truthy(stmt.condition.value):
+            return stmt.then_branch
+        return stmt.else_branch
+
+    def visit_while_stmt(self, stmt: stmt_ast.While) -> typing.Optional[Stmt]:
+        super().visit_while_stmt(stmt)
+        if isinstance(stmt.condition, expr_ast.Literal):
+            if not Interpreter.is_truthy(stmt.condition.value):
+                self.changes += 1
+                return None
+        return stmt
+
+    def visit_for_stmt(self, stmt: stmt_ast.For) -> typing.Optional[Stmt]:
+        super().visit_for_stmt(stmt)
+        if not isinstance(stmt.condition, expr_ast.Literal):
+            return stmt
+        if Interpreter.is_truthy(stmt.condition.value):
+            return stmt
+        self.changes += 1
+        if stmt.initializer is None:
+            return None
+        # the initializer still runs, in the scope of the loop
+        block = stmt_ast.Block([stmt.initializer])
+        block.frame_size = stmt.frame_size
+        block.uncaptured = stmt.uncaptured
+        return block
+
+
+class UnreachableCodeElimination(Pass):
+    """Drop the statements after a `return` or `break` in the same block."""
+
+    name = "unreachable code elimination"
+
+    def statements(self, statements: typing.List[Stmt]) -> typing.List[Stmt]:
+        result = super().statements(statements)
+        for i, statement in enumerate(result):
+            if self.terminates(statement):
+                self.changes += len(result) - i - 1
+                return result[: i + 1]
+        return result
+
+    @classmethod
+    def terminates(cls, stmt: Stmt) -> bool:
+        """Whether `stmt` never completes normally."""
+        if isinstance(stmt, (stmt_ast.Return, stmt_ast.Break)):
+            return True
+        if isinstance(stmt, stmt_ast.Block):
+            return bool(stmt.statements) and cls.terminates(
+                stmt.statements[-1]
+            )
+        if isinstance(stmt, stmt_ast.If):
+            return (
+                stmt.else_branch is not None
+                and cls.terminates(stmt.then_branch)
+                and cls.terminates(stmt.else_branch)
+            )
+        return False
+
+
+class CallTarget:
+    """The declaration a devirtualized call goes to, and its arity."""
+
+    __slots__ = ("declaration", "arity")
+
+    def __init__(
+        self, declaration: stmt_ast.Function | stmt_ast.Class, arity: int
+    ) -> None:
+        self.declaration = declaration
+        self.arity = arity
+
+
+class Devirtualization(Pass):
+    """
+    Turn calls of global functions and classes that are never reassigned
+    into direct calls.
+
+    A global declared once at the top level by `fun` or `class`, and never
+    assigned in the program, holds that declaration whenever it is defined.
+    Its calls with the right number of arguments get the declaration as
+    their `target`: the engines skip the callable and arity checks when the
+    callee comes from it. They still check that it does, since a later REPL
+    line can reassign the global. `sites` lists the callee names of the
+    devirtualized calls.
+    """
+
+    name = "devirtualization"
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.targets: typing.Dict[str, CallTarget] = {}
+        self.sites: typing.List[Token] = []
+
+    def run(self, statements: typing.List[Stmt]) -> typing.List[Stmt]:
+        self.targets = self.constant_declarations(statements)
+        return super().run(statements)
+
+    @classmethod
+    def constant_declarations(
+        cls, statements: typing.List[Stmt]
+    ) -> typing.Dict[str, CallTarget]:
+        """Call targets of the globals that `statements` never change."""
+        declared: typing.Dict[
+            str, typing.List[stmt_ast.Var | stmt_ast.Function | stmt_ast.Class]
+        ] = {}
+        for stmt in statements:
+            if isinstance(
+                stmt, (stmt_ast.Var, stmt_ast.Function, stmt_ast.Class)
+            ):
+                declared.setdefault(stmt.name.lexeme, []).append(stmt)
+        assigned = {
+            node.name.lexeme
+            for node in walk(statements)
+            if isinstance(node, expr_ast.Assign) and node.depth is None
+        }
+
+        targets = {}
+        for name, declarations in declared.items():
+            if len(declarations) != 1 or name in assigned:
+                continue
+            declaration = declarations[0]
+            if isinstance(declaration, stmt_ast.Var):
+                continue  # could hold anything
+            arity = cls.arity(declaration)
+            if arity is not None:
+                targets[name] = CallTarget(declaration, arity)
+        return targets
+
+    @staticmethod
+    def arity(
+        declaration: stmt_ast.Function | stmt_ast.Class,
+    ) -> typing.Optional[int]:
+        """Arity of calls to `declaration`, None if only known at run time."""
+        if isinstance(declaration, stmt_ast.Function):
+            return len(declaration.params)
+        for method in declaration.methods:
+            if method.name.lexeme == "init":
+                return len(method.params)
+        # an inherited initializer is the one of whatever the superclass is
+        return 0 if declaration.superclass is None else None
+
+    def visit_call_expr(self, expr: expr_ast.Call) -> Expr:
+        super().visit_call_expr(expr)
+        callee = expr.callee
+        if type(callee) is not expr_ast.Variable or callee.depth is not None:
+            return expr
+        target = self.targets.get(callee.name.lexeme)
+        # a call with the wrong number of arguments keeps failing at run time
+        if target is not None and target.arity == len(expr.arguments):
+            expr.target = target
+            self.changes += 1
+            self.sites.append(callee.name)
+        return expr
+
+
+PASSES: typing.List[typing.Type[Pass]] = [
+    ConstantFolding,
+    DeadBranchElimination,
+    UnreachableCodeElimination,
+    Devirtualization,
+]
+
+
+class Optimizer:
+    """
+    Runs a pipeline of passes over resolved programs.
+
+    `stats` maps every pass name to the number of changes it made, summed
+    over all the programs optimized so far, and `devirtualized` lists the
+    callee names of the calls `Devirtualization` made direct.
+    """
+
+    def __init__(
+        self, passes: typing.Sequence[typing.Type[Pass]] = tuple(PASSES)
+    ) -> None:
+        self.passes = passes
+        self.stats: typing.Dict[str, int] = {p.name: 0 for p in passes}
+        self.devirtualized: typing.List[Token] = []
+
+    def optimize(self, statements: typing.List[Stmt]) -> typing.List[Stmt]:
+        for pass_type in self.passes:
+            optimization = pass_type()
+            statements = optimization.run(statements)
+            self.stats[optimization.name] += optimization.changes
+            if isinstance(optimization, Devirtualization):
+                self.devirtualized.extend(optimization.sites)
+        return statements
+
+    def optimize_expr(self, expr: Expr) -> Expr:
+        for pass_type in self.passes:
+            optimization = pass_type()
+            expr = optimization.expression(expr)
+            self.stats[optimization.name] += optimization.changes
+        return expr
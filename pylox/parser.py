@@ -1,5 +1,7 @@
 import typing
-from typing import Callable, List, Optional, cast
+from array import array
+from collections import deque
+from typing import Callable, Iterator, Optional, Sequence, cast
 
 import pylox.expr as expr_ast
 import pylox.stmt as stmt_ast
@@ -7,14 +9,51 @@ from pylox.error import LoxParseError
 from pylox.expr import Expr
 from pylox.scanner import Token, TokenType
 from pylox.stmt import Stmt
+from pylox.tokens import TOKEN_TYPES, MaterializedTokens, TokenBuffer
+
+
+class TokenStream:
+    """
+    Index-based view over a token iterator that pulls tokens on demand.
+
+    The parser only looks at the current and the previous token, so everything
+    before them is dropped and memory stays bounded by the lookahead.
+    """
+
+    def __init__(self, tokens: Iterator[Token]) -> None:
+        self.tokens = tokens
+        self.window: typing.Deque[Token] = deque()
+        self.offset = 0  # index of the first token in the window
+
+    def __getitem__(self, index: int) -> Token:
+        while index - self.offset > 1:
+            self.window.popleft()
+            self.offset += 1
+
+        while index - self.offset >= len(self.window):
+            self.window.append(next(self.tokens))
+
+        return self.window[index - self.offset]
 
 
 # recursive descent, top-down parser
 class Parser:
     def __init__(
-        self, tokens: List[Token], report_error: Optional[Callable] = None
+        self,
+        tokens: Sequence[Token] | Iterator[Token],
+        report_error: Optional[Callable] = None,
     ) -> None:
-        self.tokens = tokens
+        self.tokens: Sequence[Token] | TokenStream | MaterializedTokens
+        # type codes of a `TokenBuffer`, checked without materializing tokens
+        self.types: Optional[array] = None
+        if isinstance(tokens, Iterator):
+            self.tokens = TokenStream(tokens)
+        elif isinstance(tokens, TokenBuffer):
+            # index the cache directly to skip a Python-level `__getitem__`
+            self.tokens = tokens.recent
+            self.types = tokens.types
+        else:
+            self.tokens = tokens
         self.current = 0
         self.report_error = report_error
         self.allow_expressions = False
@@ -22,13 +61,13 @@ class Parser:
 
     # program        → declaration * EOF;
     def parse(self) -> list[Stmt]:
-        statements: list[Stmt] = []
+        return list(self.iter_parse())
+
+    def iter_parse(self) -> Iterator[Stmt]:
         while not self.is_at_end():
             parsed = self.declaration()
             if parsed is not None:
-                statements.append(parsed)
-
-        return statements
+                yield parsed
 
     def parse_repl(self) -> typing.Any:
         try:
@@ -58,14 +97,12 @@ class Parser:
     def match(self, *token_types: TokenType) -> bool:
         for token_type in token_types:
             if self.check(token_type):
-                self.advance()
+                self.current += 1
                 return True
         return False
 
     def check(self, token_type: TokenType) -> bool:
-        if self.is_at_end():
-            return False
-        return self.peek().token_type == token_type
+        return self.peek_type() is token_type and not self.is_at_end()
 
     def advance(self) -> Token:
         if not self.is_at_end():
@@ -73,11 +110,16 @@ class Parser:
         return self.previous()
 
     def is_at_end(self) -> bool:
-        return self.peek().token_type == TokenType.EOF
+        return self.peek_type() is TokenType.EOF
 
     def peek(self) -> Token:
         return self.tokens[self.current]
 
+    def peek_type(self) -> TokenType:
+        if self.types is None:
+            return self.tokens[self.current].token_type
+        return TOKEN_TYPES[self.types[self.current]]
+
     def previous(self) -> Token:
         return self.tokens[self.current - 1]
 
@@ -99,23 +141,23 @@ class Parser:
         while not self.is_at_end():
             if self.previous().token_type == TokenType.SEMICOLON:
                 return
-            if self.peek().token_type == TokenType.CLASS:
+            if self.peek_type() == TokenType.CLASS:
                 return
-            elif self.peek().token_type == TokenType.FUN:
+            elif self.peek_type() == TokenType.FUN:
                 return
-            elif self.peek().token_type == TokenType.VAR:
+            elif self.peek_type() == TokenType.VAR:
                 return
-            elif self.peek().token_type == TokenType.FOR:
+            elif self.peek_type() == TokenType.FOR:
                 return
-            elif self.peek().token_type == TokenType.IF:
+            elif self.peek_type() == TokenType.IF:
                 return
-            elif self.peek().token_type == TokenType.WHILE:
+            elif self.peek_type() == TokenType.WHILE:
                 return
-            elif self.peek().token_type == TokenType.PRINT:
+            elif self.peek_type() == TokenType.PRINT:
                 return
-            elif self.peek().token_type == TokenType.RETURN:
+            elif self.peek_type() == TokenType.RETURN:
                 return
-            elif self.peek().token_type == TokenType.BREAK:
+            elif self.peek_type() == TokenType.BREAK:
                 return
             self.advance()
 
@@ -267,20 +309,7 @@ class Parser:
         self.consume(TokenType.RIGHT_PAREN, "Expect ')' after for clauses.")
 
         body = self.statement()
-
-        if increment is not None:
-            body = stmt_ast.Block([body, stmt_ast.Expression(increment)])
-
-        if condition is None:
-            condition = expr_ast.Literal(True)
-
-        result: stmt_ast.While | stmt_ast.Block = stmt_ast.While(
-            condition, body
-        )
-        if initializer is not None:
-            result = stmt_ast.Block([initializer, result])
-
-        return result
+        return stmt_ast.For(initializer, condition, increment, body)
 
     # ifStmt         → "if" "(" expression ")" statement
     #                ( "else" statement )? ;
@@ -528,3 +557,163 @@ class Parser:
             raise err
 
         raise self.error(self.peek(), "Expect expression")
+
+
+# binding powers, from loosest to tightest
+(
+    NO_PRECEDENCE,
+    ASSIGNMENT,
+    OR,
+    AND,
+    EQUALITY,
+    COMPARISON,
+    TERM,
+    FACTOR,
+    UNARY,
+    CALL,
+) = range(10)
+
+INFIX_PRECEDENCE = {
+    TokenType.EQUAL: ASSIGNMENT,
+    TokenType.OR: OR,
+    TokenType.AND: AND,
+    TokenType.BANG_EQUAL: EQUALITY,
+    TokenType.EQUAL_EQUAL: EQUALITY,
+    TokenType.GREATER: COMPARISON,
+    TokenType.GREATER_EQUAL: COMPARISON,
+    TokenType.LESS: COMPARISON,
+    TokenType.LESS_EQUAL: COMPARISON,
+    TokenType.MINUS: TERM,
+    TokenType.PLUS: TERM,
+    TokenType.SLASH: FACTOR,
+    TokenType.STAR: FACTOR,
+    TokenType.LEFT_PAREN: CALL,
+    TokenType.DOT: CALL,
+}
+
+# binary operators that can not start an expression, with the precedence of
+# the right-hand operand that is parsed and discarded after the error
+MISSING_LEFT_OPERAND = {
+    TokenType.BANG_EQUAL: EQUALITY,
+    TokenType.EQUAL_EQUAL: EQUALITY,
+    TokenType.GREATER: COMPARISON,
+    TokenType.GREATER_EQUAL: COMPARISON,
+    TokenType.LESS: COMPARISON,
+    TokenType.LESS_EQUAL: COMPARISON,
+    TokenType.PLUS: TERM,
+    TokenType.SLASH: FACTOR,
+    TokenType.STAR: FACTOR,
+}
+
+LITERALS = {
+    TokenType.FALSE: False,
+    TokenType.TRUE: True,
+    TokenType.NIL: None,
+}
+
+
+# recursive descent for statements, precedence climbing for expressions
+class PrattParser(Parser):
+    """
+    Parser that builds expressions from a table of operator precedences.
+
+    It produces the same trees and errors as `Parser`, but a literal costs one
+    Python frame instead of one per grammar rule from `assignment` to `primary`.
+    """
+
+    def expression(self) -> Expr:
+        return self.parse_precedence(ASSIGNMENT)
+
+    def parse_precedence(self, precedence: int) -> Expr:
+        expr = self.prefix()
+
+        while True:
+            token_type = self.peek_type()
+            infix = INFIX_PRECEDENCE.get(token_type, NO_PRECEDENCE)
+            if infix < precedence:
+                return expr
+
+            self.current += 1
+            if token_type is TokenType.LEFT_PAREN:
+                expr = self.parse_arguments(expr)
+            elif token_type is TokenType.DOT:
+                name = self.consume(
+                    TokenType.IDENTIFIER, "Expect property name after '.'."
+                )
+                expr = expr_ast.Get(expr, name)
+            elif infix == ASSIGNMENT:
+                return self.assign(expr)
+            elif infix <= AND:
+                op = self.previous()
+                right = self.parse_precedence(infix + 1)
+                expr = expr_ast.Logical(expr, op, right)
+            else:
+                op = self.previous()
+                right = self.parse_precedence(infix + 1)
+                expr = expr_ast.Binary(expr, op, right)
+
+    def assign(self, target: Expr) -> Expr:
+        equals = self.previous()
+        value = self.parse_precedence(ASSIGNMENT)
+
+        if isinstance(target, expr_ast.Variable):
+            return expr_ast.Assign(target.name, value)
+        elif isinstance(target, expr_ast.Get):
+            return expr_ast.Set(target.obj, target.name, value)
+        else:
+            raise self.error(equals, "Invalid assignment target.")
+
+    def prefix(self) -> Expr:
+        token_type = self.peek_type()
+
+        if token_type is TokenType.IDENTIFIER:
+            self.current += 1
+            return expr_ast.Variable(self.previous())
+
+        if token_type is TokenType.NUMBER or token_type is TokenType.STRING:
+            self.current += 1
+            return expr_ast.Literal(self.previous().literal)
+
+        if token_type in LITERALS:
+            self.current += 1
+            return expr_ast.Literal(LITERALS[token_type])
+
+        if token_type is TokenType.BANG or token_type is TokenType.MINUS:
+            self.current += 1
+            op = self.previous()
+            right = self.parse_precedence(UNARY)
+            return expr_ast.Unary(op, right)
+
+        if token_type is TokenType.THIS:
+            self.current += 1
+            return expr_ast.This(self.previous())
+
+        if token_type is TokenType.LEFT_PAREN:
+            self.current += 1
+            expr = self.expression()
+            self.consume(TokenType.RIGHT_PAREN, "Expect ')' after expression.")
+            return expr_ast.Grouping(expr)
+
+        if token_type is TokenType.SUPER:
+            self.current += 1
+            keyword = self.previous()
+            self.consume(TokenType.DOT, "Expect '.' after 'super'.")
+            method = self.consume(
+                TokenType.IDENTIFIER, "Expect superclass method name."
+            )
+            return expr_ast.Super(keyword, method)
+
+        # Error handling
+        if token_type in MISSING_LEFT_OPERAND:
+            self.current += 1
+            err = self.error(self.previous(), "Missing left-hand operand.")
+            self.parse_precedence(MISSING_LEFT_OPERAND[token_type])
+            raise err
+
+        raise self.error(self.peek(), "Expect expression")
+
+
+PARSERS: typing.Dict[str, typing.Type[Parser]] = {
+    "classic": Parser,
+    "pratt": PrattParser,
+}
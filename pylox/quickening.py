@@ -0,0 +1,180 @@
+import collections
+import operator
+import typing
+
+import pylox.expr as expr_ast
+from pylox.scanner import TokenType
+
+NUMBERS = (int, float)
+
+
+class Feedback:
+    """
+    Operand types seen by one operator node, as the specialization they
+    call for and how many executions in a row called for it.
+    """
+
+    __slots__ = ("specialization", "count", "deopts")
+
+    def __init__(self) -> None:
+        self.specialization: typing.Optional[type] = None
+        self.count = 0
+        self.deopts = 0
+
+
+class QuickBinary(expr_ast.Binary):
+    """
+    `Binary` node rewritten in place for the operand types it has seen.
+
+    Only the interpreter that rewrote a node runs it: its `accept` calls a
+    visitor method that only `Interpreter` has. The interpreter checks the
+    operand types, and turns the node back into a plain `Binary` when they
+    are not the expected ones.
+    """
+
+    __slots__ = ()
+
+    name = ""
+    generic: type = expr_ast.Binary
+
+    @classmethod
+    def fields(cls) -> typing.Tuple[str, ...]:
+        return expr_ast.Binary.fields()
+
+
+class NumberBinary(QuickBinary):
+    """Arithmetic or comparison of two numbers."""
+
+    __slots__ = ()
+
+    name = "number arithmetic"
+    operation: typing.Callable[[float, float], typing.Any]
+
+    def accept(self, visitor: typing.Any) -> typing.Any:
+        return visitor.visit_number_binary_expr(self)
+
+
+class StringConcat(QuickBinary):
+    """`+` of two strings."""
+
+    __slots__ = ()
+
+    name = "string concatenation"
+
+    def accept(self, visitor: typing.Any) -> typing.Any:
+        return visitor.visit_string_concat_expr(self)
+
+
+class NumberNegate(expr_ast.Unary):
+    """`-` of a number, rewritten in place like `QuickBinary`."""
+
+    __slots__ = ()
+
+    name = "number negation"
+    generic: type = expr_ast.Unary
+
+    @classmethod
+    def fields(cls) -> typing.Tuple[str, ...]:
+        return expr_ast.Unary.fields()
+
+    def accept(self, visitor: typing.Any) -> typing.Any:
+        return visitor.visit_number_negate_expr(self)
+
+
+def number_binary(
+    name: str, operation: typing.Callable[[float, float], typing.Any]
+) -> typing.Type[NumberBinary]:
+    return type(
+        name, (NumberBinary,), {"__slots__": (), "operation": operation}
+    )
+
+
+NUMBER_BINARIES: typing.Dict[TokenType, typing.Type[NumberBinary]] = {
+    TokenType.PLUS: number_binary("NumberAdd", operator.add),
+    TokenType.MINUS: number_binary("NumberSubtract", operator.sub),
+    TokenType.STAR: number_binary("NumberMultiply", operator.mul),
+    TokenType.GREATER: number_binary("NumberGreater", operator.gt),
+    TokenType.GREATER_EQUAL: number_binary("NumberGreaterEqual", operator.ge),
+    TokenType.LESS: number_binary("NumberLess", operator.lt),
+    TokenType.LESS_EQUAL: number_binary("NumberLessEqual", operator.le),
+}
+QUICK_BINARIES: typing.Tuple[type, ...] = (
+    *NUMBER_BINARIES.values(),
+    StringConcat,
+)
+QUICK_UNARIES: typing.Tuple[type, ...] = (NumberNegate,)
+
+
+class Quickening:
+    """
+    Rewrites operator nodes that keep seeing the same operand types.
+
+    The generic `visit_binary_expr` and `visit_unary_expr` report their
+    operands to `observe`. After `HOT` executions in a row that call for the
+    same specialization, the node's class becomes that specialization, whose
+    visitor method skips the operator dispatch and most type checks. A node
+    deoptimized `MAX_DEOPTS` times stays generic, and stops being observed.
+
+    `specialized` and `deoptimized` count the rewrites by specialization
+    name.
+    """
+
+    HOT = 8
+    MAX_DEOPTS = 2
+
+    def __init__(self) -> None:
+        self.specialized: typing.Counter[str] = collections.Counter()
+        self.deoptimized: typing.Counter[str] = collections.Counter()
+
+    def observe_binary(
+        self, expr: expr_ast.Binary, left: typing.Any, right: typing.Any
+    ) -> None:
+        token_type = expr.operator.token_type
+        if token_type not in NUMBER_BINARIES:
+            expr.feedback = False  # no specialization for this operator
+            return
+
+        specialization: typing.Optional[type] = None
+        if type(left) in NUMBERS and type(right) in NUMBERS:
+            specialization = NUMBER_BINARIES[token_type]
+        elif token_type is TokenType.PLUS:
+            if type(left) is str and type(right) is str:
+                specialization = StringConcat
+        self.observe(expr, specialization)
+
+    def observe_unary(self, expr: expr_ast.Unary, right: typing.Any) -> None:
+        if expr.operator.token_type is not TokenType.MINUS:
+            expr.feedback = False
+            return
+        self.observe(expr, NumberNegate if type(right) in NUMBERS else None)
+
+    def observe(
+        self,
+        expr: expr_ast.Binary | expr_ast.Unary,
+        specialization: typing.Any,
+    ) -> None:
+        feedback = expr.feedback
+        if feedback is None:
+            feedback = expr.feedback = Feedback()
+        if specialization is not feedback.specialization:
+            feedback.specialization = specialization
+            feedback.count = 0
+        if specialization is None:
+            return
+
+        feedback.count += 1
+        if feedback.count >= self.HOT:
+            expr.__class__ = specialization
+            self.specialized[specialization.name] += 1
+
+    def deoptimize(self, expr: QuickBinary | NumberNegate) -> None:
+        """Turn `expr` back into a generic node, its guard failed."""
+        self.deoptimized[expr.name] += 1
+        expr.__class__ = expr.generic  # type: ignore[assignment]
+
+        feedback = expr.feedback
+        feedback.deopts += 1
+        feedback.specialization = None
+        feedback.count = 0
+        if feedback.deopts >= self.MAX_DEOPTS:
+            expr.feedback = False
@@ -5,10 +5,23 @@ import pylox.expr as expr_ast
 import pylox.stmt as stmt_ast
 from pylox.error import LoxParseError
 from pylox.expr import Expr, ExprVisitor
-from pylox.interpreter import Interpreter
-from pylox.scanner import Token
+from pylox.interpreter import (
+    DECLARATION_T,
+    FRAME_T,
+    RESOLVED_EXPR_T,
+    Interpreter,
+)
+from pylox.node import walk
+from pylox.scanner import Token, TokenType
 from pylox.stmt import Stmt, StmtVisitor
 
+COMPARISONS = (
+    TokenType.GREATER,
+    TokenType.GREATER_EQUAL,
+    TokenType.LESS,
+    TokenType.LESS_EQUAL,
+)
+
 
 class FunctionType(Enum):
     NONE = (auto(),)
@@ -23,25 +36,80 @@ class ClassType(Enum):
     SUBCLASS = auto()
 
 
+class Scope(typing.Dict[str, bool]):
+    """
+    Local names of a block or function, mapped to whether they are defined yet.
+
+    Every name also gets a slot in the `Frame` that holds the scope at run time.
+    A scope that declares nothing gets no frame: the engines run it in the frame
+    of the enclosing one, and depths do not count it.
+
+    `captured` holds the slots that functions nested in the scope read or
+    assign, and `closures` tells whether any function is made in it at all.
+    """
+
+    def __init__(self, framed: bool = True, level: int = 0) -> None:
+        super().__init__()
+        self.slots: typing.Dict[str, int] = {}
+        self.size = 0
+        self.framed = framed
+        self.level = level  # number of functions the scope is in
+        self.captured: typing.Set[int] = set()
+        self.closures = False
+
+    def uncaptured(self) -> typing.Tuple[int, ...]:
+        """
+        Slots that the closures made in the scope never use.
+
+        A closure keeps the whole frame of the scope alive, with the values
+        of these slots, so the frame drops them once the scope is left.
+        """
+        if not self.closures:
+            return ()  # nothing outlives the frame
+        return tuple(
+            slot for slot in range(self.size) if slot not in self.captured
+        )
+
+    def slot(self, name: str, fresh: bool = False) -> int:
+        # A redeclared variable is the same variable, as it was with a dict.
+        if fresh or name not in self.slots:
+            self.slots[name] = self.size
+            self.size += 1
+        return self.slots[name]
+
+
 class Resolver(ExprVisitor, StmtVisitor):
     def __init__(self, interpreter: Interpreter) -> None:
         self.interpreter = interpreter
-        self.scopes: typing.List[typing.Dict[str, bool]] = []
+        self.scopes: typing.List[Scope] = []
         self.current_function = FunctionType.NONE
         self.current_class = ClassType.NONE
         self.loop_depth = 0
+        self.function_level = 0
 
-    def begin_scope(self) -> None:
-        self.scopes.append({})
+    def begin_scope(self, framed: bool = True) -> None:
+        self.scopes.append(Scope(framed, self.function_level))
 
-    def end_scope(self) -> None:
-        self.scopes.pop()
+    def end_scope(self, owner: typing.Optional[FRAME_T] = None) -> None:
+        scope = self.scopes.pop()
+        if owner is not None:
+            self.interpreter.resolve_frame(
+                owner, scope.size, scope.uncaptured()
+            )
 
-    def declare(self, identifier: Token) -> None:
+    def declare(
+        self,
+        identifier: Token,
+        declaration: typing.Optional[DECLARATION_T] = None,
+        fresh: bool = False,
+    ) -> None:
         if len(self.scopes) == 0:
             return
         scope = self.scopes[-1]
         scope[identifier.lexeme] = False
+        slot = scope.slot(identifier.lexeme, fresh)
+        if declaration is not None:
+            self.interpreter.resolve_declaration(declaration, slot)
 
     def define(self, identifier: Token) -> None:
         if len(self.scopes) == 0:
@@ -56,23 +124,46 @@ class Resolver(ExprVisitor, StmtVisitor):
     def resolve_ast_node(self, node: Stmt | Expr) -> None:
         node.accept(self)
 
-    def resolve_local(self, expr: Expr, name: Token) -> None:
-        for i in range(len(self.scopes) - 1, -1, -1):
-            if name.lexeme in self.scopes[i].keys():
-                self.interpreter.resolve(expr, len(self.scopes) - 1 - i)
+    def resolve_local(self, expr: RESOLVED_EXPR_T, name: Token) -> None:
+        depth = 0
+        for scope in reversed(self.scopes):
+            if name.lexeme in scope.keys():
+                slot = scope.slots[name.lexeme]
+                if scope.level < self.function_level:
+                    scope.captured.add(slot)  # from a nested function
+                self.interpreter.resolve(expr, depth, slot)
                 return
+            if scope.framed:
+                depth += 1
+        self.interpreter.resolve_global(expr, name)
+
+    @staticmethod
+    def declares(statements: typing.List[Stmt]) -> bool:
+        """Whether a block of `statements` declares a local of its own."""
+        return any(
+            isinstance(stmt, (stmt_ast.Var, stmt_ast.Function, stmt_ast.Class))
+            for stmt in statements
+        )
 
     def resolve_function(
         self, function: stmt_ast.Function, fun_type: FunctionType
     ) -> None:
         parent_fun = self.current_function
         self.current_function = fun_type
-        self.begin_scope()
+        # a `break` in the body cannot leave a loop around the declaration
+        loop_depth, self.loop_depth = self.loop_depth, 0
+        for scope in self.scopes:
+            scope.closures = True  # the function's closure keeps them alive
+        self.function_level += 1
+        self.begin_scope(bool(function.params) or self.declares(function.body))
         for param in function.params:
-            self.declare(param)
+            # arguments fill the first slots in order, even duplicated ones
+            self.declare(param, fresh=True)
             self.define(param)
         self.resolve(function.body)
-        self.end_scope()
+        self.end_scope(function)
+        self.function_level -= 1
+        self.loop_depth = loop_depth
         self.current_function = parent_fun
 
     def visit_assign_expr(self, expr: expr_ast.Assign) -> typing.Any:
@@ -120,9 +211,9 @@ class Resolver(ExprVisitor, StmtVisitor):
         return None
 
     def visit_block_stmt(self, stmt: stmt_ast.Block) -> typing.Any:
-        self.begin_scope()
+        self.begin_scope(self.declares(stmt.statements))
         self.resolve(stmt.statements)
-        self.end_scope()
+        self.end_scope(stmt)
         return None
 
     def visit_expression_stmt(self, stmt: stmt_ast.Expression) -> typing.Any:
@@ -130,7 +221,7 @@ class Resolver(ExprVisitor, StmtVisitor):
         return None
 
     def visit_function_stmt(self, stmt: stmt_ast.Function) -> typing.Any:
-        self.declare(stmt.name)
+        self.declare(stmt.name, stmt)
         # Unlike variables, though, we define the name eagerly,
         # before resolving the function’s body.
         # This lets a function recursively refer to itself inside its own body.
@@ -164,7 +255,7 @@ class Resolver(ExprVisitor, StmtVisitor):
         return None
 
     def visit_var_stmt(self, stmt: stmt_ast.Var) -> typing.Any:
-        self.declare(stmt.name)
+        self.declare(stmt.name, stmt)
         if stmt.initializer is not None:
             self.resolve_ast_node(stmt.initializer)
         self.define(stmt.name)
@@ -177,6 +268,80 @@ class Resolver(ExprVisitor, StmtVisitor):
         self.loop_depth -= 1
         return None
 
+    def visit_for_stmt(self, stmt: stmt_ast.For) -> typing.Any:
+        # the clauses share one scope, the body of the loop nests in it
+        self.begin_scope(isinstance(stmt.initializer, stmt_ast.Var))
+        if stmt.initializer is not None:
+            self.resolve_ast_node(stmt.initializer)
+        if stmt.condition is not None:
+            self.resolve_ast_node(stmt.condition)
+        if stmt.increment is not None:
+            self.resolve_ast_node(stmt.increment)
+        self.loop_depth += 1
+        self.resolve_ast_node(stmt.body)
+        self.loop_depth -= 1
+        self.interpreter.resolve_loop(stmt, self.is_counted(stmt))
+        self.end_scope(stmt)
+        return None
+
+    @staticmethod
+    def is_counted(stmt: stmt_ast.For) -> bool:
+        """
+        Whether `stmt` counts a variable up or down to a literal number.
+
+        That is `for (var i = ...; i < 10; i = i + 1)`, with any comparison in
+        the condition and `+` or `-` a literal number in the increment, and
+        no assignment to `i` in the body.
+        """
+        initializer = stmt.initializer
+        if not isinstance(initializer, stmt_ast.Var):
+            return False
+        if initializer.initializer is None or initializer.slot is None:
+            return False
+        name, slot = initializer.name.lexeme, initializer.slot
+
+        def is_counter(expr: typing.Optional[Expr]) -> bool:
+            return (
+                isinstance(expr, expr_ast.Variable)
+                and expr.name.lexeme == name
+                and expr.depth == 0
+                and expr.slot == slot
+            )
+
+        def is_number(expr: Expr) -> bool:
+            return isinstance(expr, expr_ast.Literal) and type(expr.value) in (
+                int,
+                float,
+            )
+
+        condition, increment = stmt.condition, stmt.increment
+        if not (
+            isinstance(condition, expr_ast.Binary)
+            and condition.operator.token_type in COMPARISONS
+            and is_counter(condition.left)
+            and is_number(condition.right)
+        ):
+            return False
+        if not (
+            isinstance(increment, expr_ast.Assign)
+            and increment.name.lexeme == name
+            and increment.depth == 0
+            and increment.slot == slot
+        ):
+            return False
+        step = increment.value
+        if not (
+            isinstance(step, expr_ast.Binary)
+            and step.operator.token_type in (TokenType.PLUS, TokenType.MINUS)
+            and is_counter(step.left)
+            and is_number(step.right)
+        ):
+            return False
+        return not any(
+            isinstance(node, expr_ast.Assign) and node.name.lexeme == name
+            for node in walk([stmt.body])
+        )
+
     def visit_break_stmt(self, stmt: stmt_ast.Break) -> typing.Any:
         if self.loop_depth == 0:
             raise LoxParseError(
@@ -188,7 +353,7 @@ class Resolver(ExprVisitor, StmtVisitor):
         enclosing_class = self.current_class
         self.current_class = ClassType.CLASS
 
-        self.declare(stmt.name)
+        self.declare(stmt.name, stmt)
         self.define(stmt.name)
 
         if stmt.superclass is not None:
@@ -201,9 +366,11 @@ class Resolver(ExprVisitor, StmtVisitor):
 
         if stmt.superclass is not None:
             self.begin_scope()
+            self.scopes[-1].slot("super")
             self.scopes[-1]["super"] = True
 
         self.begin_scope()
+        self.scopes[-1].slot("this")
         self.scopes[-1]["this"] = True
 
         for method in stmt.methods:
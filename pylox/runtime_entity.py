@@ -1,24 +1,63 @@
 import typing
 from abc import ABC, abstractmethod
 
-from pylox.environment import Environment
+from pylox.environment import Frame
 from pylox.error import LoxRuntimeError
 from pylox.scanner import Token
-from pylox.stmt import Function
+from pylox.stmt import Class, Function
 
 if typing.TYPE_CHECKING:
     from pylox.interpreter import Interpreter
 
 
-class BreakException(RuntimeError):
-    pass
+class Break:
+    """Completion of a `break` statement, there is only `BREAK`."""
 
+    __slots__ = ()
+
+
+BREAK = Break()
+
+
+class Return:
+    """Completion of a `return` statement, carrying the returned value."""
+
+    __slots__ = ("value",)
 
-class Return(RuntimeError):
     def __init__(self, value: typing.Any) -> None:
         self.value = value
 
 
+class TailCall:
+    """
+    Completion of `return f(...)`: the caller's frame is done, and `function`
+    runs in its place instead of on top of it.
+    """
+
+    __slots__ = ("function", "receiver", "arguments")
+
+    def __init__(
+        self,
+        function: "LoxFunction",
+        receiver: typing.Optional["LoxInstance"],
+        arguments: list,
+    ) -> None:
+        self.function = function
+        self.receiver = receiver
+        self.arguments = arguments
+
+    def closure(self) -> Frame:
+        if self.receiver is None:
+            return self.function.closure
+        return Frame([self.receiver], self.function.closure)
+
+
+# What executing a statement results in: None when it completes normally,
+# else the `break` or `return` that ends it, handed up to the enclosing loop
+# or call by every statement in between.
+COMPLETION_T = typing.Union[None, Break, Return, TailCall]
+
+
 class LoxCallable(ABC):
     @abstractmethod
     def call(
@@ -33,32 +72,81 @@ class LoxCallable(ABC):
 
 class LoxFunction(LoxCallable):
     def __init__(
-        self, declaration: Function, closure: Environment, is_init: bool
+        self,
+        declaration: Function,
+        closure: Frame,
+        is_init: bool,
+        frame_size: int,
     ) -> None:
         self.declaration = declaration
         self.closure = closure
         self.is_init = is_init
+        self.frame_size = frame_size  # parameters first, then body locals
 
     def call(self, interpreter: "Interpreter", args: list) -> typing.Any:
-        env = Environment(self.closure)
-        for i in range(len(self.declaration.params)):
-            env.define(self.declaration.params[i].lexeme, args[i])
-        try:
-            interpreter.execute_block(self.declaration.body, env)
-        except Return as return_value:
-            if self.is_init:
-                return self.closure.get_at(0, "this")
-            return return_value.value
+        return self.call_in(interpreter, args, self.closure)
 
+    def call_in(
+        self, interpreter: "Interpreter", args: list, closure: Frame
+    ) -> typing.Any:
+        """
+        Run the body in a new frame enclosed by `closure`, or in `closure`
+        itself if the function has no parameters or locals.
+
+        Tail calls run in a loop, in place of the returning function. Past
+        `MAX_HOST_DEPTH` nested calls, the call and all the calls it makes
+        run on the interpreter's heap stack instead of Python's.
+        """
+        if interpreter.host_depth >= interpreter.MAX_HOST_DEPTH:
+            return interpreter.stackless.call(self, args, closure)
+
+        interpreter.host_depth += 1
+        try:
+            function = self
+            while True:
+                size = function.frame_size
+                # a function without parameters or locals runs in its closure
+                env = (
+                    Frame(args + [None] * (size - len(args)), closure)
+                    if size
+                    else closure
+                )
+                declaration = function.declaration
+                completion = interpreter.execute_block(
+                    declaration.body, env, declaration.uncaptured
+                )
+                if type(completion) is not TailCall:
+                    break
+                function = completion.function
+                args = completion.arguments
+                closure = completion.closure()
+        finally:
+            interpreter.host_depth -= 1
+
+        return function.result(completion, closure)
+
+    def result(self, completion: COMPLETION_T, closure: Frame) -> typing.Any:
+        """The value of a call that ran its body in `closure`."""
         if self.is_init:
-            return self.closure.get_at(0, "this")
-
+            return closure.values[0]  # this
+        if completion is not None:
+            # the resolver keeps `break` inside loops, so this is a return
+            return completion.value  # type: ignore[union-attr]
         return None
 
+    def invoke(
+        self, interpreter: "Interpreter", instance: "LoxInstance", args: list
+    ) -> typing.Any:
+        """Call the method on `instance` without binding it first."""
+        return self.call_in(interpreter, args, Frame([instance], self.closure))
+
     def bind(self, instance: "LoxInstance") -> "LoxFunction":
-        env = Environment(self.closure)
-        env.define("this", instance)
-        return LoxFunction(self.declaration, env, self.is_init)
+        return LoxFunction(
+            self.declaration,
+            Frame([instance], self.closure),
+            self.is_init,
+            self.frame_size,
+        )
 
     def arity(self) -> int:
         return len(self.declaration.params)
@@ -67,53 +155,138 @@ class LoxFunction(LoxCallable):
         return f"<fn {self.declaration.name.lexeme}>"
 
 
+class Shape:
+    """
+    Hidden class: the offsets of the fields of instances, by name.
+
+    Shapes form a transition tree rooted at the empty shape of each class.
+    Adding a field moves an instance to the child shape for that name, so
+    instances that get the same fields in the same order end up sharing a
+    shape. An instance whose shape would grow past `MAX_FIELDS` fields, or
+    past `MAX_TRANSITIONS` children, is used like a map: it gets a shape of
+    its own, out of the tree, that it extends in place.
+    """
+
+    __slots__ = ("offsets", "transitions", "shared")
+
+    MAX_FIELDS = 32
+    MAX_TRANSITIONS = 8
+
+    def __init__(
+        self, offsets: typing.Dict[str, int], shared: bool = True
+    ) -> None:
+        self.offsets = offsets
+        self.transitions: typing.Dict[str, Shape] = {}
+        self.shared = shared
+
+    def with_field(self, name: str) -> "Shape":
+        """The shape of an instance of this shape once `name` is added."""
+        if not self.shared:
+            self.offsets[name] = len(self.offsets)
+            return self
+
+        shape = self.transitions.get(name)
+        if shape is not None:
+            return shape
+
+        offsets = dict(self.offsets)
+        offsets[name] = len(offsets)
+        if (
+            len(offsets) > self.MAX_FIELDS
+            or len(self.transitions) >= self.MAX_TRANSITIONS
+        ):
+            return Shape(offsets, shared=False)
+
+        shape = self.transitions[name] = Shape(offsets)
+        return shape
+
+
 class LoxClass(LoxCallable):
+    """
+    A class with its inherited methods flattened into `table`.
+
+    The table, the initializer and the arity are computed when the class is
+    created, so a method lookup is a single dict probe however deep the
+    hierarchy is. `methods` only holds the methods declared by the class.
+    `shape` is the empty shape its instances start from. `declaration` is
+    the statement that created the class, if it was created from the AST.
+    """
+
     def __init__(
         self,
         name: str,
         superclass: "LoxClass",
         methods: typing.Dict[str, LoxFunction],
+        declaration: typing.Optional[Class] = None,
     ) -> None:
         self.name = name
+        self.declaration = declaration
         self.superclass = superclass
         self.methods = methods
+        self.table: typing.Dict[str, LoxFunction] = {}
+        if superclass is not None:
+            self.table.update(superclass.table)
+        self.table.update(methods)
+        self.update_initializer()
+        self.shape = Shape({})
+
+    def define_method(self, name: str, method: LoxFunction) -> None:
+        """Add a method while the class is built, before it is subclassed."""
+        self.methods[name] = method
+        self.table[name] = method
+        if name == "init":
+            self.update_initializer()
+
+    def update_initializer(self) -> None:
+        self.initializer = self.table.get("init")
+        self.init_arity = (
+            0 if self.initializer is None else self.initializer.arity()
+        )
 
     def call(self, interpreter: "Interpreter", args: list) -> typing.Any:
         instance = LoxInstance(self)
-        initializer = self.find_method("init")
-        if initializer is not None:
-            initializer.bind(instance).call(interpreter, args)
+        if self.initializer is not None:
+            self.initializer.invoke(interpreter, instance, args)
 
         return instance
 
     def arity(self) -> int:
-        initializer = self.find_method("init")
-        if initializer is None:
-            return 0
-
-        return initializer.arity()
+        return self.init_arity
 
     def find_method(self, name: str) -> typing.Optional[LoxFunction]:
-        if name in self.methods:
-            return self.methods[name]
-
-        if self.superclass is not None:
-            return self.superclass.find_method(name)
-
-        return None
+        return self.table.get(name)
 
     def __str__(self) -> str:
         return self.name
 
 
 class LoxInstance:
+    """
+    An instance whose fields live in `values`, laid out by a `Shape`.
+
+    Instances of a class that get the same fields in the same order share
+    their shape, instead of each owning a dict of names.
+    """
+
+    __slots__ = ("lox_class", "shape", "values")
+
     def __init__(self, lox_class: LoxClass) -> None:
         self.lox_class = lox_class
-        self.fields: typing.Dict[str, typing.Any] = {}
+        self.shape = lox_class.shape
+        self.values: typing.List[typing.Any] = []
+
+    @property
+    def fields(self) -> typing.Dict[str, typing.Any]:
+        """The fields by name, for debugging and tests."""
+        return {
+            name: self.values[offset]
+            for name, offset in self.shape.offsets.items()
+        }
 
     def get(self, name: Token) -> typing.Any:
-        if name.lexeme in self.fields:
-            return self.fields.get(name.lexeme)
+        offset = self.shape.offsets.get(name.lexeme)
+        if offset is not None:
+            return self.values[offset]
 
         method = self.lox_class.find_method(name.lexeme)
         if method is not None:
@@ -122,7 +295,15 @@ class LoxInstance:
         raise LoxRuntimeError(name, f"Undefined property '{name.lexeme}'.")
 
     def set(self, name: Token, value: typing.Any) -> None:
-        self.fields[name.lexeme] = value
+        self.set_field(name.lexeme, value)
+
+    def set_field(self, name: str, value: typing.Any) -> None:
+        offset = self.shape.offsets.get(name)
+        if offset is None:
+            self.shape = self.shape.with_field(name)
+            self.values.append(value)
+        else:
+            self.values[offset] = value
 
     def __str__(self) -> str:
         return f"{self.lox_class.name} instance"
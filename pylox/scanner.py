@@ -1,7 +1,11 @@
+import codecs
+import io
+import mmap
+import re
 import typing
 
 from pylox.error import LoxSyntaxError
-from pylox.tokens import Token, TokenType
+from pylox.tokens import TOKEN_CODES, Token, TokenBuffer, TokenType
 
 
 def is_alpha(char: str) -> bool:
@@ -226,3 +230,362 @@ class Scanner:
                 if self.peek() == "\n":
                     self.line += 1
                 self.advance()
+
+
+PUNCTUATORS = {
+    "(": TokenType.LEFT_PAREN,
+    ")": TokenType.RIGHT_PAREN,
+    "{": TokenType.LEFT_BRACE,
+    "}": TokenType.RIGHT_BRACE,
+    ",": TokenType.COMMA,
+    ".": TokenType.DOT,
+    "-": TokenType.MINUS,
+    "+": TokenType.PLUS,
+    ";": TokenType.SEMICOLON,
+    "/": TokenType.SLASH,
+    "*": TokenType.STAR,
+    "!": TokenType.BANG,
+    "!=": TokenType.BANG_EQUAL,
+    "=": TokenType.EQUAL,
+    "==": TokenType.EQUAL_EQUAL,
+    ">": TokenType.GREATER,
+    ">=": TokenType.GREATER_EQUAL,
+    "<": TokenType.LESS,
+    "<=": TokenType.LESS_EQUAL,
+}
+
+# Group numbers of the master pattern, used instead of `lastgroup` names
+# because integer comparison is the cheapest dispatch available here.
+(
+    NEWLINES,
+    COMMENT,
+    BLOCK_COMMENT,
+    IDENTIFIER,
+    NUMBER,
+    STRING,
+    PUNCTUATOR,
+    END,
+) = range(1, 9)
+
+# One alternative per token class, each preceded by the blanks in front of it.
+# Every alternative consumes the longest possible run, so a single `match`
+# call skips the indentation and produces a whole lexeme.
+MASTER_PATTERN = re.compile(
+    r"""
+    [ \t\r]*
+    (?:
+        (\n[ \t\r\n]*)              # newlines and the indentation after them
+        |(//[^\n]*)                # line comment
+        |(/\*)                     # block comment opener, may nest
+        |([A-Za-z_][A-Za-z_\d]*)   # identifier or reserved keyword
+        |(\d+(?:\.\d+)?)           # number
+        |("[^"]*")                 # terminated string
+        |([!=<>]=?|[(){},.\-+;/*]) # punctuator
+        |(\Z)                      # trailing blanks at the end of source
+    )
+    """,
+    re.VERBOSE,
+)
+
+BLOCK_COMMENT_DELIMITER = re.compile(r"/\*|\*/")
+
+
+class RegexScanner:
+    """
+    Scanner with the same contract as `Scanner`, driven by a single compiled master pattern.
+
+    Each step skips the blanks in front of a lexeme and matches the complete
+    lexeme at once instead of dispatching on one character at a time.
+    """
+
+    def __init__(self, src: str) -> None:
+        self.src = src
+        self.tokens = list[Token]()
+        self.line = 1
+        self.current = 0
+
+    def scan_tokens(self) -> typing.Sequence[Token]:
+        src = self.src
+        tokens = self.tokens
+        append = tokens.append
+        match = MASTER_PATTERN.match
+        reserved = RESERVED
+        punctuators = PUNCTUATORS
+        identifier = TokenType.IDENTIFIER
+        line = self.line
+        pos = self.current
+        end = len(src)
+
+        while pos < end:
+            m = match(src, pos)
+            if m is None:
+                self.line = line
+                self.current = pos
+                self.unexpected()
+
+            group = typing.cast(int, m.lastindex)
+            text = m.group(group)
+            pos = m.end()
+
+            if group == IDENTIFIER:
+                append(Token(reserved.get(text, identifier), text, None, line))
+            elif group == PUNCTUATOR:
+                append(Token(punctuators[text], text, None, line))
+            elif group == NEWLINES:
+                line += text.count("\n")
+            elif group == NUMBER:
+                literal = float(text) if "." in text else int(text)
+                append(Token(TokenType.NUMBER, text, literal, line))
+            elif group == STRING:
+                # Like `Scanner.string`, a multiline string is reported
+                # on the line where it ends.
+                line += text.count("\n")
+                append(Token(TokenType.STRING, text, text[1:-1], line))
+            elif group == BLOCK_COMMENT:
+                self.line = line
+                pos = self.multiline_comment(pos)
+                line = self.line
+
+        self.line = line
+        self.current = pos
+        append(Token(TokenType.EOF, "", None, line))
+        return tokens
+
+    def unexpected(self) -> typing.NoReturn:
+        while self.src[self.current] in " \t\r":
+            self.current += 1
+
+        c = self.src[self.current]
+        if c == '"':
+            self.line += self.src.count("\n", self.current)
+            raise LoxSyntaxError(self.line, "Unterminated string.")
+
+        raise LoxSyntaxError(self.line, f"Unexpected character: '{c}'")
+
+    def multiline_comment(self, pos: int) -> int:
+        depth = 1
+        search = BLOCK_COMMENT_DELIMITER.search
+
+        while depth != 0:
+            m = search(self.src, pos)
+            if m is None:
+                self.line += self.src.count("\n", pos)
+                raise LoxSyntaxError(
+                    self.line,
+                    "Unterminated block comment.",
+                )
+
+            self.line += self.src.count("\n", pos, m.start())
+            depth += 1 if m.group() == "/*" else -1
+            pos = m.end()
+
+        return pos
+
+
+SOURCE_T = typing.Union[str, typing.IO, mmap.mmap]
+
+
+class CompactScanner(RegexScanner):
+    """
+    `RegexScanner` that records tokens in a `TokenBuffer` instead of creating a `Token` per lexeme.
+
+    `Token` objects are only materialized when the parser looks at them, and
+    the ones the AST does not keep are freed right away.
+    """
+
+    def scan_tokens(self) -> TokenBuffer:
+        tokens = TokenBuffer(self.src)
+        self.scan_into(tokens)
+        return tokens
+
+    def scan_into(
+        self, tokens: TokenBuffer, stop_at: typing.Container[int] = ()
+    ) -> bool:
+        """
+        Append the tokens from `self.current` on to `tokens`, followed by EOF.
+
+        Scanning stops early, without EOF, in front of the first token starting
+        at an offset from `stop_at`; the return value tells whether it did.
+        """
+        src = self.src
+        types = tokens.types.append
+        starts = tokens.starts.append
+        lengths = tokens.lengths.append
+        match = MASTER_PATTERN.match
+        reserved = {text: TOKEN_CODES[t] for text, t in RESERVED.items()}
+        punctuators = {text: TOKEN_CODES[t] for text, t in PUNCTUATORS.items()}
+        identifier = TOKEN_CODES[TokenType.IDENTIFIER]
+        line = self.line
+        pos = self.current
+        end = len(src)
+
+        while pos < end:
+            m = match(src, pos)
+            if m is None:
+                self.line = line
+                self.current = pos
+                self.unexpected()
+
+            group = typing.cast(int, m.lastindex)
+            pos = m.end()
+
+            if group == NEWLINES:
+                line += src.count("\n", m.start(group), pos)
+                continue
+            elif group == BLOCK_COMMENT:
+                self.line = line
+                pos = self.multiline_comment(pos)
+                line = self.line
+                continue
+            elif group == COMMENT or group == END:
+                continue
+
+            start = m.start(group)
+            if start in stop_at:
+                self.line = line
+                self.current = start
+                return True
+            elif group == IDENTIFIER:
+                types(reserved.get(src[start:pos], identifier))
+            elif group == PUNCTUATOR:
+                types(punctuators[src[start:pos]])
+            elif group == NUMBER:
+                types(TOKEN_CODES[TokenType.NUMBER])
+            elif group == STRING:
+                line += src.count("\n", start, pos)
+                types(TOKEN_CODES[TokenType.STRING])
+            starts(start)
+            lengths(pos - start)
+
+        self.line = line
+        self.current = pos
+        tokens.append(TokenType.EOF, end, 0)
+        return False
+
+
+class StreamingScanner(RegexScanner):
+    """
+    `RegexScanner` that lexes lazily from a text or binary file object (or `mmap`) read in chunks.
+
+    Only the unconsumed tail of the last chunk is buffered, so memory is bounded
+    by the chunk size and the longest lexeme, not by the size of the source.
+    """
+
+    def __init__(
+        self,
+        source: SOURCE_T,
+        chunk_size: int = 64 * 1024,
+    ) -> None:
+        super().__init__("")
+        self.source = (
+            io.StringIO(source) if isinstance(source, str) else source
+        )
+        self.chunk_size = chunk_size
+        self.decoder = codecs.getincrementaldecoder("utf-8")()
+        self.exhausted = False
+
+    def fill(self) -> None:
+        """Drop the consumed part of the buffer and append the next chunk of the source."""
+        data = self.source.read(self.chunk_size)
+        if not data:
+            self.exhausted = True
+
+        if isinstance(data, bytes):
+            data = self.decoder.decode(data, final=self.exhausted)
+
+        self.src = self.src[self.current :] + data
+        self.current = 0
+
+    def iter_tokens(self) -> typing.Iterator[Token]:
+        match = MASTER_PATTERN.match
+
+        while True:
+            m = match(self.src, self.current)
+
+            if m is None:
+                self.unexpected_or_fill()
+                continue
+
+            # A lexeme reaching the end of the buffer may continue in the next
+            # chunk: `foo` may become `food`, `=` may become `==` and `1.`
+            # needs one more character to tell a float from a number and a dot.
+            if m.end() + 1 >= len(self.src) and not self.exhausted:
+                self.fill()
+                continue
+
+            group = typing.cast(int, m.lastindex)
+            text = m.group(group)
+            self.current = m.end()
+
+            if group == IDENTIFIER:
+                token_type = RESERVED.get(text, TokenType.IDENTIFIER)
+                yield Token(token_type, text, None, self.line)
+            elif group == PUNCTUATOR:
+                yield Token(PUNCTUATORS[text], text, None, self.line)
+            elif group == NEWLINES:
+                self.line += text.count("\n")
+            elif group == NUMBER:
+                literal = float(text) if "." in text else int(text)
+                yield Token(TokenType.NUMBER, text, literal, self.line)
+            elif group == STRING:
+                self.line += text.count("\n")
+                yield Token(TokenType.STRING, text, text[1:-1], self.line)
+            elif group == BLOCK_COMMENT:
+                self.current = self.multiline_comment(self.current)
+            elif group == END:
+                break
+
+        yield Token(TokenType.EOF, "", None, self.line)
+
+    def unexpected_or_fill(self) -> None:
+        while self.src[self.current] in " \t\r":
+            self.current += 1
+
+        # Only an unterminated string can be completed by the next chunk.
+        if self.src[self.current] == '"' and not self.exhausted:
+            self.fill()
+        else:
+            self.unexpected()
+
+    def multiline_comment(self, pos: int) -> int:
+        depth = 1
+        search = BLOCK_COMMENT_DELIMITER.search
+
+        while depth != 0:
+            m = search(self.src, pos)
+            if m is None and not self.exhausted:
+                # Keep the last character: together with the first one of
+                # the next chunk it may open or close a comment.
+                self.current = max(pos, len(self.src) - 1)
+                self.line += self.src.count("\n", pos, self.current)
+                self.fill()
+                pos = 0
+                continue
+
+            if m is None:
+                self.line += self.src.count("\n", pos)
+                raise LoxSyntaxError(
+                    self.line,
+                    "Unterminated block comment.",
+                )
+
+            self.line += self.src.count("\n", pos, m.start())
+            depth += 1 if m.group() == "/*" else -1
+            pos = m.end()
+
+        return pos
+
+
+def iter_tokens(
+    source: SOURCE_T,
+    chunk_size: int = 64 * 1024,
+) -> typing.Iterator[Token]:
+    """Lazily scan `source`, a string, a file object or an `mmap`, chunk by chunk."""
+    return StreamingScanner(source, chunk_size).iter_tokens()
+
+
+SCANNERS: typing.Dict[str, typing.Type[Scanner | RegexScanner]] = {
+    "classic": Scanner,
+    "regex": RegexScanner,
+    "compact": CompactScanner,
+}
@@ -0,0 +1,352 @@
+import typing
+
+import pylox.expr as expr_ast
+import pylox.runtime_entity as runtime
+import pylox.stmt as stmt_ast
+from pylox.environment import Frame
+from pylox.expr import Expr
+from pylox.node import Node
+from pylox.quickening import QUICK_BINARIES, QUICK_UNARIES
+from pylox.scanner import TokenType
+from pylox.stmt import Stmt
+
+if typing.TYPE_CHECKING:
+    from pylox.interpreter import Interpreter
+
+# A call the running function waits for: receiver, callee and arguments.
+REQUEST_T = typing.Tuple[
+    typing.Optional[runtime.LoxInstance], typing.Any, list
+]
+# Execution of a node that makes calls: yields a request per call, is sent
+# back its result, and returns the value or completion of the node.
+RESUMABLE_T = typing.Generator[REQUEST_T, typing.Any, typing.Any]
+
+
+class HeapFrame:
+    """A call on the heap stack, with the environment it is suspended in."""
+
+    __slots__ = ("function", "closure", "body", "environment")
+
+    def __init__(
+        self,
+        function: runtime.LoxFunction,
+        closure: Frame,
+        body: RESUMABLE_T,
+        environment: Frame,
+    ) -> None:
+        self.function = function
+        self.closure = closure
+        self.body = body
+        self.environment = environment
+
+
+class Stackless:
+    """
+    Runs Lox calls with their frames on a heap stack instead of Python's.
+
+    The statements and expressions of a function that make calls run as
+    generators: a call is yielded to the loop in `call`, which pushes a frame
+    for the callee and sends the result back to the caller once the callee
+    returns. Calls never nest on the Python stack, so recursion is only
+    limited by memory. Everything that makes no call runs on the
+    interpreter itself, as fast as usual.
+    """
+
+    def __init__(self, interpreter: "Interpreter") -> None:
+        self.interpreter = interpreter
+        # whether a node makes calls, by node id
+        self.makes_calls: typing.Dict[int, bool] = {}
+        self.statements: typing.Dict[
+            type, typing.Callable[[typing.Any], RESUMABLE_T]
+        ] = {
+            stmt_ast.Block: self.block_stmt,
+            stmt_ast.Expression: self.expression_stmt,
+            stmt_ast.For: self.for_stmt,
+            stmt_ast.If: self.if_stmt,
+            stmt_ast.Print: self.print_stmt,
+            stmt_ast.Return: self.return_stmt,
+            stmt_ast.Var: self.var_stmt,
+            stmt_ast.While: self.while_stmt,
+        }
+        self.expressions: typing.Dict[
+            type, typing.Callable[[typing.Any], RESUMABLE_T]
+        ] = {
+            expr_ast.Assign: self.assign_expr,
+            expr_ast.Binary: self.binary_expr,
+            expr_ast.Call: self.call_expr,
+            expr_ast.Get: self.get_expr,
+            expr_ast.Grouping: self.grouping_expr,
+            expr_ast.Logical: self.logical_expr,
+            expr_ast.Set: self.set_expr,
+            expr_ast.Unary: self.unary_expr,
+        }
+        # nodes the interpreter rewrote for the operand types they see
+        for quick in QUICK_BINARIES:
+            self.expressions[quick] = self.binary_expr
+        for quick in QUICK_UNARIES:
+            self.expressions[quick] = self.unary_expr
+
+    def call(
+        self, function: runtime.LoxFunction, args: list, closure: Frame
+    ) -> typing.Any:
+        """Run a call of `function`, and every call it makes, to the end."""
+        interpreter = self.interpreter
+        previous = interpreter.environment
+        stack = [self.frame(function, args, closure)]
+        value = None
+        try:
+            while True:
+                top = stack[-1]
+                interpreter.environment = top.environment
+                try:
+                    request = top.body.send(value)
+                except StopIteration as stop:
+                    completion = stop.value
+                    if type(completion) is runtime.TailCall:
+                        stack[-1] = self.frame(
+                            completion.function,
+                            completion.arguments,
+                            completion.closure(),
+                        )
+                        value = None
+                        continue
+                    stack.pop()
+                    value = top.function.result(completion, top.closure)
+                    if not stack:
+                        return value
+                    continue
+
+                top.environment = interpreter.environment
+                value = None
+                receiver, callee, arguments = request
+                if isinstance(callee, runtime.LoxFunction):
+                    if receiver is not None:
+                        closure = Frame([receiver], callee.closure)
+                    else:
+                        closure = callee.closure
+                    stack.append(self.frame(callee, arguments, closure))
+                elif isinstance(callee, runtime.LoxClass):
+                    instance = runtime.LoxInstance(callee)
+                    if callee.initializer is None:
+                        value = instance
+                    else:
+                        closure = Frame([instance], callee.initializer.closure)
+                        stack.append(
+                            self.frame(callee.initializer, arguments, closure)
+                        )
+                else:
+                    value = callee.call(interpreter, arguments)
+        finally:
+            interpreter.environment = previous
+
+    def frame(
+        self, function: runtime.LoxFunction, args: list, closure: Frame
+    ) -> HeapFrame:
+        size = function.frame_size
+        env = (
+            Frame(args + [None] * (size - len(args)), closure)
+            if size
+            else closure
+        )
+        declaration = function.declaration
+        body = self.block(declaration.body, env, declaration.uncaptured)
+        return HeapFrame(function, closure, body, env)
+
+    def calls(self, node: Node) -> bool:
+        """Whether running `node` can call a function."""
+        makes_calls = self.makes_calls.get(node.node_id)
+        if makes_calls is None:
+            makes_calls = self.makes_calls[node.node_id] = self.find_calls(
+                node
+            )
+        return makes_calls
+
+    def find_calls(self, node: Node) -> bool:
+        if isinstance(node, expr_ast.Call):
+            return True
+        if isinstance(node, (stmt_ast.Function, stmt_ast.Class)):
+            return False  # declaring runs nothing
+        for name in node.fields():
+            value = getattr(node, name)
+            if isinstance(value, Node) and self.calls(value):
+                return True
+            if isinstance(value, list) and any(
+                self.calls(v) for v in value if isinstance(v, Node)
+            ):
+                return True
+        return False
+
+    def execute(self, stmt: Stmt) -> RESUMABLE_T:
+        if self.calls(stmt):
+            return (yield from self.statements[type(stmt)](stmt))
+        return stmt.accept(self.interpreter)
+
+    def evaluate(self, expr: Expr) -> RESUMABLE_T:
+        if self.calls(expr):
+            return (yield from self.expressions[type(expr)](expr))
+        return expr.accept(self.interpreter)
+
+    def block(
+        self,
+        statements: typing.List[Stmt],
+        env: Frame,
+        uncaptured: typing.Tuple[int, ...] = (),
+    ) -> RESUMABLE_T:
+        interpreter = self.interpreter
+        previous = interpreter.environment
+        interpreter.environment = env
+        completion = None
+        for stmt in statements:
+            completion = yield from self.execute(stmt)
+            if completion is not None:
+                break
+        interpreter.environment = previous
+        if uncaptured:
+            interpreter.release(env, uncaptured)
+        return completion
+
+    # statements
+
+    def block_stmt(self, stmt: stmt_ast.Block) -> RESUMABLE_T:
+        frame = self.interpreter.environment
+        if stmt.frame_size:
+            frame = Frame([None] * stmt.frame_size, frame)
+        return (yield from self.block(stmt.statements, frame, stmt.uncaptured))
+
+    def expression_stmt(self, stmt: stmt_ast.Expression) -> RESUMABLE_T:
+        yield from self.evaluate(stmt.expr)
+        return None
+
+    def for_stmt(self, stmt: stmt_ast.For) -> RESUMABLE_T:
+        if stmt.frame_size == 0:
+            return (yield from self.for_loop(stmt))
+        interpreter = self.interpreter
+        previous = interpreter.environment
+        frame = interpreter.environment = Frame(
+            [None] * stmt.frame_size, previous
+        )
+        completion = yield from self.for_loop(stmt)
+        interpreter.environment = previous
+        if stmt.uncaptured:
+            interpreter.release(frame, stmt.uncaptured)
+        return completion
+
+    def for_loop(self, stmt: stmt_ast.For) -> RESUMABLE_T:
+        if stmt.initializer is not None:
+            yield from self.execute(stmt.initializer)
+        while stmt.condition is None or self.interpreter.is_truthy(
+            (yield from self.evaluate(stmt.condition))
+        ):
+            completion = yield from self.execute(stmt.body)
+            if completion is not None:
+                if completion is runtime.BREAK:
+                    break
+                return completion
+            if stmt.increment is not None:
+                yield from self.evaluate(stmt.increment)
+        return None
+
+    def if_stmt(self, stmt: stmt_ast.If) -> RESUMABLE_T:
+        condition = yield from self.evaluate(stmt.condition)
+        if self.interpreter.is_truthy(condition):
+            return (yield from self.execute(stmt.then_branch))
+        elif stmt.else_branch is not None:
+            return (yield from self.execute(stmt.else_branch))
+        return None
+
+    def print_stmt(self, stmt: stmt_ast.Print) -> RESUMABLE_T:
+        value = yield from self.evaluate(stmt.expr)
+        print(self.interpreter.stringify(value))
+        return None
+
+    def return_stmt(self, stmt: stmt_ast.Return) -> RESUMABLE_T:
+        expr = typing.cast(Expr, stmt.value)
+        if type(expr) is not expr_ast.Call:
+            return runtime.Return((yield from self.evaluate(expr)))
+
+        receiver, callee, arguments = yield from self.call_operands(expr)
+        if not self.interpreter.is_direct(expr, callee):
+            self.interpreter.check_call(
+                expr.paren, receiver, callee, arguments
+            )
+        if isinstance(callee, runtime.LoxFunction):
+            return runtime.TailCall(callee, receiver, arguments)
+        return runtime.Return((yield (receiver, callee, arguments)))
+
+    def var_stmt(self, stmt: stmt_ast.Var) -> RESUMABLE_T:
+        value = yield from self.evaluate(typing.cast(Expr, stmt.initializer))
+        self.interpreter.define(stmt, stmt.name, value)
+        return None
+
+    def while_stmt(self, stmt: stmt_ast.While) -> RESUMABLE_T:
+        is_truthy = self.interpreter.is_truthy
+        while is_truthy((yield from self.evaluate(stmt.condition))):
+            completion = yield from self.execute(stmt.body)
+            if completion is not None:
+                if completion is runtime.BREAK:
+                    break
+                return completion
+        return None
+
+    # expressions
+
+    def assign_expr(self, expr: expr_ast.Assign) -> RESUMABLE_T:
+        value = yield from self.evaluate(expr.value)
+        return self.interpreter.assign(expr, value)
+
+    def binary_expr(self, expr: expr_ast.Binary) -> RESUMABLE_T:
+        left = yield from self.evaluate(expr.left)
+        right = yield from self.evaluate(expr.right)
+        return self.interpreter.binary(expr, left, right)
+
+    def call_expr(self, expr: expr_ast.Call) -> RESUMABLE_T:
+        receiver, callee, arguments = yield from self.call_operands(expr)
+        if not self.interpreter.is_direct(expr, callee):
+            self.interpreter.check_call(
+                expr.paren, receiver, callee, arguments
+            )
+        return (yield (receiver, callee, arguments))
+
+    def call_operands(self, expr: expr_ast.Call) -> RESUMABLE_T:
+        receiver = None
+        if type(expr.callee) is expr_ast.Get:
+            obj = yield from self.evaluate(expr.callee.obj)
+            receiver, callee = self.interpreter.property_of(expr.callee, obj)
+        elif type(expr.callee) is expr_ast.Super:
+            receiver, callee = self.interpreter.find_super_method(expr.callee)
+        else:
+            callee = yield from self.evaluate(expr.callee)
+        arguments = []
+        for arg in expr.arguments:
+            arguments.append((yield from self.evaluate(arg)))
+        return receiver, callee, arguments
+
+    def get_expr(self, expr: expr_ast.Get) -> RESUMABLE_T:
+        obj = yield from self.evaluate(expr.obj)
+        receiver, value = self.interpreter.property_of(expr, obj)
+        if receiver is not None:
+            return value.bind(receiver)
+        return value
+
+    def grouping_expr(self, expr: expr_ast.Grouping) -> RESUMABLE_T:
+        return (yield from self.evaluate(expr.expr))
+
+    def logical_expr(self, expr: expr_ast.Logical) -> RESUMABLE_T:
+        left = yield from self.evaluate(expr.left)
+        if expr.operator.token_type is TokenType.OR:
+            if self.interpreter.is_truthy(left):
+                return left
+        elif not self.interpreter.is_truthy(left):
+            return left
+        return (yield from self.evaluate(expr.right))
+
+    def set_expr(self, expr: expr_ast.Set) -> RESUMABLE_T:
+        obj = yield from self.evaluate(expr.obj)
+        self.interpreter.check_instance(expr, obj)
+        value = yield from self.evaluate(expr.value)
+        obj.set(expr.name, value)
+        return value
+
+    def unary_expr(self, expr: expr_ast.Unary) -> RESUMABLE_T:
+        right = yield from self.evaluate(expr.right)
+        return self.interpreter.unary(expr, right)
@@ -4,6 +4,7 @@ import typing
 from abc import ABC, abstractmethod
 
 from pylox.expr import Expr, Variable
+from pylox.node import Node, next_node_id
 from pylox.tokens import Token
 
 
@@ -44,14 +45,17 @@ class StmtVisitor(ABC):
     def visit_while_stmt(self, stmt: "While") -> typing.Any:
         pass
 
+    @abstractmethod
+    def visit_for_stmt(self, stmt: "For") -> typing.Any:
+        pass
+
     @abstractmethod
     def visit_break_stmt(self, stmt: "Break") -> typing.Any:
         pass
 
 
-class Stmt:
-    def __init__(self):
-        pass
+class Stmt(Node):
+    __slots__ = ()
 
     @abstractmethod
     def accept(self, visitor: StmtVisitor) -> typing.Any:
@@ -59,17 +63,23 @@ class Stmt:
 
 
 class Block(Stmt):
+    __slots__ = ("statements", "frame_size", "uncaptured")
+
     def __init__(self, statements: typing.List[Stmt]):
-        super().__init__()
+        self.node_id = next_node_id()
         self.statements = statements
+        self.frame_size: int = 0
+        self.uncaptured: typing.Tuple[int, ...] = ()
 
     def accept(self, visitor: StmtVisitor) -> typing.Any:
         return visitor.visit_block_stmt(self)
 
 
 class Expression(Stmt):
+    __slots__ = ("expr",)
+
     def __init__(self, expr: Expr):
-        super().__init__()
+        self.node_id = next_node_id()
         self.expr = expr
 
     def accept(self, visitor: StmtVisitor) -> typing.Any:
@@ -77,26 +87,33 @@ class Expression(Stmt):
 
 
 class Function(Stmt):
+    __slots__ = ("name", "params", "body", "slot", "frame_size", "uncaptured")
+
     def __init__(
         self, name: Token, params: typing.List[Token], body: typing.List[Stmt]
     ):
-        super().__init__()
+        self.node_id = next_node_id()
         self.name = name
         self.params = params
         self.body = body
+        self.slot: typing.Optional[int] = None
+        self.frame_size: int = 0
+        self.uncaptured: typing.Tuple[int, ...] = ()
 
     def accept(self, visitor: StmtVisitor) -> typing.Any:
         return visitor.visit_function_stmt(self)
 
 
 class If(Stmt):
+    __slots__ = ("condition", "then_branch", "else_branch")
+
     def __init__(
         self,
         condition: Expr,
         then_branch: Stmt,
         else_branch: typing.Optional[Stmt],
     ):
-        super().__init__()
+        self.node_id = next_node_id()
         self.condition = condition
         self.then_branch = then_branch
         self.else_branch = else_branch
@@ -106,8 +123,10 @@ class If(Stmt):
 
 
 class Print(Stmt):
+    __slots__ = ("expr",)
+
     def __init__(self, expr: Expr):
-        super().__init__()
+        self.node_id = next_node_id()
         self.expr = expr
 
     def accept(self, visitor: StmtVisitor) -> typing.Any:
@@ -115,8 +134,10 @@ class Print(Stmt):
 
 
 class Return(Stmt):
+    __slots__ = ("keyword", "value")
+
     def __init__(self, keyword: Token, value: typing.Optional[Expr]):
-        super().__init__()
+        self.node_id = next_node_id()
         self.keyword = keyword
         self.value = value
 
@@ -125,34 +146,42 @@ class Return(Stmt):
 
 
 class Var(Stmt):
+    __slots__ = ("name", "initializer", "slot")
+
     def __init__(self, name: Token, initializer: typing.Optional[Expr]):
-        super().__init__()
+        self.node_id = next_node_id()
         self.name = name
         self.initializer = initializer
+        self.slot: typing.Optional[int] = None
 
     def accept(self, visitor: StmtVisitor) -> typing.Any:
         return visitor.visit_var_stmt(self)
 
 
 class Class(Stmt):
+    __slots__ = ("name", "superclass", "methods", "slot")
+
     def __init__(
         self,
         name: Token,
         superclass: typing.Optional[Variable],
         methods: typing.List[Function],
     ):
-        super().__init__()
+        self.node_id = next_node_id()
         self.name = name
         self.superclass = superclass
         self.methods = methods
+        self.slot: typing.Optional[int] = None
 
     def accept(self, visitor: StmtVisitor) -> typing.Any:
         return visitor.visit_class_stmt(self)
 
 
 class While(Stmt):
+    __slots__ = ("condition", "body")
+
     def __init__(self, condition: Expr, body: Stmt):
-        super().__init__()
+        self.node_id = next_node_id()
         self.condition = condition
         self.body = body
 
@@ -160,9 +189,42 @@ class While(Stmt):
         return visitor.visit_while_stmt(self)
 
 
+class For(Stmt):
+    __slots__ = (
+        "initializer",
+        "condition",
+        "increment",
+        "body",
+        "frame_size",
+        "uncaptured",
+        "counted",
+    )
+
+    def __init__(
+        self,
+        initializer: typing.Optional[Stmt],
+        condition: typing.Optional[Expr],
+        increment: typing.Optional[Expr],
+        body: Stmt,
+    ):
+        self.node_id = next_node_id()
+        self.initializer = initializer
+        self.condition = condition
+        self.increment = increment
+        self.body = body
+        self.frame_size: int = 0
+        self.uncaptured: typing.Tuple[int, ...] = ()
+        self.counted: bool = False
+
+    def accept(self, visitor: StmtVisitor) -> typing.Any:
+        return visitor.visit_for_stmt(self)
+
+
 class Break(Stmt):
+    __slots__ = ("keyword",)
+
     def __init__(self, keyword: Token):
-        super().__init__()
+        self.node_id = next_node_id()
         self.keyword = keyword
 
     def accept(self, visitor: StmtVisitor) -> typing.Any:
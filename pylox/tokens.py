@@ -1,4 +1,7 @@
+import re
 import typing as t
+from array import array
+from bisect import bisect_right
 from enum import Enum, auto
 
 LITERAL_T = t.Union[str, float, bool, None]
@@ -56,6 +59,8 @@ class TokenType(Enum):
 
 
 class Token:
+    __slots__ = ("token_type", "lexeme", "literal", "line")
+
     def __init__(
         self, token_type: TokenType, lexeme: str, literal: t.Any, line: int
     ) -> None:
@@ -66,3 +71,103 @@ class Token:
 
     def __str__(self):
         return f"line {self.line} : {self.token_type} -- {self.lexeme} -- {self.literal}"
+
+
+# Compact one-byte codes of token types, as stored by `TokenBuffer`.
+TOKEN_TYPES: t.Tuple[TokenType, ...] = tuple(TokenType)
+TOKEN_CODES: t.Dict[TokenType, int] = {
+    token_type: code for code, token_type in enumerate(TOKEN_TYPES)
+}
+
+
+class MaterializedTokens(t.Dict[int, Token]):
+    """
+    Recently used tokens of a `TokenBuffer`, keyed by index.
+
+    Indexing it is a plain dict lookup, so the parser can peek at the same token
+    many times at C speed; a missing token is materialized on first access.
+    """
+
+    # how many tokens are kept for repeated lookahead before starting over
+    LIMIT = 8
+
+    def __init__(self, buffer: "TokenBuffer") -> None:
+        super().__init__()
+        self.buffer = buffer
+
+    def __missing__(self, index: int) -> Token:
+        if len(self) >= self.LIMIT:
+            self.clear()
+        token = self[index] = self.buffer.materialize(index)
+        return token
+
+
+class TokenBuffer(t.Sequence[Token]):
+    """
+    Compact, struct-of-arrays storage for the tokens of one source.
+
+    Token types, start offsets and lengths live in parallel arrays; lexemes are
+    sliced from the source and lines are computed from a table of newline
+    offsets only when a `Token` is materialized.
+    """
+
+    def __init__(self, src: str) -> None:
+        self.src = src
+        self.types = array("B")
+        self.starts = array("I")
+        self.lengths = array("I")
+        self._newlines: t.Optional[array] = None
+        self.recent = MaterializedTokens(self)
+
+    def append(self, token_type: TokenType, start: int, length: int) -> None:
+        self.types.append(TOKEN_CODES[token_type])
+        self.starts.append(start)
+        self.lengths.append(length)
+
+    def __len__(self) -> int:
+        return len(self.types)
+
+    @t.overload
+    def __getitem__(self, index: int) -> Token: ...
+
+    @t.overload
+    def __getitem__(self, index: slice) -> t.List[Token]: ...
+
+    def __getitem__(self, index: int | slice) -> Token | t.List[Token]:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+
+        return self.recent[index]
+
+    def token_type(self, index: int) -> TokenType:
+        return TOKEN_TYPES[self.types[index]]
+
+    def lexeme(self, index: int) -> str:
+        start = self.starts[index]
+        return self.src[start : start + self.lengths[index]]
+
+    @property
+    def newlines(self) -> array:
+        if self._newlines is None:
+            self._newlines = array(
+                "I", (m.start() for m in re.finditer("\n", self.src))
+            )
+        return self._newlines
+
+    def line(self, index: int) -> int:
+        # Multiline strings are reported on the line where they end.
+        end = self.starts[index] + self.lengths[index] - 1
+        return bisect_right(self.newlines, end) + 1
+
+    def materialize(self, index: int) -> Token:
+        token_type = TOKEN_TYPES[self.types[index]]
+        start = self.starts[index]
+        end = start + self.lengths[index]
+        lexeme = self.src[start:end]
+        literal: t.Any = None
+        if token_type is TokenType.NUMBER:
+            literal = float(lexeme) if "." in lexeme else int(lexeme)
+        elif token_type is TokenType.STRING:
+            literal = lexeme[1:-1]
+        line = bisect_right(self.newlines, end - 1) + 1
+        return Token(token_type, lexeme, literal, line)
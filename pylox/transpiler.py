@@ -0,0 +1,919 @@
+import ast
+import itertools
+import operator
+import types
+import typing
+
+import pylox.expr as expr_ast
+import pylox.stmt as stmt_ast
+from pylox.builtin_function import FUNCTIONS_MAPPING
+from pylox.error import LoxRuntimeError
+from pylox.expr import Expr, ExprVisitor
+from pylox.interpreter import Interpreter
+from pylox.runtime_entity import LoxCallable
+from pylox.scanner import Token, TokenType
+from pylox.stmt import Stmt, StmtVisitor
+
+FILENAME = "<lox>"
+
+# Python names never clash: a Lox global `x` is `x_`, a Lox local `x` is
+# `x_<n>`, functions that are not stored in a variable of their own are
+# `x_f<n>` and temporaries are `_t<n>`; the runtime names have no suffix.
+
+
+class Variable:
+    """A local Lox variable, as seen from the Python code."""
+
+    __slots__ = ("name", "owner", "in_loop", "captured")
+
+    def __init__(self, name: str, owner: "FunctionInfo") -> None:
+        self.name = name
+        self.owner = owner
+        self.in_loop = owner.loop_depth > 0
+        self.captured = False
+
+    @property
+    def boxed(self) -> bool:
+        # Python closures capture one variable per function call, Lox ones
+        # a new variable every time a block runs: such variables live in
+        # one-element lists, bound to the closures when they are made.
+        return self.captured and self.in_loop
+
+
+class FunctionInfo:
+    def __init__(self, parent: typing.Optional["FunctionInfo"]) -> None:
+        self.parent = parent
+        self.loop_depth = 0
+        # boxed variables of the parent used by this function or nested ones
+        self.binds: typing.Dict[Variable, None] = {}
+        # non-local variables assigned by this function
+        self.assigns: typing.Dict[Variable, None] = {}
+        self.this: typing.Optional[Variable] = None
+        self.initializer = False
+
+
+class Scope(typing.Dict[int, Variable]):
+    def __init__(self, owner: FunctionInfo) -> None:
+        super().__init__()
+        self.owner = owner
+
+
+class Analyzer(ExprVisitor, StmtVisitor):
+    """
+    Maps every resolved variable to a Python name and finds out which ones
+    are captured, by repeating the scopes of the `Resolver`. The numbers
+    that make the names unique come from `names`.
+    """
+
+    def __init__(
+        self, names: typing.Optional[typing.Iterator[int]] = None
+    ) -> None:
+        self.script = FunctionInfo(None)
+        self.function = self.script
+        self.scopes: typing.List[Scope] = []
+        self.names = itertools.count() if names is None else names
+        # by node id: the variable of a resolved expression or declaration
+        self.variables: typing.Dict[int, Variable] = {}
+        self.redeclared: typing.Set[int] = set()
+        self.functions: typing.Dict[int, FunctionInfo] = {}
+        self.params: typing.Dict[int, typing.List[Variable]] = {}
+        self.supers: typing.Dict[int, Variable] = {}
+        # by node id of `super` expressions: the variable holding `this`
+        self.receivers: typing.Dict[int, Variable] = {}
+
+    def analyze(self, statements: typing.Iterable[Stmt]) -> None:
+        for stmt in statements:
+            stmt.accept(self)
+
+    def new_variable(self, lexeme: str) -> Variable:
+        return Variable(f"{lexeme}_{next(self.names)}", self.function)
+
+    def declare(
+        self, node: stmt_ast.Var | stmt_ast.Function | stmt_ast.Class
+    ) -> None:
+        slot = node.slot
+        if slot is None:
+            return
+        scope = self.scopes[-1]
+        if slot in scope:
+            self.redeclared.add(node.node_id)
+        else:
+            scope[slot] = self.new_variable(node.name.lexeme)
+        self.variables[node.node_id] = scope[slot]
+
+    def reference(
+        self, node: Expr, depth: typing.Optional[int], slot: int
+    ) -> None:
+        if depth is not None:
+            self.variables[node.node_id] = self.lookup(
+                depth, slot, isinstance(node, expr_ast.Assign)
+            )
+
+    def lookup(self, depth: int, slot: int, assign: bool = False) -> Variable:
+        variable = self.scopes[-1 - depth][slot]
+        if variable.owner is self.function:
+            return variable
+
+        variable.captured = True
+        if assign:
+            self.function.assigns[variable] = None
+        function = self.function
+        while function.parent is not variable.owner:
+            function = typing.cast(FunctionInfo, function.parent)
+        function.binds[variable] = None
+        return variable
+
+    def function_body(
+        self, stmt: stmt_ast.Function, this: bool = False
+    ) -> None:
+        info = FunctionInfo(self.function)
+        self.functions[stmt.node_id] = info
+        enclosing, self.function = self.function, info
+        if this:
+            self.scopes.append(Scope(info))
+            info.this = self.scopes[-1][0] = self.new_variable("this")
+            info.initializer = stmt.name.lexeme == "init"
+
+        # like the resolver, leave out the scopes that declare nothing
+        scope = Scope(info)
+        if stmt.frame_size:
+            self.scopes.append(scope)
+        params = []
+        for slot, param in enumerate(stmt.params):
+            params.append(self.new_variable(param.lexeme))
+            scope[slot] = params[-1]
+        self.params[stmt.node_id] = params
+
+        self.analyze(stmt.body)
+
+        if stmt.frame_size:
+            self.scopes.pop()
+        if this:
+            self.scopes.pop()
+        self.function = enclosing
+
+    def visit_assign_expr(self, expr: expr_ast.Assign) -> None:
+        expr.value.accept(self)
+        self.reference(expr, expr.depth, expr.slot)
+
+    def visit_binary_expr(self, expr: expr_ast.Binary) -> None:
+        expr.left.accept(self)
+        expr.right.accept(self)
+
+    def visit_call_expr(self, expr: expr_ast.Call) -> None:
+        expr.callee.accept(self)
+        for argument in expr.arguments:
+            argument.accept(self)
+
+    def visit_get_expr(self, expr: expr_ast.Get) -> None:
+        expr.obj.accept(self)
+
+    def visit_grouping_expr(self, expr: expr_ast.Grouping) -> None:
+        expr.expr.accept(self)
+
+    def visit_literal_expr(self, expr: expr_ast.Literal) -> None:
+        pass
+
+    def visit_logical_expr(self, expr: expr_ast.Logical) -> None:
+        expr.left.accept(self)
+        expr.right.accept(self)
+
+    def visit_set_expr(self, expr: expr_ast.Set) -> None:
+        expr.obj.accept(self)
+        expr.value.accept(self)
+
+    def visit_super_expr(self, expr: expr_ast.Super) -> None:
+        depth = typing.cast(int, expr.depth)
+        self.reference(expr, depth, expr.slot)
+        # `this` is the only variable of the scope right inside `super`'s
+        self.receivers[expr.node_id] = self.lookup(depth - 1, 0)
+
+    def visit_this_expr(self, expr: expr_ast.This) -> None:
+        self.reference(expr, expr.depth, expr.slot)
+
+    def visit_unary_expr(self, expr: expr_ast.Unary) -> None:
+        expr.right.accept(self)
+
+    def visit_variable_expr(self, expr: expr_ast.Variable) -> None:
+        self.reference(expr, expr.depth, expr.slot)
+
+    def visit_block_stmt(self, stmt: stmt_ast.Block) -> None:
+        if stmt.frame_size:
+            self.scopes.append(Scope(self.function))
+        self.analyze(stmt.statements)
+        if stmt.frame_size:
+            self.scopes.pop()
+
+    def visit_class_stmt(self, stmt: stmt_ast.Class) -> None:
+        self.declare(stmt)
+        if stmt.superclass is not None:
+            stmt.superclass.accept(self)
+            self.scopes.append(Scope(self.function))
+            variable = self.scopes[-1][0] = self.new_variable("super")
+            self.supers[stmt.node_id] = variable
+
+        for method in stmt.methods:
+            self.function_body(method, this=True)
+
+        if stmt.superclass is not None:
+            self.scopes.pop()
+
+    def visit_expression_stmt(self, stmt: stmt_ast.Expression) -> None:
+        stmt.expr.accept(self)
+
+    def visit_function_stmt(self, stmt: stmt_ast.Function) -> None:
+        self.declare(stmt)
+        self.function_body(stmt)
+
+    def visit_if_stmt(self, stmt: stmt_ast.If) -> None:
+        stmt.condition.accept(self)
+        stmt.then_branch.accept(self)
+        if stmt.else_branch is not None:
+            stmt.else_branch.accept(self)
+
+    def visit_print_stmt(self, stmt: stmt_ast.Print) -> None:
+        stmt.expr.accept(self)
+
+    def visit_return_stmt(self, stmt: stmt_ast.Return) -> None:
+        if stmt.value is not None:
+            stmt.value.accept(self)
+
+    def visit_var_stmt(self, stmt: stmt_ast.Var) -> None:
+        self.declare(stmt)
+        if stmt.initializer is not None:
+            stmt.initializer.accept(self)
+
+    def visit_while_stmt(self, stmt: stmt_ast.While) -> None:
+        stmt.condition.accept(self)
+        self.function.loop_depth += 1
+        stmt.body.accept(self)
+        self.function.loop_depth -= 1
+
+    def visit_for_stmt(self, stmt: stmt_ast.For) -> None:
+        if stmt.frame_size:
+            self.scopes.append(Scope(self.function))
+        if stmt.initializer is not None:
+            stmt.initializer.accept(self)
+        if stmt.condition is not None:
+            stmt.condition.accept(self)
+        if stmt.increment is not None:
+            stmt.increment.accept(self)
+        self.function.loop_depth += 1
+        stmt.body.accept(self)
+        self.function.loop_depth -= 1
+        if stmt.frame_size:
+            self.scopes.pop()
+
+    def visit_break_stmt(self, stmt: stmt_ast.Break) -> None:
+        pass
+
+
+# expressions that always evaluate to a Python bool
+BOOLEAN_OPERATORS = {
+    TokenType.BANG,
+    TokenType.BANG_EQUAL,
+    TokenType.EQUAL_EQUAL,
+    TokenType.GREATER,
+    TokenType.GREATER_EQUAL,
+    TokenType.LESS,
+    TokenType.LESS_EQUAL,
+}
+
+ARITHMETIC = {
+    TokenType.MINUS: ("-", "sub"),
+    TokenType.STAR: ("*", "mul"),
+    TokenType.GREATER: (">", "gt"),
+    TokenType.GREATER_EQUAL: (">=", "ge"),
+    TokenType.LESS: ("<", "lt"),
+    TokenType.LESS_EQUAL: ("<=", "le"),
+}
+
+
+class Transpiler(ExprVisitor, StmtVisitor):
+    """
+    Translates resolved statements to Python source.
+
+    Values are plain Python objects, so that CPython does the work: Lox
+    functions are Python functions, numbers are floats and the checks that
+    Lox makes on operands are inlined in front of a fast path. The source
+    line of every generated line is kept, for the tracebacks.
+
+    Locals of top-level blocks become globals of the Python module, so the
+    programs run in one namespace must share `names` to keep them apart.
+    """
+
+    def __init__(
+        self,
+        statements: typing.List[Stmt],
+        names: typing.Optional[typing.Iterator[int]] = None,
+    ) -> None:
+        self.analysis = Analyzer(names)
+        self.analysis.analyze(statements)
+        self.function = self.analysis.script
+        self.code: typing.List[str] = []
+        self.lines: typing.List[int] = []
+        self.indent = 0
+        self.line = 0
+        self.temps = itertools.count()
+        for stmt in statements:
+            stmt.accept(self)
+
+    @property
+    def source(self) -> str:
+        return "".join(f"{line}\n" for line in self.code)
+
+    def emit(self, line: str) -> None:
+        self.code.append("    " * self.indent + line)
+        self.lines.append(self.line)
+
+    def body(self, statements: typing.Iterable[Stmt]) -> None:
+        self.indent += 1
+        start = len(self.code)
+        for stmt in statements:
+            stmt.accept(self)
+        if len(self.code) == start:
+            self.emit("pass")
+        self.indent -= 1
+
+    def temp(self) -> str:
+        return f"_t{next(self.temps)}"
+
+    def expression(self, expr: Expr) -> str:
+        return typing.cast(str, expr.accept(self))
+
+    def condition(self, expr: Expr) -> str:
+        """Python expression that is true when `expr` is truthy in Lox."""
+        code = self.expression(expr)
+        if (
+            isinstance(expr, (expr_ast.Binary, expr_ast.Unary))
+            and expr.operator.token_type in BOOLEAN_OPERATORS
+        ):
+            return code
+        t = self.temp()
+        return f"(({t} := {code}) is not None and {t} is not False)"
+
+    # variables
+
+    def global_name(self, name: Token) -> str:
+        return f"{name.lexeme}_"
+
+    def load(self, node: Expr, name: Token) -> str:
+        self.line = name.line
+        variable = self.analysis.variables.get(node.node_id)
+        if variable is None:
+            return self.global_name(name)
+        if variable.boxed:
+            return f"{variable.name}[0]"
+        return variable.name
+
+    def store(
+        self,
+        declaration: stmt_ast.Var | stmt_ast.Function | stmt_ast.Class,
+        value: str,
+    ) -> None:
+        """Emit the definition of a variable, function or class."""
+        variable = self.analysis.variables.get(declaration.node_id)
+        if variable is None:
+            self.emit(f"{self.global_name(declaration.name)} = {value}")
+        elif not variable.boxed:
+            self.emit(f"{variable.name} = {value}")
+        elif declaration.node_id in self.analysis.redeclared:
+            self.emit(f"{variable.name}[0] = {value}")
+        else:
+            self.emit(f"{variable.name} = [{value}]")
+
+    def predeclare(
+        self, declaration: stmt_ast.Function | stmt_ast.Class
+    ) -> typing.Optional[Variable]:
+        """Create the box of a variable that closures in its value use."""
+        variable = self.analysis.variables.get(declaration.node_id)
+        if variable is None or not variable.boxed:
+            return None
+        if declaration.node_id not in self.analysis.redeclared:
+            self.analysis.redeclared.add(declaration.node_id)
+            self.emit(f"{variable.name} = [None]")
+        return variable
+
+    def define_function(
+        self,
+        stmt: stmt_ast.Function,
+        name: str,
+        this: typing.Optional[Variable] = None,
+    ) -> None:
+        info = self.analysis.functions[stmt.node_id]
+        params = [p.name for p in self.analysis.params[stmt.node_id]]
+        if this is not None:
+            params.insert(0, this.name)
+        binds = [v.name for v in info.binds if v.boxed]
+        if binds:
+            params.append("*")
+            params.extend(f"{bind}={bind}" for bind in binds)
+
+        self.line = stmt.name.line
+        self.emit(f"def {name}({', '.join(params)}):")
+        enclosing, self.function = self.function, info
+        self.indent += 1
+        assigned = [v for v in info.assigns if not v.boxed]
+        nonlocals = [v.name for v in assigned if v.owner.parent is not None]
+        globals_ = [v.name for v in assigned if v.owner.parent is None]
+        if nonlocals:
+            self.emit(f"nonlocal {', '.join(nonlocals)}")
+        if globals_:
+            self.emit(f"global {', '.join(globals_)}")
+        self.indent -= 1
+
+        self.body(stmt.body)
+        if info.initializer and this is not None:
+            self.indent += 1
+            self.emit(f"return {this.name}")
+            self.indent -= 1
+        self.function = enclosing
+
+    # expressions
+
+    def visit_literal_expr(self, expr: expr_ast.Literal) -> str:
+        value = expr.value
+        # Numbers are floats at run time, except integers that floats can't
+        # hold exactly.
+        if type(value) is int and float(value) == value:
+            value = float(value)
+        return repr(value)
+
+    def visit_grouping_expr(self, expr: expr_ast.Grouping) -> str:
+        return self.expression(expr.expr)
+
+    def visit_variable_expr(self, expr: expr_ast.Variable) -> str:
+        return self.load(expr, expr.name)
+
+    def visit_this_expr(self, expr: expr_ast.This) -> str:
+        return self.load(expr, expr.keyword)
+
+    def visit_assign_expr(self, expr: expr_ast.Assign) -> str:
+        value = self.expression(expr.value)
+        self.line = expr.name.line
+        variable = self.analysis.variables.get(expr.node_id)
+        if variable is None:
+            lexeme = expr.name.lexeme
+            return f"assign_global({lexeme!r}, {value}, {expr.name.line})"
+        if variable.boxed:
+            t = self.temp()
+            return f"({variable.name}.__setitem__(0, {t} := {value}) or {t})"
+        return f"({variable.name} := {value})"
+
+    def visit_unary_expr(self, expr: expr_ast.Unary) -> str:
+        right = self.expression(expr.right)
+        op = expr.operator
+        self.line = op.line
+        t = self.temp()
+        if op.token_type is TokenType.MINUS:
+            return (
+                f"(-{t} if type({t} := {right}) is float "
+                f"else negate({t}, {op.line}))"
+            )
+        return f"(({t} := {right}) is None or {t} is False)"
+
+    def visit_binary_expr(self, expr: expr_ast.Binary) -> str:
+        left = self.expression(expr.left)
+        right = self.expression(expr.right)
+        op = expr.operator
+        self.line = op.line
+        a, b = self.temp(), self.temp()
+        numbers = f"type({a} := {left}) is type({b} := {right})"
+
+        match op.token_type:
+            case TokenType.PLUS:
+                return (
+                    f"({a} + {b} if {numbers} is float "
+                    f"else add({a}, {b}, {op.line}))"
+                )
+            case TokenType.SLASH:
+                return (
+                    f"({a} / {b} if {numbers} is float and {b} "
+                    f"else divide({a}, {b}, {op.line}))"
+                )
+            case TokenType.EQUAL_EQUAL:
+                return (
+                    f"({a} == {b} if {numbers} is not MethodType "
+                    f"else equals({a}, {b}))"
+                )
+            case TokenType.BANG_EQUAL:
+                return (
+                    f"({a} != {b} if {numbers} is not MethodType "
+                    f"else not equals({a}, {b}))"
+                )
+
+        symbol, name = ARITHMETIC[op.token_type]
+        return (
+            f"({a} {symbol} {b} if {numbers} is float "
+            f"else binary(operator.{name}, {a}, {b}, {op.line}))"
+        )
+
+    def visit_logical_expr(self, expr: expr_ast.Logical) -> str:
+        left = self.expression(expr.left)
+        right = self.expression(expr.right)
+        t = self.temp()
+        truthy = f"({t} := {left}) is not None and {t} is not False"
+        if expr.operator.token_type is TokenType.OR:
+            return f"({t} if {truthy} else {right})"
+        return f"({right} if {truthy} else {t})"
+
+    def visit_call_expr(self, expr: expr_ast.Call) -> str:
+        callee = self.expression(expr.callee)
+        arguments = [self.expression(arg) for arg in expr.arguments]
+        self.line = expr.paren.line
+        return f"call({', '.join([callee, str(self.line), *arguments])})"
+
+    def visit_get_expr(self, expr: expr_ast.Get) -> str:
+        obj = self.expression(expr.obj)
+        self.line = expr.name.line
+        return f"get({obj}, {expr.name.lexeme!r}, {self.line})"
+
+    def visit_set_expr(self, expr: expr_ast.Set) -> str:
+        obj = self.expression(expr.obj)
+        line = expr.name.line
+        # the object is checked before the value is evaluated
+        fields = f"fields({obj}, {line})"
+        value = self.expression(expr.value)
+        self.line = line
+        return f"set_field({fields}, {expr.name.lexeme!r}, {value})"
+
+    def visit_super_expr(self, expr: expr_ast.Super) -> str:
+        superclass = self.load(expr, expr.keyword)
+        receiver = self.analysis.receivers[expr.node_id]
+        this = receiver.name + ("[0]" if receiver.boxed else "")
+        self.line = expr.method.line
+        return (
+            f"get_super({superclass}, {this}, "
+            f"{expr.method.lexeme!r}, {self.line})"
+        )
+
+    # statements
+
+    def visit_expression_stmt(self, stmt: stmt_ast.Expression) -> None:
+        expr = stmt.expr
+        variable = self.analysis.variables.get(expr.node_id)
+        if isinstance(expr, expr_ast.Assign) and variable is not None:
+            value = self.expression(expr.value)
+            self.line = expr.name.line
+            target = variable.name + "[0]" if variable.boxed else variable.name
+            self.emit(f"{target} = {value}")
+        else:
+            self.emit(self.expression(expr))
+
+    def visit_print_stmt(self, stmt: stmt_ast.Print) -> None:
+        self.emit(f"print(stringify({self.expression(stmt.expr)}))")
+
+    def visit_var_stmt(self, stmt: stmt_ast.Var) -> None:
+        value = "None"
+        if stmt.initializer is not None:
+            value = self.expression(stmt.initializer)
+        self.line = stmt.name.line
+        self.store(stmt, value)
+
+    def visit_block_stmt(self, stmt: stmt_ast.Block) -> None:
+        for block_stmt in stmt.statements:
+            block_stmt.accept(self)
+
+    def visit_if_stmt(self, stmt: stmt_ast.If) -> None:
+        self.emit(f"if {self.condition(stmt.condition)}:")
+        self.body([stmt.then_branch])
+        if stmt.else_branch is not None:
+            self.emit("else:")
+            self.body([stmt.else_branch])
+
+    def visit_while_stmt(self, stmt: stmt_ast.While) -> None:
+        self.emit(f"while {self.condition(stmt.condition)}:")
+        self.body([stmt.body])
+
+    def visit_for_stmt(self, stmt: stmt_ast.For) -> None:
+        if stmt.initializer is not None:
+            stmt.initializer.accept(self)
+        if stmt.condition is None:
+            self.emit("while True:")
+        else:
+            self.emit(f"while {self.condition(stmt.condition)}:")
+        body = [stmt.body]
+        if stmt.increment is not None:
+            body.append(stmt_ast.Expression(stmt.increment))
+        self.body(body)
+
+    def visit_break_stmt(self, stmt: stmt_ast.Break) -> None:
+        self.line = stmt.keyword.line
+        self.emit("break")
+
+    def visit_return_stmt(self, stmt: stmt_ast.Return) -> None:
+        if stmt.value is not None:
+            value = self.expression(stmt.value)
+        elif self.function.initializer and self.function.this is not None:
+            value = self.function.this.name
+        else:
+            value = "None"
+        self.line = stmt.keyword.line
+        self.emit(f"return {value}")
+
+    def visit_function_stmt(self, stmt: stmt_ast.Function) -> None:
+        variable = self.predeclare(stmt)
+        if variable is not None:
+            name = f"{stmt.name.lexeme}_f{next(self.temps)}"
+        else:
+            local = self.analysis.variables.get(stmt.node_id)
+            name = self.global_name(stmt.name) if local is None else local.name
+        self.define_function(stmt, name)
+        if variable is not None:
+            self.store(stmt, name)
+
+    def visit_class_stmt(self, stmt: stmt_ast.Class) -> None:
+        superclass = "None"
+        if stmt.superclass is not None:
+            variable = self.analysis.supers[stmt.node_id]
+            self.line = stmt.superclass.name.line
+            value = (
+                f"superclass({self.expression(stmt.superclass)}, "
+                f"{self.line})"
+            )
+            self.emit(
+                f"{variable.name} = [{value}]"
+                if variable.boxed
+                else f"{variable.name} = {value}"
+            )
+            superclass = variable.name + ("[0]" if variable.boxed else "")
+
+        self.predeclare(stmt)
+        methods = []
+        for method in stmt.methods:
+            name = f"{method.name.lexeme}_f{next(self.temps)}"
+            info = self.analysis.functions[method.node_id]
+            self.define_function(method, name, info.this)
+            methods.append(f"{method.name.lexeme!r}: {name}")
+
+        self.line = stmt.name.line
+        self.store(
+            stmt,
+            f"Class({stmt.name.lexeme!r}, {superclass}, "
+            f"{{{', '.join(methods)}}})",
+        )
+
+
+class Class:
+    """Lox class; like `LoxClass`, inherited methods are flattened."""
+
+    __slots__ = ("name", "superclass", "methods", "table", "initializer")
+
+    def __init__(
+        self,
+        name: str,
+        superclass: typing.Optional["Class"],
+        methods: typing.Dict[str, types.FunctionType],
+    ) -> None:
+        self.name = name
+        self.superclass = superclass
+        self.methods = methods
+        self.table: typing.Dict[str, types.FunctionType] = {}
+        if superclass is not None:
+            self.table.update(superclass.table)
+        self.table.update(methods)
+        self.initializer = self.table.get("init")
+
+    def find_method(self, name: str) -> typing.Optional[types.FunctionType]:
+        return self.table.get(name)
+
+    def __str__(self) -> str:
+        return self.name
+
+
+class Instance:
+    __slots__ = ("lox_class", "fields")
+
+    def __init__(self, lox_class: Class) -> None:
+        self.lox_class = lox_class
+        self.fields: typing.Dict[str, typing.Any] = {}
+
+    def __str__(self) -> str:
+        return f"{self.lox_class.name} instance"
+
+
+def error(line: int, message: str) -> LoxRuntimeError:
+    return LoxRuntimeError(Token(TokenType.EOF, "", None, line), message)
+
+
+def lox_name(function: typing.Callable) -> str:
+    return function.__name__.rsplit("_", 1)[0]
+
+
+def stringify(value: typing.Any) -> str:
+    if type(value) is types.FunctionType:
+        return f"<fn {lox_name(value)}>"
+    if type(value) is types.MethodType:
+        return f"<fn {lox_name(value.__func__)}>"
+    return Interpreter.stringify(value)
+
+
+def equals(left: typing.Any, right: typing.Any) -> bool:
+    if type(left) is types.MethodType:
+        return left is right  # every access binds a new method
+    return Interpreter.equals(left, right)
+
+
+def check_numbers(left: typing.Any, right: typing.Any, line: int) -> None:
+    if not Interpreter.is_number(left) or not Interpreter.is_number(right):
+        raise error(line, "Operands must be a numbers.")
+
+
+def binary(
+    operation: typing.Callable, left: typing.Any, right: typing.Any, line: int
+) -> typing.Any:
+    check_numbers(left, right, line)
+    return operation(float(left), float(right))
+
+
+def add(left: typing.Any, right: typing.Any, line: int) -> typing.Any:
+    if Interpreter.is_number(left) and Interpreter.is_number(right):
+        return float(left) + float(right)
+    if type(left) is str or type(right) is str:
+        return stringify(left) + stringify(right)
+    raise error(line, "Operands must be two numbers or two strings.")
+
+
+def divide(left: typing.Any, right: typing.Any, line: int) -> float:
+    check_numbers(left, right, line)
+    if float(right) == 0:
+        raise error(line, "Division by zero!")
+    return float(left) / float(right)
+
+
+def negate(value: typing.Any, line: int) -> float:
+    if not Interpreter.is_number(value):
+        raise error(line, "Operand must be a number.")
+    return -float(value)
+
+
+def get(obj: typing.Any, name: str, line: int) -> typing.Any:
+    if type(obj) is not Instance:
+        raise error(line, "Only instances have properties.")
+    if name in obj.fields:
+        return obj.fields[name]
+    method = obj.lox_class.find_method(name)
+    if method is None:
+        raise error(line, f"Undefined property '{name}'.")
+    return types.MethodType(method, obj)
+
+
+def fields(obj: typing.Any, line: int) -> typing.Dict[str, typing.Any]:
+    if type(obj) is not Instance:
+        raise error(line, "Only instances have fields.")
+    return obj.fields
+
+
+def set_field(
+    fields: typing.Dict[str, typing.Any], name: str, value: typing.Any
+) -> typing.Any:
+    fields[name] = value
+    return value
+
+
+def get_super(
+    superclass: Class, this: Instance, name: str, line: int
+) -> types.MethodType:
+    method = superclass.find_method(name)
+    if method is None:
+        raise error(line, f"Undefined property '{name}'.")
+    return types.MethodType(method, this)
+
+
+def superclass(value: typing.Any, line: int) -> Class:
+    if type(value) is not Class:
+        raise error(line, "Superclass must be a class.")
+    return value
+
+
+def runtime(interpreter: Interpreter) -> typing.Dict[str, typing.Any]:
+    """Global namespace of transpiled programs run by `interpreter`."""
+    namespace: typing.Dict[str, typing.Any] = {}
+
+    def call(callee: typing.Any, line: int, *args: typing.Any) -> typing.Any:
+        kind = type(callee)
+        if kind is types.FunctionType:
+            arity = callee.__code__.co_argcount
+        elif kind is types.MethodType:
+            arity = callee.__func__.__code__.co_argcount - 1
+        elif kind is Class:
+            instance = Instance(callee)
+            initializer = callee.initializer
+            arity = 0
+            if initializer is not None:
+                arity = initializer.__code__.co_argcount - 1
+            if len(args) != arity:
+                raise error(
+                    line, f"Expected {arity} arguments but got {len(args)}."
+                )
+            if initializer is not None:
+                initializer(instance, *args)
+            return instance
+        elif isinstance(callee, LoxCallable):
+            arity = callee.arity()
+            if len(args) != arity:
+                raise error(
+                    line, f"Expected {arity} arguments but got {len(args)}."
+                )
+            return callee.call(interpreter, list(args))
+        else:
+            raise error(line, "Can only call functions and classes.")
+
+        if len(args) != arity:
+            raise error(
+                line, f"Expected {arity} arguments but got {len(args)}."
+            )
+        return callee(*args)
+
+    def assign_global(name: str, value: typing.Any, line: int) -> typing.Any:
+        if f"{name}_" not in namespace:
+            raise error(line, f"Undefined variable '{name}'.")
+        namespace[f"{name}_"] = value
+        return value
+
+    namespace.update(
+        {
+            "MethodType": types.MethodType,
+            "operator": operator,
+            "stringify": stringify,
+            "equals": equals,
+            "binary": binary,
+            "add": add,
+            "divide": divide,
+            "negate": negate,
+            "call": call,
+            "get": get,
+            "fields": fields,
+            "set_field": set_field,
+            "get_super": get_super,
+            "Class": Class,
+            "superclass": superclass,
+            "assign_global": assign_global,
+        }
+    )
+    for name, function in FUNCTIONS_MAPPING.items():
+        namespace[f"{name}_"] = function
+    return namespace
+
+
+def compile_python(
+    source: str, lines: typing.List[int], mode: str = "exec"
+) -> types.CodeType:
+    """
+    Compile transpiled `source`, numbering its lines as in the Lox code.
+
+    Python rejecting the source is a bug of the transpiler, reported as a
+    runtime error of the Lox line rather than as a host traceback.
+    """
+    try:
+        tree = ast.parse(source, FILENAME, mode)
+    except SyntaxError as e:
+        raise internal_error(lines[(e.lineno or 1) - 1], e) from None
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.stmt, ast.expr)):
+            node.lineno = lines[node.lineno - 1]
+            node.end_lineno = node.lineno
+    try:
+        return compile(tree, FILENAME, mode)  # type: ignore
+    except SyntaxError as e:  # the lines are Lox ones already
+        raise internal_error(e.lineno or 0, e) from None
+
+
+def internal_error(line: int, e: SyntaxError) -> LoxRuntimeError:
+    return error(line, f"Internal error: {e.msg}.")
+
+
+class PythonInterpreter(Interpreter):
+    """Interpreter that runs programs translated to Python by `Transpiler`."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.namespace = runtime(self)
+        # numbers of the Python names given out to the programs run so far
+        self.names = itertools.count()
+
+    def interpret(self, statements: list[Stmt]):
+        transpiler = Transpiler(statements, self.names)
+        self.execute_python(
+            compile_python(transpiler.source, transpiler.lines)
+        )
+
+    def interpret_expr(self, expr: Expr) -> str:
+        transpiler = Transpiler([])
+        source = transpiler.expression(expr)
+        code = compile_python(source, [transpiler.line], "eval")
+        return stringify(self.execute_python(code))
+
+    def execute_python(self, code: types.CodeType) -> typing.Any:
+        try:
+            return eval(code, self.namespace)
+        except NameError as e:
+            # only global Lox variables are looked up by name
+            traceback = e.__traceback__
+            line = 0
+            while traceback is not None:
+                if traceback.tb_frame.f_code.co_filename == FILENAME:
+                    line = traceback.tb_lineno
+                traceback = traceback.tb_next
+            name = typing.cast(str, e.name)[:-1]
+            raise error(line, f"Undefined variable '{name}'.") from None
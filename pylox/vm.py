@@ -0,0 +1,486 @@
+import typing
+
+import pylox.runtime_entity as runtime
+from pylox.bytecode import (
+    ADD,
+    CALL,
+    CALL_METHOD,
+    CHECK_INSTANCE,
+    CLASS,
+    CLOSURE,
+    CONSTANT,
+    DEFINE_CELL,
+    DEFINE_GLOBAL,
+    DEFINE_LOCAL,
+    DIVIDE,
+    DUP,
+    EQUAL,
+    GET_CELL,
+    GET_GLOBAL,
+    GET_LOCAL,
+    GET_METHOD,
+    GET_PROPERTY,
+    GET_SUPER,
+    GET_UPVALUE,
+    GREATER,
+    GREATER_EQUAL,
+    JUMP,
+    JUMP_IF_FALSE_OR_POP,
+    JUMP_IF_TRUE_OR_POP,
+    LESS,
+    LESS_EQUAL,
+    METHOD,
+    MULTIPLY,
+    NEGATE,
+    NEW_CELL,
+    NOT,
+    NOT_EQUAL,
+    POP,
+    POP_JUMP_IF_FALSE,
+    PRINT,
+    RETURN,
+    SET_CELL,
+    SET_GLOBAL,
+    SET_LOCAL,
+    SET_PROPERTY,
+    SET_UPVALUE,
+    SUBCLASS,
+    SUBTRACT,
+    Compiler,
+    Function,
+)
+from pylox.environment import UNDEFINED
+from pylox.error import LoxRuntimeError
+from pylox.expr import Expr
+from pylox.interpreter import Interpreter
+from pylox.runtime_entity import LoxCallable, LoxClass, LoxInstance
+from pylox.scanner import Token, TokenType
+from pylox.stmt import Stmt
+
+NUMBERS = (int, float)
+stringify = Interpreter.stringify
+equals = Interpreter.equals
+
+
+class Cell:
+    """A captured variable, shared by the frame and the closures over it."""
+
+    __slots__ = ("value",)
+
+    def __init__(self, value: typing.Any) -> None:
+        self.value = value
+
+
+class Closure(LoxCallable):
+    def __init__(
+        self, function: Function, upvalues: typing.Tuple[Cell, ...]
+    ) -> None:
+        self.function = function
+        self.upvalues = upvalues
+
+    def call(self, interpreter: "Interpreter", args: list) -> typing.Any:
+        return typing.cast(VM, interpreter).run(self, args)
+
+    def bind(self, instance: LoxInstance) -> "BoundMethod":
+        return BoundMethod(instance, self)
+
+    def invoke(
+        self, interpreter: "Interpreter", instance: LoxInstance, args: list
+    ) -> typing.Any:
+        return typing.cast(VM, interpreter).run(self, [instance, *args])
+
+    def arity(self) -> int:
+        return self.function.arity
+
+    def __str__(self) -> str:
+        return f"<fn {self.function.name}>"
+
+
+class BoundMethod(LoxCallable):
+    def __init__(self, receiver: LoxInstance, method: Closure) -> None:
+        self.receiver = receiver
+        self.method = method
+
+    def call(self, interpreter: "Interpreter", args: list) -> typing.Any:
+        return typing.cast(VM, interpreter).run(
+            self.method, [self.receiver, *args]
+        )
+
+    def arity(self) -> int:
+        return self.method.function.arity
+
+    def __str__(self) -> str:
+        return str(self.method)
+
+
+def error(function: Function, ip: int, message: str) -> LoxRuntimeError:
+    """Runtime error of the instruction that ends at `ip`."""
+    token = Token(TokenType.EOF, "", None, function.line(ip))
+    return LoxRuntimeError(token, message)
+
+
+class VM(Interpreter):
+    """
+    Compiles the program to bytecode and runs it in a dispatch loop.
+
+    A call of a Lox function, method or initializer pushes a frame, with its
+    own operand stack and local slots, on the frame stack of the loop that
+    makes it, so recursion never nests on the Python stack. Only native
+    functions, which may call back into Lox, run a new loop. Classes,
+    instances and native functions are shared with the tree-walking
+    `Interpreter`.
+    """
+
+    def interpret(self, statements: list[Stmt]):
+        function = Compiler().compile(statements)
+        self.run(Closure(function, ()), [])
+
+    def interpret_expr(self, expr: Expr) -> str:
+        function = Compiler().compile_expr(expr)
+        return self.stringify(self.run(Closure(function, ()), []))
+
+    def run(self, closure: Closure, args: list) -> typing.Any:
+        values = self.globals.values
+        # the suspended callers: closure, local slots, stack and return ip
+        frames: typing.List[
+            typing.Tuple[Closure, list, typing.List[typing.Any], int]
+        ] = []
+        slots = self.locals_of(closure.function, args)
+        stack: typing.List[typing.Any] = []
+        ip = 0
+
+        while True:  # (re)load the frame on top
+            function = closure.function
+            code = function.code
+            constants = function.constants
+            upvalues = closure.upvalues
+            push = stack.append
+            pop = stack.pop
+
+            while True:
+                op = code[ip]
+                arg = code[ip + 1]
+                ip += 2
+
+                # roughly the most frequent instructions first
+                if op == GET_LOCAL:
+                    push(slots[arg])
+                elif op == CONSTANT:
+                    push(constants[arg])
+                elif op == POP_JUMP_IF_FALSE:
+                    value = pop()
+                    if value is None or value is False:
+                        ip = arg
+                elif op == LESS or op == GREATER or op == SUBTRACT:
+                    right = pop()
+                    left = stack[-1]
+                    if type(left) not in NUMBERS or type(right) not in NUMBERS:
+                        raise error(
+                            function, ip, "Operands must be a numbers."
+                        )
+                    if op == LESS:
+                        stack[-1] = float(left) < float(right)
+                    elif op == GREATER:
+                        stack[-1] = float(left) > float(right)
+                    else:
+                        stack[-1] = float(left) - float(right)
+                elif op == ADD:
+                    right = pop()
+                    left = stack[-1]
+                    if type(left) in NUMBERS and type(right) in NUMBERS:
+                        stack[-1] = float(left) + float(right)
+                    elif type(left) is str or type(right) is str:
+                        stack[-1] = stringify(left) + stringify(right)
+                    else:
+                        raise error(
+                            function,
+                            ip,
+                            "Operands must be two numbers or two strings.",
+                        )
+                elif op == SET_LOCAL:
+                    slots[arg] = stack[-1]
+                elif op == DEFINE_LOCAL:
+                    slots[arg] = pop()
+                elif op == POP:
+                    pop()
+                elif op == JUMP:
+                    ip = arg
+                elif op == GET_GLOBAL:
+                    value = values[arg]
+                    if value is UNDEFINED:
+                        raise error(function, ip, self.undefined(arg))
+                    push(value)
+                elif op == CALL:
+                    start = len(stack) - arg
+                    callee = stack[start - 1]
+                    call_args = stack[start:]
+                    del stack[start - 1 :]
+                    if type(callee) is not Closure or (
+                        arg != callee.function.arity
+                    ):
+                        frame = self.frame(callee, call_args, function, ip)
+                        if frame is None:
+                            push(self.call(callee, call_args, function, ip))
+                            continue
+                        callee, call_args = frame
+                    frames.append((closure, slots, stack, ip))
+                    closure = callee
+                    function = closure.function
+                    size = function.size - len(call_args)
+                    slots = call_args + [None] * size
+                    for slot in function.cells:
+                        slots[slot] = Cell(slots[slot])
+                    stack = []
+                    ip = 0
+                    break
+                elif op == RETURN:
+                    value = pop()
+                    if not frames:
+                        return value
+                    closure, slots, stack, ip = frames.pop()
+                    stack.append(value)
+                    break
+                elif op == GET_UPVALUE:
+                    push(upvalues[arg].value)
+                elif op == GET_CELL:
+                    push(slots[arg].value)
+                elif op == GET_METHOD:
+                    name = constants[arg]
+                    obj = stack[-1]
+                    if not isinstance(obj, LoxInstance):
+                        raise LoxRuntimeError(
+                            name, "Only instances have properties."
+                        )
+                    offset = obj.shape.offsets.get(name.lexeme)
+                    if offset is not None:
+                        stack[-1] = obj.values[offset]
+                        push(None)  # called without a receiver
+                    else:
+                        method = obj.lox_class.find_method(name.lexeme)
+                        if method is None:
+                            raise LoxRuntimeError(
+                                name, f"Undefined property '{name.lexeme}'."
+                            )
+                        stack[-1] = method
+                        push(obj)
+                elif op == CALL_METHOD:
+                    start = len(stack) - arg
+                    receiver = stack[start - 1]
+                    callee = stack[start - 2]
+                    if receiver is None:
+                        call_args = stack[start:]
+                        del stack[start - 2 :]
+                        frame = self.frame(callee, call_args, function, ip)
+                        if frame is None:
+                            push(self.call(callee, call_args, function, ip))
+                            continue
+                        callee, call_args = frame
+                    else:
+                        # the receiver is the first local of the method
+                        call_args = stack[start - 1 :]
+                        del stack[start - 2 :]
+                        if arg != callee.function.arity:
+                            raise error(
+                                function,
+                                ip,
+                                f"Expected {callee.function.arity} arguments "
+                                f"but got {arg}.",
+                            )
+                    frames.append((closure, slots, stack, ip))
+                    closure = callee
+                    function = closure.function
+                    size = function.size - len(call_args)
+                    slots = call_args + [None] * size
+                    for slot in function.cells:
+                        slots[slot] = Cell(slots[slot])
+                    stack = []
+                    ip = 0
+                    break
+                elif op == GET_PROPERTY:
+                    name = constants[arg]
+                    obj = stack[-1]
+                    if not isinstance(obj, LoxInstance):
+                        raise LoxRuntimeError(
+                            name, "Only instances have properties."
+                        )
+                    stack[-1] = obj.get(name)
+                elif op == SET_PROPERTY:
+                    name = constants[arg]
+                    value = pop()
+                    obj = stack[-1]
+                    if not isinstance(obj, LoxInstance):
+                        raise LoxRuntimeError(
+                            name, "Only instances have fields."
+                        )
+                    obj.set(name, value)
+                    stack[-1] = value
+                elif op == CHECK_INSTANCE:
+                    if not isinstance(stack[-1], LoxInstance):
+                        raise LoxRuntimeError(
+                            constants[arg], "Only instances have fields."
+                        )
+                elif op == MULTIPLY or op == DIVIDE:
+                    right = pop()
+                    left = stack[-1]
+                    if type(left) not in NUMBERS or type(right) not in NUMBERS:
+                        raise error(
+                            function, ip, "Operands must be a numbers."
+                        )
+                    if op == MULTIPLY:
+                        stack[-1] = float(left) * float(right)
+                    elif float(right) == 0:
+                        raise error(function, ip, "Division by zero!")
+                    else:
+                        stack[-1] = float(left) / float(right)
+                elif op == LESS_EQUAL or op == GREATER_EQUAL:
+                    right = pop()
+                    left = stack[-1]
+                    if type(left) not in NUMBERS or type(right) not in NUMBERS:
+                        raise error(
+                            function, ip, "Operands must be a numbers."
+                        )
+                    if op == LESS_EQUAL:
+                        stack[-1] = float(left) <= float(right)
+                    else:
+                        stack[-1] = float(left) >= float(right)
+                elif op == EQUAL:
+                    right = pop()
+                    stack[-1] = equals(stack[-1], right)
+                elif op == NOT_EQUAL:
+                    right = pop()
+                    stack[-1] = not equals(stack[-1], right)
+                elif op == JUMP_IF_FALSE_OR_POP:
+                    value = stack[-1]
+                    if value is None or value is False:
+                        ip = arg
+                    else:
+                        pop()
+                elif op == JUMP_IF_TRUE_OR_POP:
+                    value = stack[-1]
+                    if value is not None and value is not False:
+                        ip = arg
+                    else:
+                        pop()
+                elif op == NOT:
+                    value = stack[-1]
+                    stack[-1] = value is None or value is False
+                elif op == NEGATE:
+                    value = stack[-1]
+                    if type(value) not in NUMBERS:
+                        raise error(function, ip, "Operand must be a number.")
+                    stack[-1] = -float(value)
+                elif op == SET_UPVALUE:
+                    upvalues[arg].value = stack[-1]
+                elif op == SET_CELL:
+                    slots[arg].value = stack[-1]
+                elif op == DEFINE_CELL:
+                    slots[arg] = Cell(pop())
+                elif op == NEW_CELL:
+                    slots[arg] = Cell(None)
+                elif op == SET_GLOBAL:
+                    if values[arg] is UNDEFINED:
+                        raise error(function, ip, self.undefined(arg))
+                    values[arg] = stack[-1]
+                elif op == DEFINE_GLOBAL:
+                    self.globals.define(constants[arg].lexeme, pop())
+                elif op == PRINT:
+                    print(stringify(pop()))
+                elif op == DUP:
+                    push(stack[-1])
+                elif op == CLOSURE:
+                    nested = constants[arg]
+                    push(
+                        Closure(
+                            nested,
+                            tuple(
+                                slots[index] if is_local else upvalues[index]
+                                for is_local, index in nested.upvalues
+                            ),
+                        )
+                    )
+                elif op == GET_SUPER:
+                    name = constants[arg]
+                    superclass = pop()
+                    method = superclass.find_method(name.lexeme)
+                    if method is None:
+                        raise LoxRuntimeError(
+                            name, f"Undefined property '{name.lexeme}'."
+                        )
+                    stack[-1] = BoundMethod(stack[-1], method)
+                elif op == CLASS:
+                    push(LoxClass(constants[arg], None, {}))  # type: ignore
+                elif op == SUBCLASS:
+                    superclass = pop()
+                    if not isinstance(superclass, LoxClass):
+                        raise error(
+                            function, ip, "Superclass must be a class."
+                        )
+                    push(LoxClass(constants[arg], superclass, {}))
+                elif op == METHOD:
+                    method = pop()
+                    stack[-1].define_method(constants[arg], method)
+                else:  # pragma: no cover
+                    raise error(function, ip, f"Unknown opcode {op}.")
+
+    def undefined(self, slot: int) -> str:
+        return f"Undefined variable '{self.globals.names[slot]}'."
+
+    @staticmethod
+    def locals_of(function: Function, args: list) -> list:
+        """Local slots of a call of `function`, its arguments first."""
+        slots = args + [None] * (function.size - len(args))
+        for slot in function.cells:
+            slots[slot] = Cell(slots[slot])
+        return slots
+
+    @staticmethod
+    def frame(
+        callee: typing.Any, args: list, function: Function, ip: int
+    ) -> typing.Optional[typing.Tuple[Closure, list]]:
+        """
+        The closure to push a frame for and its locals, to call `callee`
+        with `args`, or None if `callee` is not made of Lox code.
+        """
+        kind = type(callee)
+        if kind is Closure:
+            closure = callee
+        elif kind is BoundMethod:
+            closure = callee.method
+        elif kind is LoxClass and type(callee.initializer) is Closure:
+            closure = callee.initializer
+        else:
+            return None
+
+        if len(args) != closure.function.arity:
+            raise error(
+                function,
+                ip,
+                f"Expected {closure.function.arity} arguments "
+                f"but got {len(args)}.",
+            )
+        if kind is BoundMethod:
+            return closure, [callee.receiver, *args]
+        if kind is LoxClass:
+            # the initializer returns `this`, the new instance
+            return closure, [LoxInstance(callee), *args]
+        return closure, args
+
+    def call(
+        self,
+        callee: typing.Any,
+        args: list,
+        function: Function,
+        ip: int,
+    ) -> typing.Any:
+        """Call a native function, or a class without an initializer."""
+        if not isinstance(callee, runtime.LoxCallable):
+            raise error(function, ip, "Can only call functions and classes.")
+
+        if len(args) != callee.arity():
+            raise error(
+                function,
+                ip,
+                f"Expected {callee.arity()} arguments but got {len(args)}.",
+            )
+
+        return callee.call(self, args)
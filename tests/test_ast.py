@@ -1,7 +1,11 @@
+import pickle
+
 from pylox.experimental.ast_printer import AstPrinter
 from pylox.experimental.rpn_ast_printer import RpnAstPrinter
 from pylox.scanner import Token, TokenType
 import pylox.expr as ast
+import pylox.stmt as stmt
+from pylox.node import node_count, walk
 
 
 # example from http://www.craftinginterpreters.com/representing-code.html#a-not-very-pretty-printer
@@ -46,3 +50,47 @@ def test_if_rpn_ast_printer_works_correct() -> None:
     result = RpnAstPrinter().print_expr(expression)
     # THEN
     assert result == "1 2 + 4 3 - *"
+
+
+def test_if_nodes_get_dense_ids_shared_by_expr_and_stmt() -> None:
+    # GIVEN
+    first = node_count()
+    # WHEN
+    literal = ast.Literal(1)
+    statement = stmt.Print(literal)
+    variable = ast.Variable(Token(TokenType.IDENTIFIER, "a", None, 1))
+    # THEN
+    assert [literal.node_id, statement.node_id, variable.node_id] == [
+        first,
+        first + 1,
+        first + 2,
+    ]
+    assert node_count() == first + 3
+    assert not hasattr(statement, "__dict__")
+    assert stmt.Print.fields() == ("expr",)
+
+
+def test_if_unpickled_nodes_get_fresh_ids() -> None:
+    # GIVEN
+    literal = ast.Literal(1)
+    tree = stmt.Block([stmt.Expression(literal), stmt.Print(literal)])
+    # WHEN
+    copy = pickle.loads(pickle.dumps(tree))
+    # THEN
+    assert copy.node_id != tree.node_id
+    assert copy.statements[0].expr is copy.statements[1].expr
+    assert copy.statements[0].expr.value == 1
+    ids = {tree.node_id, tree.statements[0].node_id, literal.node_id}
+    assert copy.statements[0].expr.node_id not in ids
+
+
+def test_if_walk_visits_parents_before_children_in_order() -> None:
+    # GIVEN
+    first, second = ast.Literal(1), ast.Literal(2)
+    tree = stmt.Print(
+        ast.Binary(first, Token(TokenType.PLUS, "+", None, 1), second)
+    )
+    # WHEN
+    nodes = list(walk([tree]))
+    # THEN
+    assert nodes == [tree, tree.expr, first, second]
@@ -0,0 +1,189 @@
+import io
+import sys
+from contextlib import redirect_stderr, redirect_stdout
+
+import pytest
+
+from pylox import bytecode
+from pylox.bytecode import Compiler, Function, disassemble
+from pylox.cli import Lox
+from pylox.interpreter import Interpreter
+from pylox.parser import Parser
+from pylox.resolver import Resolver
+from pylox.scanner import Scanner
+
+
+def compile_src(src: str) -> Function:
+    tokens = Scanner(src).scan_tokens()
+    statements = Parser(tokens).parse()
+    Resolver(Interpreter()).resolve(statements)
+    return Compiler().compile(statements)
+
+
+def opcodes(function: Function) -> list[str]:
+    return [line.split()[1] for line in disassemble(function)]
+
+
+def functions(function: Function) -> list[Function]:
+    return [c for c in function.constants if isinstance(c, Function)]
+
+
+def run(src: str, engine: str = "vm") -> str:
+    with io.StringIO() as buf, redirect_stdout(buf), redirect_stderr(buf):
+        Lox(engine=engine).run(src)
+        return buf.getvalue()
+
+
+def test_if_opcode_names_match_their_values() -> None:
+    for value, name in enumerate(bytecode.OPCODES):
+        assert getattr(bytecode, name) == value
+
+
+def test_if_block_locals_share_the_function_slots() -> None:
+    # GIVEN
+    src = "{ var a = 1; { var b = a; } { var c = 2; print c; } }"
+    # WHEN
+    script = compile_src(src)
+    # THEN
+    assert script.size == 2  # `b` and `c` reuse the same slot
+    assert disassemble(script)[:4] == [
+        "0000 CONSTANT 0 (1)",
+        "0002 DEFINE_LOCAL 0",
+        "0004 GET_LOCAL 0",
+        "0006 DEFINE_LOCAL 1",
+    ]
+
+
+def test_if_captured_local_is_stored_in_cell() -> None:
+    # GIVEN
+    src = "{ var a = 1; print a; fun f() { return a; } }"
+    # WHEN
+    script = compile_src(src)
+    # THEN
+    assert opcodes(script)[:3] == ["CONSTANT", "DEFINE_CELL", "GET_CELL"]
+    f = functions(script)[0]
+    assert f.upvalues == ((True, 0),)
+    assert opcodes(f)[0] == "GET_UPVALUE"
+
+
+def test_if_captured_parameter_is_wrapped_on_call() -> None:
+    # GIVEN
+    src = "fun f(a, b) { fun g() { return b; } return g; }"
+    # WHEN
+    f = functions(compile_src(src))[0]
+    # THEN
+    assert f.cells == (1,)
+
+
+def test_if_upvalues_are_passed_through_enclosing_functions() -> None:
+    # GIVEN
+    src = "fun f(a) { fun g() { fun h() { return a; } return h; } return g; }"
+    # WHEN
+    f = functions(compile_src(src))[0]
+    g = functions(f)[0]
+    h = functions(g)[0]
+    # THEN
+    assert g.upvalues == ((True, 0),)
+    assert h.upvalues == ((False, 0),)
+
+
+def test_if_methods_are_called_without_bound_method() -> None:
+    # GIVEN
+    src = "class A { m(x) { return x; } } print A().m(1);"
+    # WHEN
+    script = compile_src(src)
+    # THEN
+    assert "GET_METHOD" in opcodes(script)
+    assert "CALL_METHOD" in opcodes(script)
+    assert "GET_PROPERTY" not in opcodes(script)
+
+
+@pytest.mark.parametrize(
+    "src,expected",
+    [
+        # a redeclared variable is the same variable for closures too
+        (
+            "{ var a = 1; fun f() { return a; } var a = 2; print f(); }",
+            "2\n",
+        ),
+        # every iteration of a block declares new variables
+        (
+            "var f; var g;"
+            "for (var i = 0; i < 2; i = i + 1) {"
+            "  var j = i; fun h() { return j; }"
+            "  if (i == 0) f = h; else g = h;"
+            "}"
+            "print f(); print g();",
+            "0\n1\n",
+        ),
+        # a local function can call itself
+        (
+            "{ fun f(n) { if (n < 1) return 0; return n + f(n - 1); }"
+            " print f(3); }",
+            "6\n",
+        ),
+        # closures over `this` and `super`
+        (
+            "class A { m() { return 1; } }"
+            "class B < A { m() { fun f() { return super.m() + this.n; }"
+            " return f; } }"
+            "var b = B(); b.n = 2; print b.m()();",
+            "3\n",
+        ),
+        (
+            "class A { init() { fun f() { return this; } this.f = f; } }"
+            "var a = A(); print a.f() == a; print a.init() == a;",
+            "true\ntrue\n",
+        ),
+        # fields shadow methods and are called without a receiver
+        (
+            "class A { m() { return 1; } } var a = A();"
+            "fun two() { return 2; } a.m = two; print a.m();",
+            "2\n",
+        ),
+    ],
+)
+def test_if_vm_agrees_with_tree_walker(src: str, expected: str) -> None:
+    # WHEN
+    output = run(src)
+    # THEN
+    assert output == expected
+    assert output == run(src, engine="tree")
+
+
+def test_if_runtime_error_is_reported_with_line() -> None:
+    # GIVEN
+    src = 'var a = 1;\nprint a -\n "b";'
+    # WHEN
+    output = run(src)
+    # THEN
+    assert output == "line 2: Operands must be a numbers.\n"
+
+
+def test_if_object_is_checked_before_field_value_is_evaluated() -> None:
+    # GIVEN
+    src = 'fun f() { print "evaluated"; } var o; o.x = f();'
+    # WHEN
+    output = run(src)
+    # THEN
+    assert output == "line 1: Only instances have fields.\n"
+
+
+def test_if_deep_recursion_runs_on_the_vm_frame_stack() -> None:
+    # GIVEN
+    depth = sys.getrecursionlimit() * 5
+    src = f"""
+fun count(n) {{ if (n == 0) return 0; return 1 + count(n - 1); }}
+class Node {{
+  init(n) {{ if (n > 0) this.next = Node(n - 1); this.n = n; }}
+  depth() {{ if (this.n == 0) return 0; return 1 + this.next.depth(); }}
+}}
+var node = Node({depth});
+var depth = node.depth;
+print count({depth});
+print depth();
+"""
+    # WHEN
+    output = run(src)
+    # THEN
+    assert output == f"{depth}\n{depth}\n"
@@ -0,0 +1,112 @@
+import io
+from contextlib import redirect_stderr, redirect_stdout
+from pathlib import Path
+from unittest import mock
+
+import pytest
+
+from pylox import cache
+from pylox.cli import Lox
+
+SRC = """var a = "global";
+{
+  fun show() { print a; }
+  show();
+  var a = "local";
+  show();
+}
+"""
+
+
+def run_file(path: Path, use_cache: bool = True) -> str:
+    with io.StringIO() as buf, redirect_stdout(buf), redirect_stderr(buf):
+        try:
+            Lox(use_cache=use_cache).run_file(path)
+        except SystemExit:
+            pass
+        return buf.getvalue()
+
+
+@pytest.fixture
+def script(tmp_path: Path) -> Path:
+    path = tmp_path / "script.lox"
+    path.write_text(SRC)
+    return path
+
+
+def test_if_cache_is_written_on_first_run(script: Path) -> None:
+    # WHEN
+    output = run_file(script)
+    # THEN
+    assert output == "global\nglobal\n"
+    assert cache.cache_path(script).exists()
+    assert [p.name for p in cache.cache_path(script).parent.iterdir()] == [
+        cache.cache_path(script).name
+    ]
+
+
+def test_if_cached_program_skips_front_end(script: Path) -> None:
+    # GIVEN
+    run_file(script)
+    # WHEN
+    with mock.patch.object(Lox, "compile") as compile_mock:
+        output = run_file(script)
+    # THEN
+    compile_mock.assert_not_called()
+    assert output == "global\nglobal\n"  # scope distances survive the cache
+
+
+def test_if_changed_source_invalidates_cache(script: Path) -> None:
+    # GIVEN
+    run_file(script)
+    script.write_text(SRC.replace('"local"', '"changed"') + "print a;")
+    # WHEN
+    output = run_file(script)
+    # THEN
+    assert output == "global\nglobal\nglobal\n"
+    assert cache.load(script, script.read_text()) is not None
+
+
+def test_if_corrupt_cache_is_ignored(script: Path) -> None:
+    # GIVEN
+    run_file(script)
+    cache.cache_path(script).write_bytes(b"garbage")
+    # WHEN
+    output = run_file(script)
+    # THEN
+    assert output == "global\nglobal\n"
+    assert cache.load(script, SRC) is not None
+
+
+def test_if_program_with_errors_is_not_cached(tmp_path: Path) -> None:
+    # GIVEN
+    path = tmp_path / "broken.lox"
+    path.write_text("print 1 +;")
+    # WHEN
+    output = run_file(path)
+    # THEN
+    assert "Expect expression" in output
+    assert not cache.cache_path(path).exists()
+
+
+def test_if_cache_can_be_disabled(script: Path) -> None:
+    # WHEN
+    output = run_file(script, use_cache=False)
+    # THEN
+    assert output == "global\nglobal\n"
+    assert not cache.cache_path(script).parent.exists()
+
+
+def test_if_cache_keeps_global_slots_of_its_interpreter(script: Path) -> None:
+    # GIVEN
+    run_file(script)
+    lox = Lox(use_cache=True)
+    with io.StringIO() as buf, redirect_stdout(buf):
+        lox.run('var other = "first";')
+    # WHEN
+    statements = cache.load(script, SRC, globals=lox.interpreter.globals)
+    fresh = Lox().interpreter.globals
+    # THEN
+    assert statements is None  # `other` took the slot of `a`
+    assert cache.load(script, SRC, globals=fresh) is not None
+    assert fresh.slots["a"] == len(fresh.names) - 1
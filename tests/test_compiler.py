@@ -0,0 +1,99 @@
+import io
+from contextlib import redirect_stderr, redirect_stdout
+from unittest import mock
+
+import pytest
+
+from pylox.cli import Lox
+from pylox.compiler import ClosureInterpreter, CompiledFunction, Compiler
+from pylox.parser import Parser
+from pylox.resolver import Resolver
+from pylox.scanner import Scanner
+
+
+def run(src: str) -> str:
+    with io.StringIO() as buf, redirect_stdout(buf), redirect_stderr(buf):
+        Lox(engine="closure").run(src)
+        return buf.getvalue()
+
+
+def test_if_closure_engine_is_selected() -> None:
+    # WHEN
+    lox = Lox(engine="closure")
+    # THEN
+    assert isinstance(lox.interpreter, ClosureInterpreter)
+
+
+def test_if_functions_are_compiled_once() -> None:
+    # GIVEN
+    lox = Lox(engine="closure")
+    src = "fun f(n) { return n * 2; } var g = f;"
+    # WHEN
+    with io.StringIO() as buf, redirect_stdout(buf):
+        lox.run(src)
+    function = lox.interpreter.globals.value("g")
+    # THEN
+    assert isinstance(function, CompiledFunction)
+    assert function.call(lox.interpreter, [21]) == 42
+
+
+def test_if_bound_initializer_returns_instance() -> None:
+    # GIVEN
+    src = """
+class A { init(x) { this.x = x; return; } }
+var a = A(1);
+print a.init(2).x;
+"""
+    # WHEN
+    output = run(src)
+    # THEN
+    assert output == "2\n"
+
+
+def test_if_runtime_error_is_reported_with_line() -> None:
+    # GIVEN
+    src = 'var a = 1;\nprint a - "b";'
+    # WHEN
+    output = run(src)
+    # THEN
+    assert output == "line 2: Operands must be a numbers.\n"
+
+
+@mock.patch(
+    "builtins.input",
+    side_effect=["var s = 1;", "{ var t = s + 1; print t; }", "s * 3", "exit"],
+)
+def test_if_closure_engine_works_in_repl_mode(ignored) -> None:
+    with io.StringIO() as buf, redirect_stdout(buf), redirect_stderr(buf):
+        # WHEN
+        Lox(engine="closure").run_prompt()
+        output = buf.getvalue()
+        actual = [
+            line.replace(">", "").strip() for line in output.split("\n")[:-1]
+        ]
+
+    # THEN
+    assert actual == ["2", "3"]
+
+
+def test_if_only_statements_with_break_or_return_jump() -> None:
+    # GIVEN
+    src = """
+while (true) { if (true) break; }
+{ print 1; fun f() { return 1; } }
+"""
+    statements = Parser(Scanner(src).scan_tokens()).parse()
+    # WHEN
+    jumps = [Compiler.jumps(statement) for statement in statements]
+    # THEN
+    assert jumps == [True, False]
+
+
+def test_if_break_escaping_a_function_is_not_a_return() -> None:
+    # GIVEN
+    lox = Lox(engine="closure")
+    src = "while (true) { fun f() { break; } f(); print 1; break; }"
+    # WHEN
+    with mock.patch.object(Resolver, "visit_break_stmt"):
+        with pytest.raises(RuntimeError, match="'break' escaped <fn f>."):
+            lox.run(src)
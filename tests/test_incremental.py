@@ -0,0 +1,172 @@
+import random
+import typing
+
+import pytest
+
+from pylox.environment import Globals
+from pylox.error import LoxSyntaxError
+from pylox.expr import Call
+from pylox.incremental import IncrementalFrontEnd
+from pylox.interpreter import Interpreter
+from pylox.node import Node
+from pylox.stmt import If, Print
+from pylox.tokens import Token
+
+PROGRAM = """var a = 1;
+fun f(x) {
+  return x + a;
+}
+/* header */
+class A {
+  m() { return "m"; }
+}
+if (a > 0) print f(2);
+// end */
+print A().m();
+"""
+
+
+def dump(node: typing.Any, globals: Globals) -> typing.Any:
+    if isinstance(node, Token):
+        return node.token_type, node.lexeme, node.line
+    if isinstance(node, list):
+        return [dump(item, globals) for item in node]
+    if isinstance(node, Node):
+        fields = {k: dump(getattr(node, k), globals) for k in node.fields()}
+        if fields.get("depth", 0) is None:
+            # global slots depend on the names the interpreter has seen
+            fields["slot"] = globals.names[fields["slot"]]
+        return type(node).__name__, fields
+    return node
+
+
+def state(front_end: IncrementalFrontEnd) -> typing.List[typing.Any]:
+    return [
+        (
+            dump(d.stmt, front_end.interpreter.globals),
+            d.first,
+            d.end,
+            None if d.error is None else (d.error.line, d.error.message),
+        )
+        for d in front_end.declarations
+    ]
+
+
+def front_end(src: str) -> IncrementalFrontEnd:
+    return IncrementalFrontEnd(src, Interpreter(), lambda err: None)
+
+
+def edited(src: str, old: str, new: str) -> typing.Tuple[int, int, str]:
+    start = src.index(old)
+    return start, start + len(old), new
+
+
+@pytest.mark.parametrize(
+    "old,new",
+    [
+        ("x + a", "x * a"),
+        ("var a = 1;", "var a = 1;\nvar b = 2;\n"),
+        ("/* header */", "/* header"),
+        ("// end", "end"),
+        ("/* header */", "// header"),
+        ("print f(2);", "print f(2); else print 0;"),
+        ('"m"', '"m\n"'),
+        ("}\n/*", "/*"),
+        ("if (a > 0)", ""),
+    ],
+)
+def test_if_edit_produces_same_program_as_rebuild(old: str, new: str) -> None:
+    # GIVEN
+    incremental = front_end(PROGRAM)
+    start, end, text = edited(PROGRAM, old, new)
+    # WHEN
+    incremental.edit(start, end, text)
+    # THEN
+    assert incremental.src == PROGRAM[:start] + text + PROGRAM[end:]
+    assert state(incremental) == state(front_end(incremental.src))
+
+
+def test_if_edit_reuses_untouched_statements() -> None:
+    # GIVEN
+    incremental = front_end(PROGRAM)
+    before = incremental.statements
+    # WHEN
+    parsed = incremental.edit(*edited(PROGRAM, "x + a", "x - a"))
+    # THEN
+    after = incremental.statements
+    assert len(parsed) == 2  # the damaged function and the one in front
+    assert after[0] is parsed[0] and after[1] is parsed[1]
+    assert all(a is b for a, b in zip(after[2:], before[2:]))
+
+
+def test_if_edit_shifts_lines_of_reused_statements() -> None:
+    # GIVEN
+    incremental = front_end(PROGRAM)
+    last = incremental.statements[-1]
+    assert isinstance(last, Print) and isinstance(last.expr, Call)
+    line = last.expr.paren.line
+    # WHEN
+    incremental.edit(0, 0, "\n\n")
+    # THEN
+    assert incremental.statements[-1] is last
+    assert last.expr.paren.line == line + 2
+    assert state(incremental) == state(front_end(incremental.src))
+
+
+def test_if_edit_reparses_statement_in_front_of_new_else() -> None:
+    # GIVEN
+    incremental = front_end(PROGRAM)
+    # WHEN
+    incremental.edit(*edited(PROGRAM, "print A().m();", "else print 0;"))
+    # THEN
+    conditional = incremental.statements[-1]
+    assert isinstance(conditional, If)
+    assert conditional.else_branch is not None
+    assert not incremental.errors
+
+
+def test_if_opened_block_comment_swallows_following_statements() -> None:
+    # GIVEN
+    incremental = front_end(PROGRAM)
+    # WHEN
+    incremental.edit(*edited(PROGRAM, "/* header */", "/* header"))
+    # THEN
+    assert len(incremental.statements) == 3
+    assert state(incremental) == state(front_end(incremental.src))
+
+
+def test_if_lexical_error_recovers_on_next_edit() -> None:
+    # GIVEN
+    incremental = front_end(PROGRAM)
+    start, end, text = edited(PROGRAM, "x + a", "x @ a")
+    # WHEN
+    with pytest.raises(LoxSyntaxError):
+        incremental.edit(start, end, text)
+    incremental.edit(start, end, "x + a")
+    # THEN
+    assert incremental.src == PROGRAM
+    assert state(incremental) == state(front_end(PROGRAM))
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_if_random_edits_keep_program_equal_to_rebuild(seed: int) -> None:
+    # GIVEN
+    rnd = random.Random(seed)
+    snippets = ["", "x", "\n", ";", "}", "{", "else ", "/*", "*/", '"', "//"]
+    incremental = front_end(PROGRAM)
+    for _ in range(100):
+        start = rnd.randrange(len(incremental.src) + 1)
+        end = min(len(incremental.src), start + rnd.choice([0, 1, 3]))
+        text = rnd.choice(snippets)
+        src = incremental.src[:start] + text + incremental.src[end:]
+        # WHEN
+        try:
+            reference = front_end(src)
+        except LoxSyntaxError:
+            with pytest.raises(LoxSyntaxError):
+                incremental.edit(start, end, text)
+            incremental.rebuild(PROGRAM)
+            continue
+        incremental.edit(start, end, text)
+        # THEN
+        assert state(incremental) == state(reference)
@@ -7,6 +7,7 @@ from unittest import mock
 import pytest
 
 from pylox.cli import Lox
+from pylox.interpreter import Interpreter
 
 EXPECTED_TO_FAIL = []
 
@@ -41,10 +42,18 @@ def parse_test_file(filename: Path) -> list[str]:
         ]
 
 
-def run_file(filename: Path) -> list[str]:
+def run_file(
+    filename: Path,
+    stream: bool = False,
+    scanner: str = "classic",
+    parser: str = "classic",
+    engine: str = "tree",
+    optimize: bool = False,
+) -> list[str]:
     with io.StringIO() as buf, redirect_stdout(buf), redirect_stderr(buf):
         try:
-            Lox().run_file(filename)
+            lox = Lox(scanner, parser, engine=engine, optimize=optimize)
+            lox.run_file(filename, stream)
         except SystemExit:
             pass
         finally:
@@ -52,8 +61,49 @@ def run_file(filename: Path) -> list[str]:
             return output.split("\n")[:-1]  # remove last '' element
 
 
+@pytest.mark.parametrize(
+    "scanner,parser,engine",
+    [
+        ("classic", "classic", "tree"),
+        ("compact", "classic", "tree"),
+        ("classic", "pratt", "tree"),
+        ("classic", "classic", "closure"),
+        ("classic", "classic", "vm"),
+        ("classic", "classic", "python"),
+    ],
+)
+@pytest.mark.parametrize("file", prepare_list_of_test_files())
+def test_if_interpreter_works_as_expected(
+    file: str, scanner: str, parser: str, engine: str
+) -> None:
+    # GIVEN
+    filename = Path(file).absolute()
+    expected = parse_test_file(filename)
+    # WHEN
+    actual = run_file(filename, scanner=scanner, parser=parser, engine=engine)
+    # THEN
+    assert actual == expected
+
+
+@pytest.mark.parametrize("engine", ["tree", "closure", "vm", "python"])
 @pytest.mark.parametrize("file", prepare_list_of_test_files())
-def test_if_interpreter_works_as_expected(file: str) -> None:
+def test_if_optimized_program_works_as_expected(
+    file: str, engine: str
+) -> None:
+    # GIVEN
+    filename = Path(file).absolute()
+    expected = parse_test_file(filename)
+    # WHEN
+    actual = run_file(filename, engine=engine, optimize=True)
+    # THEN
+    assert actual == expected
+
+
+@mock.patch.object(Interpreter, "MAX_HOST_DEPTH", 0)
+@pytest.mark.parametrize("file", prepare_list_of_test_files())
+def test_if_program_works_as_expected_with_calls_on_heap_stack(
+    file: str,
+) -> None:
     # GIVEN
     filename = Path(file).absolute()
     expected = parse_test_file(filename)
@@ -63,6 +113,29 @@ def test_if_interpreter_works_as_expected(file: str) -> None:
     assert actual == expected
 
 
+@pytest.mark.parametrize("engine", ["tree", "closure", "vm", "python"])
+@pytest.mark.parametrize(
+    "file",
+    [
+        "custom/classes.lox",
+        "closure/nested_closure.lox",
+        "while/syntax.lox",
+        "super/super_in_inherited_method.lox",
+        "super/super_in_closure_in_inherited_method.lox",
+    ],
+)
+def test_if_interpreter_works_as_expected_in_stream_mode(
+    file: str, engine: str
+) -> None:
+    # GIVEN
+    filename = Path(file).absolute()
+    expected = parse_test_file(filename)
+    # WHEN
+    actual = run_file(filename, stream=True, engine=engine)
+    # THEN
+    assert actual == expected
+
+
 @mock.patch(
     "builtins.input",
     side_effect=[
@@ -112,3 +185,54 @@ def test_if_builtin_functions_work_as_expected_with_args(mock_input) -> None:
     mock_input.assert_called_once()
     assert len(actual) == 1
     assert actual[0] == "4"
+
+
+@pytest.mark.parametrize("engine", ["tree", "closure"])
+def test_if_closure_keeps_only_captured_locals_alive(engine: str) -> None:
+    # GIVEN
+    src = """
+class Big {}
+fun make() {
+  var big = Big();
+  var count = 1;
+  fun get() { return count; }
+  return get;
+}
+var get = make();
+print get();
+"""
+    lox = Lox(engine=engine)
+    # WHEN
+    with io.StringIO() as buf, redirect_stdout(buf):
+        lox.run(src)
+        output = buf.getvalue()
+    # THEN
+    assert output == "1\n"
+    frame = lox.interpreter.globals.value("get").closure
+    assert frame.values == [None, 1, None]  # big, count, get
+
+
+@pytest.mark.parametrize("engine", ["tree", "closure", "vm"])
+def test_if_globals_defined_on_later_lines_bind_late(engine: str) -> None:
+    # GIVEN
+    lines = [
+        "fun show() { print later; }",
+        "show();",
+        'var later = "defined";',
+        "show();",
+        "exit",
+    ]
+    lox = Lox(engine=engine)
+    # WHEN
+    with mock.patch("builtins.input", side_effect=lines), io.StringIO() as buf:
+        with redirect_stdout(buf), redirect_stderr(buf):
+            lox.run_prompt()
+        output = buf.getvalue()
+    # THEN
+    actual = [line.replace(">", "").strip() for line in output.split("\n")]
+    assert actual[:-1] == [
+        "line 1: Undefined variable 'later'.",
+        "defined",
+    ]
+    globals = lox.interpreter.globals
+    assert globals.names[globals.slots["later"]] == "later"
@@ -0,0 +1,268 @@
+import io
+from contextlib import redirect_stderr, redirect_stdout
+from unittest import mock
+
+import pytest
+from typer.testing import CliRunner
+
+import pylox.expr as expr_ast
+import pylox.stmt as stmt_ast
+from pylox.cli import Lox, pylox_cli
+from pylox.interpreter import Interpreter
+from pylox.node import walk
+from pylox.optimizer import Optimizer
+from pylox.parser import Parser
+from pylox.resolver import Resolver
+from pylox.scanner import Scanner
+from pylox.stmt import Stmt
+
+
+def optimize(src: str, optimizer: Optimizer | None = None) -> list[Stmt]:
+    tokens = Scanner(src).scan_tokens()
+    statements = Parser(tokens).parse()
+    Resolver(Interpreter()).resolve(statements)
+    return (optimizer or Optimizer()).optimize(statements)
+
+
+def printed(src: str) -> expr_ast.Expr:
+    statement = optimize(src)[-1]
+    assert isinstance(statement, stmt_ast.Print)
+    return statement.expr
+
+
+def run(src: str) -> str:
+    with io.StringIO() as buf, redirect_stdout(buf), redirect_stderr(buf):
+        Lox(optimize=True).run(src)
+        return buf.getvalue()
+
+
+@pytest.mark.parametrize(
+    "src,expected",
+    [
+        ("print 1 + 2 * 3;", 7.0),
+        ("print (1 + 2) * 3;", 9.0),
+        ('print "a" + "b";', "ab"),
+        ('print "a" + 1;', "a1"),
+        ("print -(2 - 3);", 1.0),
+        ("print !nil;", True),
+        ("print 1 == 1 and 2 < 1;", False),
+        ("print nil or 3;", 3),
+    ],
+)
+def test_if_constant_expressions_are_folded(src: str, expected) -> None:
+    # WHEN
+    expr = printed(src)
+    # THEN
+    assert isinstance(expr, expr_ast.Literal)
+    assert expr.value == expected
+    assert type(expr.value) is type(expected)
+
+
+@pytest.mark.parametrize(
+    "src", ["print 1 / 0;", 'print "a" - 1;', "print -nil;", "print 1 + nil;"]
+)
+def test_if_failing_operations_are_not_folded(src: str) -> None:
+    # WHEN
+    expr = printed(src)
+    # THEN
+    assert not isinstance(expr, expr_ast.Literal)
+
+
+def test_if_logical_operator_keeps_non_constant_operand() -> None:
+    # WHEN
+    expr = printed("var a; print true and a;")
+    # THEN
+    assert isinstance(expr, expr_ast.Variable)
+
+
+def test_if_dead_branches_are_removed() -> None:
+    # GIVEN
+    src = """
+if (false) print 1; else print 2;
+if (nil) print 3;
+while (false) print 4;
+if (1 < 2) { print 5; }
+"""
+    # WHEN
+    statements = optimize(src)
+    # THEN
+    assert [type(s) for s in statements] == [stmt_ast.Print, stmt_ast.Block]
+    assert statements[0].expr.value == 2
+
+
+def test_if_code_after_return_and_break_is_removed() -> None:
+    # GIVEN
+    src = """
+fun f(a) {
+  while (a) { break; print 1; }
+  if (a) return 1; else { return 2; }
+  print 3;
+}
+"""
+    # WHEN
+    function = optimize(src)[0]
+    # THEN
+    assert isinstance(function, stmt_ast.Function)
+    assert len(function.body) == 2
+    loop = function.body[0]
+    assert isinstance(loop, stmt_ast.While)
+    assert isinstance(loop.body, stmt_ast.Block)
+    assert len(loop.body.statements) == 1
+
+
+def test_if_statistics_are_counted_per_pass() -> None:
+    # GIVEN
+    optimizer = Optimizer()
+    src = "fun f() { return 1 + 2 + 3; print 1; } if (true) print 1;"
+    # WHEN
+    optimize(src, optimizer)
+    # THEN
+    assert optimizer.stats == {
+        "constant folding": 2,
+        "dead branch elimination": 1,
+        "unreachable code elimination": 1,
+        "devirtualization": 0,
+    }
+
+
+def test_if_runtime_error_keeps_its_line() -> None:
+    # GIVEN
+    src = "var a = 1 + 2;\nprint a /\n (2 - 2);"
+    # WHEN
+    output = run(src)
+    # THEN
+    assert output == "line 2: Division by zero!\n"
+
+
+def test_if_optimized_program_is_cached_separately(tmp_path) -> None:
+    # GIVEN
+    script = tmp_path / "script.lox"
+    script.write_text("if (false) print 1; else print 2;")
+    # WHEN
+    with io.StringIO() as buf, redirect_stdout(buf):
+        Lox(use_cache=True, optimize=True).run_file(script)
+        Lox(use_cache=True).run_file(script)
+        output = buf.getvalue()
+    # THEN
+    assert output == "2\n2\n"
+    assert len(list((tmp_path / "__loxcache__").iterdir())) == 2
+
+
+def test_if_calls_to_constant_globals_are_devirtualized() -> None:
+    # GIVEN
+    optimizer = Optimizer()
+    src = """
+fun f(a) { return f(a); }
+class A { init(x, y) {} }
+class B {}
+class C < A {}
+var v = f;
+print f(1) + A(1, 2) + B() + C(1, 2) + v(1) + f();
+"""
+    # WHEN
+    statements = optimize(src, optimizer)
+    # THEN
+    assert [(name.lexeme, name.line) for name in optimizer.devirtualized] == [
+        ("f", 2),
+        ("f", 7),
+        ("A", 7),
+        ("B", 7),
+    ]
+    calls = [node for node in walk(statements) if type(node) is expr_ast.Call]
+    assert [call.target is not None for call in calls] == [
+        True,  # f(a)
+        True,  # f(1)
+        True,  # A(1, 2)
+        True,  # B()
+        False,  # C(1, 2): the initializer depends on what A holds
+        False,  # v(1)
+        False,  # f(): the wrong number of arguments
+    ]
+    assert calls[2].target.arity == 2
+
+
+@pytest.mark.parametrize(
+    "src",
+    [
+        "fun f() {} f = nil; f();",
+        "fun f() {} fun g() { f = nil; } f();",
+        "fun f() {} fun f() {} f();",
+        "var f; fun f() {} f();",
+        "{ fun f() {} f(); }",
+    ],
+)
+def test_if_globals_that_can_change_are_not_devirtualized(src: str) -> None:
+    # GIVEN
+    optimizer = Optimizer()
+    # WHEN
+    optimize(src, optimizer)
+    # THEN
+    assert optimizer.devirtualized == []
+
+
+@pytest.mark.parametrize("engine", ["tree", "closure"])
+def test_if_direct_call_checks_reassigned_global(engine: str) -> None:
+    # GIVEN
+    lines = [
+        "fun f() { return 1; } fun g() { return f(); } print g();",
+        "f = nil;",
+        "print g();",
+        "exit",
+    ]
+    lox = Lox(engine=engine, optimize=True)
+    # WHEN
+    with mock.patch("builtins.input", side_effect=lines), io.StringIO() as buf:
+        with redirect_stdout(buf), redirect_stderr(buf):
+            lox.run_prompt()
+        output = buf.getvalue()
+    # THEN
+    assert lox.optimizer is not None
+    # the calls of the first line, `g` is not declared by the third one
+    assert len(lox.optimizer.devirtualized) == 2
+    actual = [line.replace(">", "").strip() for line in output.split("\n")]
+    assert actual[:-1] == ["1", "line 1: Can only call functions and classes."]
+
+
+def test_if_stats_option_reports_changes_per_pass(tmp_path) -> None:
+    # GIVEN
+    script = tmp_path / "script.lox"
+    script.write_text("print 1 + 2;\nif (false) print 3;")
+    args = [str(script), "--no-cache", "-O", "--stats"]
+    # WHEN
+    result = CliRunner().invoke(pylox_cli, args)
+    # THEN
+    assert result.exit_code == 0
+    assert result.stdout == "3\n"
+    assert result.stderr.splitlines() == [
+        "constant folding: 1 changes",
+        "dead branch elimination: 1 changes",
+        "unreachable code elimination: 0 changes",
+        "devirtualization: 0 changes",
+    ]
+
+
+def test_if_stats_option_reports_devirtualized_calls(tmp_path) -> None:
+    # GIVEN
+    script = tmp_path / "script.lox"
+    script.write_text("fun f(a) { return a; }\nclass A {}\nprint f(A());")
+    args = [str(script), "--no-cache", "-O", "--stats"]
+    # WHEN
+    result = CliRunner().invoke(pylox_cli, args)
+    # THEN
+    assert result.exit_code == 0
+    assert result.stderr.splitlines()[-3:] == [
+        "devirtualization: 2 changes",
+        "line 3: direct call of 'A'",  # arguments come first
+        "line 3: direct call of 'f'",
+    ]
+
+
+def test_if_stats_are_not_reported_by_default(tmp_path) -> None:
+    # GIVEN
+    script = tmp_path / "script.lox"
+    script.write_text("print 1 + 2;")
+    # WHEN
+    result = CliRunner().invoke(pylox_cli, [str(script), "--no-cache", "-O"])
+    # THEN
+    assert result.exit_code == 0
+    assert result.stderr == ""
@@ -1,62 +1,74 @@
+import typing
+from pathlib import Path
+
 import pytest
 
-from pylox.error import LoxParseError
+from pylox.error import LoxParseError, LoxSyntaxError
 from pylox.experimental.ast_printer import AstPrinter
-from pylox.parser import Parser
-from pylox.scanner import Scanner
+from pylox.node import Node
+from pylox.parser import Parser, PrattParser, TokenStream
+from pylox.scanner import Scanner, iter_tokens
+from pylox.tokens import Token
+
+TEST_DATA = sorted((Path(__file__).parent / "data").rglob("*.lox"))
 
 
-def test_if_parser_produces_valid_ast() -> None:
+@pytest.mark.parametrize("parser", [Parser, PrattParser])
+def test_if_parser_produces_valid_ast(parser: type[Parser]) -> None:
     # GIVEN
     src = "-123 * (45.67)"
     # WHEN
     tokens = Scanner(src).scan_tokens()
-    ast = Parser(tokens).expression()
+    ast = parser(tokens).expression()
     result = AstPrinter().print_expr(ast)
     # THEN
     assert result == "(* (- 123) (group 45.67))"
 
 
-def test_if_parser_handles_unclosed_paren() -> None:
+@pytest.mark.parametrize("parser", [Parser, PrattParser])
+def test_if_parser_handles_unclosed_paren(parser: type[Parser]) -> None:
     # GIVEN
     src = "-123 * (45.67"
     # WHEN
     tokens = Scanner(src).scan_tokens()
     with pytest.raises(LoxParseError) as err:
-        Parser(tokens).expression()
+        parser(tokens).expression()
     # THEN
     assert "Expect ')' after expression." in err.value.message
 
 
-def test_if_parser_handles_empty_right_hand_operand_inside_binary_expression() -> (
-    None
-):
+@pytest.mark.parametrize("parser", [Parser, PrattParser])
+def test_if_parser_handles_empty_right_hand_operand_inside_binary_expression(
+    parser: type[Parser],
+) -> None:
     # GIVEN
     src = "123 * "
     # WHEN
     tokens = Scanner(src).scan_tokens()
     with pytest.raises(LoxParseError) as err:
-        Parser(tokens).expression()
+        parser(tokens).expression()
     # THEN
     assert "Expect expression" in err.value.message
 
 
-def test_if_parser_handles_empty_left_hand_operand_inside_binary_expression() -> (
-    None
-):
+@pytest.mark.parametrize("parser", [Parser, PrattParser])
+def test_if_parser_handles_empty_left_hand_operand_inside_binary_expression(
+    parser: type[Parser],
+) -> None:
     # GIVEN
     src = "* 123"
     # WHEN
     tokens = Scanner(src).scan_tokens()
     with pytest.raises(LoxParseError) as err:
-        Parser(tokens).expression()
+        parser(tokens).expression()
     # THEN
     assert "Missing left-hand operand." in err.value.message
 
 
-def test_if_parser_parse_and_discard_right_hand_operand_in_case_of_empty_left_hand_operant() -> (
-    None
-):
+@pytest.mark.parametrize("parser", [Parser, PrattParser])
+def test_if_parser_parse_and_discard_right_hand_operand_in_case_of_empty_left_hand_operant(
+    parser: type[Parser],
+) -> None:
     # GIVEN
     src = "* (123"
 
@@ -78,8 +90,91 @@ def test_if_parser_parse_and_discard_right_hand_operand_in_case_of_empty_left_ha
     # WHEN
     tokens = Scanner(src).scan_tokens()
     with pytest.raises(LoxParseError) as err:
-        Parser(tokens, handler).expression()
+        parser(tokens, handler).expression()
 
     # THEN
     assert "Expect ')' after expression." in err.value.message
     assert cnt == 2  # both errors have been handled
+
+
+def test_if_parser_pulls_tokens_on_demand() -> None:
+    # GIVEN
+    src = "var a = 1;\n" * 1000
+    pulled = 0
+
+    def counting_tokens():
+        nonlocal pulled
+        for token in iter_tokens(src):
+            pulled += 1
+            yield token
+
+    # WHEN
+    parser = Parser(counting_tokens())
+    first = next(parser.iter_parse())
+    # THEN
+    assert first.name.lexeme == "a"
+    assert pulled == 5  # nothing past the first declaration
+    assert isinstance(parser.tokens, TokenStream)
+    assert len(parser.tokens.window) <= 2
+
+    # WHEN
+    rest = list(parser.iter_parse())
+    # THEN
+    assert len(rest) == 999
+    assert len(parser.tokens.window) <= 2
+
+
+def dump(node: typing.Any) -> typing.Any:
+    if isinstance(node, Token):
+        return node.token_type, node.lexeme, node.line
+    if isinstance(node, list):
+        return [dump(item) for item in node]
+    if isinstance(node, Node):
+        return type(node).__name__, {
+            k: dump(getattr(node, k)) for k in node.fields()
+        }
+    return node
+
+
+def parse_summary(src: str, parser: type[Parser]) -> typing.Any:
+    errors: typing.List[typing.Tuple[int, str]] = []
+    tokens = Scanner(src).scan_tokens()
+    ast = parser(tokens, lambda e: errors.append((e.line, e.message))).parse()
+    return dump(ast), errors
+
+
+@pytest.mark.parametrize(
+    "src",
+    [
+        "a = b = c or d and !e == f < -g - h / i(j, k).l.m;",
+        "a.b = 1 + 2 * 3 - 4 / 5 > 6 != 7 <= 8;",
+        "print (a + b) * c; print -!-x;",
+        "1 + 2 = 3; a.b() = c; -a = b; x or y = z;",
+        "== 1 + 2; print >= 3 * 4; + 5 == 6; / 7 + 8; print * (9;",
+        "super.a(this.b); print a == != b;",
+        "print 1 +; print (1; print a.; var x = ;",
+    ],
+)
+def test_if_pratt_parser_matches_classic_parser(src: str) -> None:
+    # WHEN
+    expected = parse_summary(src, Parser)
+    actual = parse_summary(src, PrattParser)
+    # THEN
+    assert actual == expected
+
+
+@pytest.mark.parametrize("path", TEST_DATA, ids=str)
+def test_if_pratt_parser_matches_classic_parser_on_test_data(
+    path: Path,
+) -> None:
+    # GIVEN
+    src = path.read_text()
+    try:
+        Scanner(src).scan_tokens()
+    except LoxSyntaxError:
+        pytest.skip("lexical error")
+    # WHEN
+    expected = parse_summary(src, Parser)
+    actual = parse_summary(src, PrattParser)
+    # THEN
+    assert actual == expected
@@ -0,0 +1,88 @@
+import io
+from contextlib import redirect_stdout
+
+import pylox.expr as expr_ast
+from pylox.cli import Lox
+from pylox.node import walk
+from pylox.quickening import NumberBinary, NumberNegate, StringConcat
+
+
+def run(src: str) -> Lox:
+    lox = Lox()
+    with io.StringIO() as buf, redirect_stdout(buf):
+        lox.run(src)
+    return lox
+
+
+def test_if_hot_operators_are_specialized() -> None:
+    # GIVEN
+    src = """
+var s = "";
+var i = 0;
+while (i < 10) { s = s + "a"; -i; i = i + 1; }
+print s;
+"""
+    # WHEN
+    lox = run(src)
+    quickening = lox.interpreter.quickening
+    # THEN
+    assert quickening.specialized == {
+        "number arithmetic": 2,  # `i < 10` and `i + 1`
+        "string concatenation": 1,
+        "number negation": 1,
+    }
+    assert not quickening.deoptimized
+
+
+def test_if_failed_guard_deoptimizes_node() -> None:
+    # GIVEN
+    lox = Lox()
+    src = """
+fun add(a, b) { return a + b; }
+for (var i = 0; i < 10; i = i + 1) add(i, i);
+print add("a", "b");
+"""
+    # WHEN
+    with io.StringIO() as buf, redirect_stdout(buf):
+        lox.run(src)
+        output = buf.getvalue()
+    # THEN
+    assert output == "ab\n"
+    assert lox.interpreter.quickening.deoptimized == {"number arithmetic": 1}
+
+
+def test_if_node_stays_generic_after_repeated_deoptimization() -> None:
+    # GIVEN
+    src = """
+fun add(a, b) { return a + b; }
+for (var round = 0; round < 5; round = round + 1) {
+  for (var i = 0; i < 10; i = i + 1) add(i, i);
+  add("a", 1);
+}
+"""
+    # WHEN
+    lox = run(src)
+    function = lox.interpreter.globals.value("add")
+    plus = function.declaration.body[0].value
+    # THEN
+    assert type(plus) is expr_ast.Binary
+    assert plus.feedback is False
+    assert lox.interpreter.quickening.deoptimized == {"number arithmetic": 2}
+
+
+def test_if_specialized_nodes_keep_their_children() -> None:
+    # GIVEN
+    lox = run('fun f(n, s) { var a = -n * 2 < n + 1; return s + "b"; }')
+    function = lox.interpreter.globals.value("f")
+    nodes = list(walk(function.declaration.body))
+    # WHEN
+    for _ in range(10):
+        function.call(lox.interpreter, [1, "a"])
+    # THEN
+    quick = [
+        node
+        for node in walk(function.declaration.body)
+        if isinstance(node, (NumberBinary, NumberNegate, StringConcat))
+    ]
+    assert len(quick) == 5
+    assert list(walk(function.declaration.body)) == nodes
@@ -14,6 +14,7 @@ def run_resolver(src: str, interpreter: Interpreter):
     ast = Parser(tokens).parse()
     resolver = Resolver(interpreter)
     resolver.resolve(ast)
+    return ast
 
 
 @patch("pylox.interpreter")
@@ -135,3 +136,82 @@ def test_if_resolver_handles_incorrect_usage_of_super_keyword(
         run_resolver(src, interpreter)
     # THEN
     assert "Can't use 'super'" in err.value.message
+
+
+def test_if_resolver_assigns_frame_slots_to_locals() -> None:
+    # GIVEN
+    src = "fun f(a, b) { var c = a; { var d = b; print c + d; } }"
+    interpreter = Interpreter()
+    # WHEN
+    ast = run_resolver(src, interpreter)
+    # THEN
+    function = ast[0]
+    c = function.body[0]
+    block = function.body[1]
+    d = block.statements[0]
+    plus = block.statements[1].expr
+    resolved = {
+        variable.name.lexeme: (variable.depth, variable.slot)
+        for variable in [c.initializer, d.initializer, plus.left, plus.right]
+    }
+    assert resolved == {"a": (0, 0), "b": (1, 1), "c": (1, 2), "d": (0, 0)}
+    assert (function.frame_size, block.frame_size) == (3, 1)
+    assert (function.slot, c.slot, d.slot) == (None, 2, 0)
+
+
+@pytest.mark.parametrize(
+    "src,counted",
+    [
+        ("for (var i = 0; i < 10; i = i + 1) print i;", True),
+        ("for (var i = 9; i >= 0; i = i - 3) {}", True),
+        ("for (var i = 0; i < 10; i = i + 1) { fun f() { i = 1; } }", False),
+        ("for (var i = 0; i < n; i = i + 1) {}", False),
+        ("for (var i = 0; i < 10; i = i * 2) {}", False),
+        ("for (var i = 0; i != 10; i = i + 1) {}", False),
+        ("var i; for (i = 0; i < 10; i = i + 1) {}", False),
+        ("for (var i = 0; i < 10;) i = i + 1;", False),
+    ],
+)
+def test_if_resolver_finds_counted_loops(src: str, counted: bool) -> None:
+    # WHEN
+    ast = run_resolver(src, Interpreter())
+    # THEN
+    loop = ast[-1]
+    assert loop.counted is counted
+    assert loop.frame_size == (1 if "var i =" in src else 0)
+
+
+def test_if_scopes_that_declare_nothing_get_no_frame() -> None:
+    # GIVEN
+    src = "fun f(a) { { { print a; } } fun g() { { print a; } } }"
+    # WHEN
+    ast = run_resolver(src, Interpreter())
+    # THEN
+    f = ast[0]
+    outer = f.body[0]
+    inner = outer.statements[0]
+    g = f.body[1]
+    in_f = inner.statements[0].expr
+    in_g = g.body[0].statements[0].expr
+    assert (outer.frame_size, inner.frame_size, g.frame_size) == (0, 0, 0)
+    assert (in_f.depth, in_f.slot) == (0, 0)
+    assert (in_g.depth, in_g.slot) == (0, 0)
+
+
+def test_if_resolver_finds_locals_no_closure_captures() -> None:
+    # GIVEN
+    src = """
+fun f(a, b) {
+  var c;
+  { var d = a; print d; }
+  fun g() { return b; }
+  return g;
+}
+fun h(x) { return x; }
+"""
+    # WHEN
+    f, h = run_resolver(src, Interpreter())
+    # THEN
+    assert f.uncaptured == (0, 2, 3)  # a, c and g, not b
+    assert f.body[1].uncaptured == ()  # no closure made in the block
+    assert h.uncaptured == ()  # nor in `h`
@@ -0,0 +1,127 @@
+import io
+from contextlib import redirect_stdout
+
+import pytest
+
+from pylox.cli import Lox
+from pylox.runtime_entity import LoxClass, LoxInstance, Shape
+
+
+@pytest.mark.parametrize("engine", ["tree", "closure"])
+def test_if_field_shadows_method(engine: str) -> None:
+    # GIVEN
+    src = """
+class A { m() { return 1; } }
+fun two() { return 2; }
+var a = A();
+for (var i = 0; i < 2; i = i + 1) {
+  print a.m();
+  a.m = two;
+}
+"""
+    # WHEN
+    with io.StringIO() as buf, redirect_stdout(buf):
+        Lox(engine=engine).run(src)
+        output = buf.getvalue()
+    # THEN
+    assert output == "1\n2\n"
+
+
+def test_if_inherited_methods_are_flattened_at_creation() -> None:
+    # GIVEN
+    root = LoxClass("A", None, {"m": "A.m", "n": "A.n"})  # type: ignore
+    middle = LoxClass("B", root, {"n": "B.n"})  # type: ignore
+    # WHEN
+    leaf = LoxClass("C", middle, {})
+    # THEN
+    assert leaf.table == {"m": "A.m", "n": "B.n"}
+    assert leaf.methods == {}
+    assert leaf.find_method("n") == "B.n"
+    assert leaf.find_method("missing") is None
+
+
+def test_if_initializer_and_arity_are_precomputed() -> None:
+    # GIVEN
+    lox = Lox()
+    src = "class A { init(a, b) {} } class B < A {} class C {}"
+    # WHEN
+    with io.StringIO() as buf, redirect_stdout(buf):
+        lox.run(src)
+    value = lox.interpreter.globals.value
+    # THEN
+    assert value("B").initializer is value("A").initializer
+    assert value("B").arity() == 2
+    assert value("C").initializer is None
+    assert value("C").arity() == 0
+
+
+def test_if_defined_method_updates_the_table() -> None:
+    # GIVEN
+    lox_class = LoxClass("A", None, {})  # type: ignore
+    init = Lox(engine="vm")
+    with io.StringIO() as buf, redirect_stdout(buf):
+        init.run("class A { init(x) {} }")
+    method = init.interpreter.globals.value("A").initializer
+    # WHEN
+    lox_class.define_method("init", method)
+    # THEN
+    assert lox_class.find_method("init") is method
+    assert lox_class.methods == {"init": method}
+    assert lox_class.arity() == 1
+
+
+def instance_with(lox_class: LoxClass, *names: str) -> LoxInstance:
+    instance = LoxInstance(lox_class)
+    for value, name in enumerate(names):
+        instance.set_field(name, value)
+    return instance
+
+
+def test_if_instances_with_same_fields_share_shape() -> None:
+    # GIVEN
+    lox_class = LoxClass("A", None, {})  # type: ignore
+    # WHEN
+    first = instance_with(lox_class, "x", "y")
+    second = instance_with(lox_class, "x", "y")
+    other = instance_with(lox_class, "y", "x")
+    # THEN
+    assert first.shape is second.shape
+    assert first.shape.offsets == {"x": 0, "y": 1}
+    assert first.values == [0, 1]
+    assert other.shape is not first.shape
+    assert other.fields == {"y": 0, "x": 1}
+
+
+def test_if_field_update_keeps_shape() -> None:
+    # GIVEN
+    instance = instance_with(LoxClass("A", None, {}), "x")  # type: ignore
+    shape = instance.shape
+    # WHEN
+    instance.set_field("x", "new")
+    # THEN
+    assert instance.shape is shape
+    assert instance.values == ["new"]
+
+
+def test_if_instance_used_as_map_gets_its_own_shape() -> None:
+    # GIVEN
+    lox_class = LoxClass("A", None, {})  # type: ignore
+    for i in range(Shape.MAX_TRANSITIONS):
+        instance_with(lox_class, f"key{i}")
+    # WHEN
+    instance = instance_with(lox_class, "extra", "more")
+    # THEN
+    assert not instance.shape.shared
+    assert "extra" not in lox_class.shape.transitions
+    assert instance.fields == {"extra": 0, "more": 1}
+    assert instance_with(lox_class, "key0").shape.shared
+
+
+def test_if_shape_stops_sharing_past_max_fields() -> None:
+    # GIVEN
+    names = [f"f{i}" for i in range(Shape.MAX_FIELDS + 2)]
+    # WHEN
+    instance = instance_with(LoxClass("A", None, {}), *names)  # type: ignore
+    # THEN
+    assert not instance.shape.shared
+    assert instance.fields == {name: i for i, name in enumerate(names)}
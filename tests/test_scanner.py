@@ -1,17 +1,23 @@
+import io
+import mmap
+import os
+from pathlib import Path
+
 import pytest
 
 from pylox.error import LoxSyntaxError
-from pylox.scanner import Scanner
-from pylox.tokens import TokenType
+from pylox.scanner import CompactScanner, RegexScanner, Scanner, iter_tokens
+from pylox.tokens import TOKEN_CODES, TokenType
 
 
-def test_if_identifiers_scanning_is_valid() -> None:
+@pytest.mark.parametrize("scanner", [Scanner, RegexScanner, CompactScanner])
+def test_if_identifiers_scanning_is_valid(scanner) -> None:
     # GIVEN
     src = "andy formless fo _ _123 _abc ab123 abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ1234567890_"
     expected_token_lexemes = src.split(" ")
 
     # WHEN
-    tokens = Scanner(src).scan_tokens()
+    tokens = scanner(src).scan_tokens()
 
     # THEN
     assert len(tokens) == 9
@@ -22,13 +28,14 @@ def test_if_identifiers_scanning_is_valid() -> None:
         assert tokens[ind].lexeme == expected_token_lexemes[ind]
 
 
-def test_if_keyword_scanning_is_valid() -> None:
+@pytest.mark.parametrize("scanner", [Scanner, RegexScanner, CompactScanner])
+def test_if_keyword_scanning_is_valid(scanner) -> None:
     # GIVEN
     src = "and class else false for fun if nil or return super this true var while"
     expected_token_lexemes = src.split(" ")
 
     # WHEN
-    tokens = Scanner(src).scan_tokens()
+    tokens = scanner(src).scan_tokens()
 
     # THEN
     assert len(tokens) == 16
@@ -42,7 +49,8 @@ def test_if_keyword_scanning_is_valid() -> None:
         assert tokens[ind].lexeme == expected_token_lexemes[ind]
 
 
-def test_if_numbers_scanning_is_valid() -> None:
+@pytest.mark.parametrize("scanner", [Scanner, RegexScanner, CompactScanner])
+def test_if_numbers_scanning_is_valid(scanner) -> None:
     # GIVEN
     src = """
     123
@@ -60,7 +68,7 @@ def test_if_numbers_scanning_is_valid() -> None:
     """
 
     # WHEN
-    tokens = Scanner(src).scan_tokens()
+    tokens = scanner(src).scan_tokens()
 
     # THEN
     assert len(tokens) == 7
@@ -77,7 +85,8 @@ def test_if_numbers_scanning_is_valid() -> None:
 
 
 # todo: test escape sequences
-def test_if_strings_scanning_is_valid() -> None:
+@pytest.mark.parametrize("scanner", [Scanner, RegexScanner, CompactScanner])
+def test_if_strings_scanning_is_valid(scanner) -> None:
     # GIVEN
     src = """
     ""
@@ -89,7 +98,7 @@ def test_if_strings_scanning_is_valid() -> None:
     """
 
     # WHEN
-    tokens = Scanner(src).scan_tokens()
+    tokens = scanner(src).scan_tokens()
 
     # THEN
     assert len(tokens) == 3
@@ -100,7 +109,8 @@ def test_if_strings_scanning_is_valid() -> None:
     assert tokens[1].literal == "string"
 
 
-def test_if_punctuators_scanning_is_valid() -> None:
+@pytest.mark.parametrize("scanner", [Scanner, RegexScanner, CompactScanner])
+def test_if_punctuators_scanning_is_valid(scanner) -> None:
     # GIVEN
     src = "(){};,+-*!===<=>=!=<>/."
     expected_token_types = [
@@ -126,7 +136,7 @@ def test_if_punctuators_scanning_is_valid() -> None:
     ]
 
     # WHEN
-    tokens = Scanner(src).scan_tokens()
+    tokens = scanner(src).scan_tokens()
 
     # THEN
     assert len(tokens) == len(expected_token_types)
@@ -135,7 +145,8 @@ def test_if_punctuators_scanning_is_valid() -> None:
         assert tokens[i].token_type == expected_token_types[i]
 
 
-def test_if_whitespace_is_ignored() -> None:
+@pytest.mark.parametrize("scanner", [Scanner, RegexScanner, CompactScanner])
+def test_if_whitespace_is_ignored(scanner) -> None:
     # GIVEN
     src = """
     space    tabs				newlines
@@ -153,7 +164,7 @@ def test_if_whitespace_is_ignored() -> None:
     """
 
     # WHEN
-    tokens = Scanner(src).scan_tokens()
+    tokens = scanner(src).scan_tokens()
 
     # THEN
     assert len(tokens) == 5
@@ -163,7 +174,8 @@ def test_if_whitespace_is_ignored() -> None:
         assert tokens[i].token_type == TokenType.IDENTIFIER
 
 
-def test_if_multiline_comments_works() -> None:
+@pytest.mark.parametrize("scanner", [Scanner, RegexScanner, CompactScanner])
+def test_if_multiline_comments_works(scanner) -> None:
     # GIVEN
     src = """
     /* simple one line */ // test simple comment
@@ -176,7 +188,7 @@ def test_if_multiline_comments_works() -> None:
     // hey
     """
     # WHEN
-    tokens = Scanner(src).scan_tokens()
+    tokens = scanner(src).scan_tokens()
 
     # THEN
     assert len(tokens) == 3
@@ -187,34 +199,38 @@ def test_if_multiline_comments_works() -> None:
     assert tokens[1].literal == "world"
 
 
-def test_if_unterminated_string_produces_error() -> None:
+@pytest.mark.parametrize("scanner", [Scanner, RegexScanner, CompactScanner])
+def test_if_unterminated_string_produces_error(scanner) -> None:
     src = '"hello" "world!'
 
     with pytest.raises(LoxSyntaxError) as err:
-        Scanner(src).scan_tokens()
+        scanner(src).scan_tokens()
 
     assert "Unterminated string." in err.value.message
 
 
-def test_if_unknown_character_produces_error() -> None:
+@pytest.mark.parametrize("scanner", [Scanner, RegexScanner, CompactScanner])
+def test_if_unknown_character_produces_error(scanner) -> None:
     src = "%"
 
     with pytest.raises(LoxSyntaxError) as err:
-        Scanner(src).scan_tokens()
+        scanner(src).scan_tokens()
 
     assert "Unexpected character" in err.value.message
 
 
-def test_if_unclosed_multiline_comment_produces_error() -> None:
+@pytest.mark.parametrize("scanner", [Scanner, RegexScanner, CompactScanner])
+def test_if_unclosed_multiline_comment_produces_error(scanner) -> None:
     src = "/* /* */ //"
 
     with pytest.raises(LoxSyntaxError) as err:
-        Scanner(src).scan_tokens()
+        scanner(src).scan_tokens()
 
     assert "Unterminated block comment." in err.value.message
 
 
-def test_if_lines_counting_works_well() -> None:
+@pytest.mark.parametrize("scanner", [Scanner, RegexScanner, CompactScanner])
+def test_if_lines_counting_works_well(scanner) -> None:
     src = """// line = 1
     line = 2
     line = 3
@@ -226,6 +242,97 @@ def test_if_lines_counting_works_well() -> None:
     """
 
     with pytest.raises(LoxSyntaxError) as err:
-        Scanner(src).scan_tokens()
+        scanner(src).scan_tokens()
 
     assert "8" == str(err.value.line)
+
+
+def tokens_summary(src: str, scanner) -> list | tuple:
+    try:
+        return [
+            (token.token_type, token.lexeme, token.literal, token.line)
+            for token in scanner(src).scan_tokens()
+        ]
+    except LoxSyntaxError as err:
+        return err.line, err.message
+
+
+def streamed_tokens_summary(src: io.IOBase, chunk_size: int) -> list | tuple:
+    try:
+        return [
+            (token.token_type, token.lexeme, token.literal, token.line)
+            for token in iter_tokens(src, chunk_size)
+        ]
+    except LoxSyntaxError as err:
+        return err.line, err.message
+
+
+TEST_DATA = sorted(
+    Path(os.path.dirname(os.path.realpath(__file__)), "data").rglob("*.lox")
+)
+
+
+@pytest.mark.parametrize("path", TEST_DATA, ids=str)
+def test_if_regex_scanner_matches_classic_scanner_on_test_data(
+    path: Path,
+) -> None:
+    # GIVEN
+    src = path.read_text()
+    # WHEN
+    expected = tokens_summary(src, Scanner)
+    actual = tokens_summary(src, RegexScanner)
+    compact = tokens_summary(src, CompactScanner)
+    # THEN
+    assert actual == expected
+    assert compact == expected
+
+
+@pytest.mark.parametrize("path", TEST_DATA, ids=str)
+def test_if_streaming_scanner_matches_regex_scanner_on_test_data(
+    path: Path,
+) -> None:
+    # GIVEN
+    src = path.read_text()
+    expected = tokens_summary(src, RegexScanner)
+
+    for chunk_size in (1, 3, 64):
+        # WHEN
+        from_text = streamed_tokens_summary(io.StringIO(src), chunk_size)
+        from_bytes = streamed_tokens_summary(
+            io.BytesIO(src.encode()), chunk_size
+        )
+        # THEN
+        assert from_text == expected
+        assert from_bytes == expected
+
+
+def test_if_streaming_scanner_reads_memory_mapped_file() -> None:
+    # GIVEN
+    path = Path("custom/classes.lox").absolute()
+    expected = tokens_summary(path.read_text(), RegexScanner)
+
+    with open(path, "rb") as f, mmap.mmap(
+        f.fileno(), 0, access=mmap.ACCESS_READ
+    ) as src:
+        # WHEN
+        actual = streamed_tokens_summary(src, 16)
+
+    # THEN
+    assert actual == expected
+
+
+def test_if_token_buffer_materializes_tokens_on_demand() -> None:
+    # GIVEN
+    src = 'var s = "multi\nline";\nprint s;'
+    # WHEN
+    tokens = CompactScanner(src).scan_tokens()
+    # THEN
+    assert len(tokens) == 9
+    assert list(tokens.types) == [
+        TOKEN_CODES[token.token_type] for token in tokens
+    ]
+    assert tokens.lexeme(3) == '"multi\nline"'
+    assert tokens[3].literal == "multi\nline"
+    assert [token.line for token in tokens] == [1, 1, 1, 2, 2, 3, 3, 3, 3]
+    assert tokens[-1].token_type == TokenType.EOF
+    assert [token.lexeme for token in tokens[5:7]] == ["print", "s"]
@@ -0,0 +1,94 @@
+import io
+import sys
+from contextlib import redirect_stderr, redirect_stdout
+from unittest import mock
+
+import pytest
+
+from pylox.cli import Lox
+from pylox.interpreter import Interpreter
+
+
+def run(src: str) -> str:
+    with io.StringIO() as buf, redirect_stdout(buf), redirect_stderr(buf):
+        Lox().run(src)
+        return buf.getvalue()
+
+
+def test_if_deep_recursion_does_not_overflow_python_stack() -> None:
+    # GIVEN
+    depth = sys.getrecursionlimit() * 5
+    src = f"""
+fun count(n) {{ if (n == 0) return 0; return 1 + count(n - 1); }}
+print count({depth});
+"""
+    # WHEN
+    output = run(src)
+    # THEN
+    assert output == f"{depth}\n"
+
+
+@mock.patch.object(Interpreter, "MAX_HOST_DEPTH", 10**9)
+def test_if_tail_calls_run_in_constant_python_stack() -> None:
+    # GIVEN
+    depth = sys.getrecursionlimit() * 5
+    src = f"""
+class Counter {{
+  init() {{ this.n = 0; }}
+  down(n) {{ if (n == 0) return this.n; this.n = this.n + 1; return this.down(n - 1); }}
+}}
+fun even(n) {{ if (n == 0) return true; return odd(n - 1); }}
+fun odd(n) {{ if (n == 0) return false; return even(n - 1); }}
+print even({depth});
+print Counter().down({depth});
+"""
+    # WHEN
+    output = run(src)
+    # THEN
+    assert output == f"true\n{depth}\n"
+
+
+@pytest.mark.parametrize("depth", [0, 2])
+def test_if_calls_on_heap_stack_agree_with_host_calls(depth: int) -> None:
+    # GIVEN
+    src = """
+class A {
+  init(n) { this.n = n; }
+  get() { return this.n; }
+  twice() { return this.get() + this.get(); }
+}
+class B < A {
+  init(n) { super.init(n * 10); }
+  twice() { return super.twice() + 1; }
+}
+fun fib(n) { if (n < 2) return n; return fib(n - 1) + fib(n - 2); }
+fun make(n) { return B(n); }
+print fib(10) + make(1).twice() + len("ab");
+var b = make(2);
+b.f = fib;
+print b.f(b.get()) or nil;
+print -fib(3) == -2 and !fib(1);
+"""
+    expected = run(src)
+    # WHEN
+    with mock.patch.object(Interpreter, "MAX_HOST_DEPTH", depth):
+        output = run(src)
+    # THEN
+    assert output == expected
+    assert output == "78\n6765\nfalse\n"
+
+
+@mock.patch.object(Interpreter, "MAX_HOST_DEPTH", 0)
+def test_if_runtime_error_on_heap_stack_restores_interpreter() -> None:
+    # GIVEN
+    lox = Lox()
+    src = 'fun f(n) { if (n == 0) return 1 - "a"; return f(n - 1); }\nf(3);'
+    # WHEN
+    with io.StringIO() as buf, redirect_stdout(buf), redirect_stderr(buf):
+        lox.run(src)
+        lox.had_error = lox.had_runtime_error = False
+        lox.run("var a = 1; print a;")
+        output = buf.getvalue()
+    # THEN
+    assert output == "line 1: Operands must be a numbers.\n1\n"
+    assert lox.interpreter.host_depth == 0
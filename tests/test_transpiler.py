@@ -0,0 +1,203 @@
+import io
+from contextlib import redirect_stderr, redirect_stdout
+from unittest import mock
+
+import pytest
+
+from pylox.cli import Lox
+from pylox.interpreter import Interpreter
+from pylox.parser import Parser
+from pylox.resolver import Resolver
+from pylox.scanner import Scanner
+from pylox.transpiler import PythonInterpreter, Transpiler
+
+
+def transpile(src: str) -> str:
+    tokens = Scanner(src).scan_tokens()
+    statements = Parser(tokens).parse()
+    Resolver(Interpreter()).resolve(statements)
+    return Transpiler(statements).source
+
+
+def run(src: str, engine: str = "python") -> str:
+    with io.StringIO() as buf, redirect_stdout(buf), redirect_stderr(buf):
+        Lox(engine=engine).run(src)
+        return buf.getvalue()
+
+
+def test_if_python_engine_is_selected() -> None:
+    # WHEN
+    lox = Lox(engine="python")
+    # THEN
+    assert isinstance(lox.interpreter, PythonInterpreter)
+
+
+def test_if_locals_become_python_locals() -> None:
+    # GIVEN
+    src = "fun f(a) { var b = a; return b; }"
+    # WHEN
+    source = transpile(src)
+    # THEN
+    assert source.splitlines() == [
+        "def f_(a_0):",
+        "    b_1 = a_0",
+        "    return b_1",
+    ]
+
+
+def test_if_assigned_upvalue_is_declared_nonlocal() -> None:
+    # GIVEN
+    src = "fun f() { var n = 0; fun g() { n = n + 1; return n; } return g; }"
+    # WHEN
+    source = transpile(src)
+    # THEN
+    assert "nonlocal n_0" in source
+
+
+def test_if_captured_loop_variable_is_boxed() -> None:
+    # GIVEN
+    src = "fun f() { while (true) { var a = 1; fun g() { return a; } } }"
+    # WHEN
+    source = transpile(src)
+    # THEN
+    assert "a_0 = [1.0]" in source
+    assert "def g_1(*, a_0=a_0):" in source
+    assert "return a_0[0]" in source
+
+
+@pytest.mark.parametrize(
+    "src,expected",
+    [
+        # a redeclared variable is the same variable for closures too
+        (
+            "{ var a = 1; fun f() { return a; } var a = 2; print f(); }",
+            "2\n",
+        ),
+        # every iteration of a block declares new variables
+        (
+            "fun run() { var f; var g;"
+            "  for (var i = 0; i < 2; i = i + 1) {"
+            "    var j = i; fun h() { j = j + 10; return j; }"
+            "    if (i == 0) f = h; else g = h;"
+            "  }"
+            "  print f(); print g(); print f();"
+            "} run();",
+            "10\n11\n20\n",
+        ),
+        # a local function can call itself
+        (
+            "{ fun f(n) { if (n < 1) return 0; return n + f(n - 1); }"
+            " print f(3); }",
+            "6\n",
+        ),
+        # closures over `this` and `super`
+        (
+            "class A { m() { return 1; } }"
+            "class B < A { m() { fun f() { return super.m() + this.n; }"
+            " return f; } }"
+            "var b = B(); b.n = 2; print b.m()();",
+            "3\n",
+        ),
+        (
+            "class A { init() { fun f() { return this; } this.f = f; } }"
+            "var a = A(); print a.f() == a; print a.init() == a;",
+            "true\ntrue\n",
+        ),
+        # fields shadow methods and are called without a receiver
+        (
+            "class A { m() { return 1; } } var a = A();"
+            "fun two() { return 2; } a.m = two; print a.m();",
+            "2\n",
+        ),
+        # Lox names never clash with the runtime helpers
+        (
+            "var call = 1; fun stringify(add) { return add + call; }"
+            "print stringify(2); print stringify;",
+            "3\n<fn stringify>\n",
+        ),
+    ],
+)
+def test_if_python_engine_agrees_with_tree_walker(
+    src: str, expected: str
+) -> None:
+    # WHEN
+    output = run(src)
+    # THEN
+    assert output == expected
+    assert output == run(src, engine="tree")
+
+
+def test_if_runtime_error_is_reported_with_lox_line() -> None:
+    # GIVEN
+    src = 'var a = 1;\nprint a -\n "b";'
+    # WHEN
+    output = run(src)
+    # THEN
+    assert output == "line 2: Operands must be a numbers.\n"
+
+
+def test_if_undefined_global_is_reported_with_lox_line() -> None:
+    # GIVEN
+    src = "fun f() {\n  return nope;\n}\nprint f();"
+    # WHEN
+    output = run(src)
+    # THEN
+    assert output == "line 2: Undefined variable 'nope'.\n"
+
+
+def test_if_python_source_is_emitted(tmp_path) -> None:
+    # GIVEN
+    script = tmp_path / "script.lox"
+    script.write_text("print 1 + 2;")
+    # WHEN
+    with io.StringIO() as buf, redirect_stdout(buf):
+        Lox().emit_python(script)
+        output = buf.getvalue()
+    # THEN
+    assert output.startswith("print(stringify(")
+    assert "add(" in output
+
+
+@mock.patch(
+    "builtins.input",
+    side_effect=["var s = 1;", "{ var t = s + 1; print t; }", "s * 3", "exit"],
+)
+def test_if_python_engine_works_in_repl_mode(ignored) -> None:
+    with io.StringIO() as buf, redirect_stdout(buf), redirect_stderr(buf):
+        # WHEN
+        Lox(engine="python").run_prompt()
+        output = buf.getvalue()
+        actual = [
+            line.replace(">", "").strip() for line in output.split("\n")[:-1]
+        ]
+
+    # THEN
+    assert actual == ["2", "3"]
+
+
+@pytest.mark.parametrize("engine", ["tree", "python"])
+def test_if_later_programs_keep_block_locals_apart(engine: str) -> None:
+    # GIVEN
+    lox = Lox(engine=engine)
+    programs = [
+        'var g; { var a = "one"; fun f() { print a; } g = f; }',
+        '{ var a = "two"; }',
+        "g();",
+    ]
+    # WHEN
+    with io.StringIO() as buf, redirect_stdout(buf):
+        for src in programs:
+            lox.run(src)
+        output = buf.getvalue()
+    # THEN
+    assert output == "one\n"
+
+
+def test_if_invalid_generated_python_is_reported_as_lox_error() -> None:
+    # GIVEN
+    src = "while (true) {\n fun f() { break; }\n f();\n break;\n}"
+    # WHEN
+    with mock.patch.object(Resolver, "visit_break_stmt"):
+        output = run(src)
+    # THEN
+    assert output == "line 2: Internal error: 'break' outside loop.\n"
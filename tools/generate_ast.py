@@ -1,7 +1,7 @@
 TAB = '    '
 
 
-def define_ast(base_name, types):
+def define_ast(base_name, types, attributes):
     path = "../pylox/" + base_name.lower() + ".py"
     file = open(path, "w")
     # HEADER
@@ -11,13 +11,13 @@ def define_ast(base_name, types):
     file.write('from abc import ABC, abstractmethod\n\n')
     if base_name == "Stmt":
         file.write('from pylox.expr import Expr, Variable\n')
+    file.write('from pylox.node import Node, next_node_id\n')
     file.write('from pylox.tokens import Token\n')
     # VISITOR
     define_visitor(file, base_name, types)
     # BASE CLASS
-    file.write(f'class {base_name}:\n')
-    file.write(f'{TAB}def __init__(self):\n')
-    file.write(f'{TAB * 2}pass\n')
+    file.write(f'class {base_name}(Node):\n')
+    file.write(f'{TAB}__slots__ = ()\n')
     file.write(f'{TAB}@abstractmethod\n')
     file.write(f'{TAB}def accept(self, visitor : {base_name}Visitor) -> typing.Any:\n')
     file.write(f'{TAB * 2}pass')
@@ -25,13 +25,23 @@ def define_ast(base_name, types):
     # IMPLEMENTATIONS
     for className, fields in types.items():
         file.write('\n')
-        define_type(file, base_name, className, fields)
+        define_type(
+            file, base_name, className, fields, attributes.get(className, ())
+        )
     file.write('\n')
 
 
-def define_type(file, base_name, class_name, fields):
+# `attributes` are not constructor arguments: they start with their default
+# value and are filled in later, e.g. by the resolver.
+def define_type(file, base_name, class_name, fields, attributes):
     file.write(f'class {class_name}({base_name}):')
     file.write('\n')
+    names = [fields] if type(fields) is not tuple else list(fields)
+    names += attributes
+    slots = ", ".join(f'"{field.split(":")[0].strip()}"' for field in names)
+    if len(names) == 1:
+        slots += ","
+    file.write(f'{TAB}__slots__ = ({slots})\n')
     file.write(f'{TAB}')
 
     if type(fields) is not tuple:
@@ -41,7 +51,7 @@ def define_type(file, base_name, class_name, fields):
         file.write(f'def __init__(self, {", ".join(fields)}):')
         file.write('\n')
 
-    file.write(f'{TAB * 2}super().__init__()\n')
+    file.write(f'{TAB * 2}self.node_id = next_node_id()\n')
 
     if type(fields) is not tuple:
         att = fields.split(":")[0]
@@ -53,6 +63,11 @@ def define_type(file, base_name, class_name, fields):
             file.write(f'{TAB * 2}self.{att} = {att}')
             file.write('\n')
 
+    for attribute in attributes:
+        declaration, default = attribute.split("=")
+        file.write(f'{TAB * 2}self.{declaration.strip()} = {default.strip()}')
+        file.write('\n')
+
     file.write('\n')
     file.write(f'{TAB}def accept(self, visitor : {base_name}Visitor) -> typing.Any:\n')
     file.write(f'{TAB * 2}return visitor.visit_{class_name.lower()}_{base_name.lower()}(self)')
@@ -103,8 +118,48 @@ if __name__ == "__main__":
         "Var": ('name: Token', "initializer: typing.Optional[Expr]"),
         "Class": ('name: Token', 'superclass: typing.Optional[Variable]', 'methods: typing.List[Function]'),
         "While": ('condition: Expr', 'body: Stmt'),
+        "For": (
+            'initializer: typing.Optional[Stmt]',
+            'condition: typing.Optional[Expr]',
+            'increment: typing.Optional[Expr]',
+            'body: Stmt',
+        ),
         "Break": 'keyword: Token'
     }
 
-    define_ast("Expr", expressions)
-    define_ast("Stmt", statements)
+    # Filled in by the resolver: `depth` is the number of frames between a
+    # local variable's use and its declaration (None for globals) and `slot`
+    # its index in that frame, or in the `Globals` of the interpreter.
+    # `feedback` is the operand types seen by an operator, filled in at run
+    # time. `counted` marks a `for` over a number the body leaves alone,
+    # like `for (var i = 0; i < 10; i = i + 1)`. `uncaptured` lists the slots
+    # of a frame that the closures made in it never read. The optimizer sets
+    # the `target` of a call it proved goes to a declaration that is never
+    # reassigned, with the right number of arguments.
+    resolved_expressions = {
+        "Assign": ('depth: typing.Optional[int] = None', 'slot: int = 0'),
+        "Binary": ('feedback: typing.Any = None',),
+        "Call": ('target: typing.Any = None',),
+        "Super": ('depth: typing.Optional[int] = None', 'slot: int = 0'),
+        "This": ('depth: typing.Optional[int] = None', 'slot: int = 0'),
+        "Unary": ('feedback: typing.Any = None',),
+        "Variable": ('depth: typing.Optional[int] = None', 'slot: int = 0'),
+    }
+    resolved_statements = {
+        "Block": ('frame_size: int = 0', 'uncaptured: typing.Tuple[int, ...] = ()'),
+        "For": (
+            'frame_size: int = 0',
+            'uncaptured: typing.Tuple[int, ...] = ()',
+            'counted: bool = False',
+        ),
+        "Function": (
+            'slot: typing.Optional[int] = None',
+            'frame_size: int = 0',
+            'uncaptured: typing.Tuple[int, ...] = ()',
+        ),
+        "Var": ('slot: typing.Optional[int] = None',),
+        "Class": ('slot: typing.Optional[int] = None',),
+    }
+
+    define_ast("Expr", expressions, resolved_expressions)
+    define_ast("Stmt", statements, resolved_statements)